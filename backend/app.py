@@ -1,20 +1,43 @@
 # backend/app.py
 
-import subprocess
-import sys
-import csv
-import io
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from .database import collection, movie_helper
+from .cache import ResponseCache
+from .database import collection, ensure_indexes, meta, scraper_jobs, tombstones, movie_helper, parse_fields, projection_for, sort_index
+from .changes import decode_token, encode_token, read_changes, watermark
+from .jobs import JobManager
+from .metrics import API_METRICS, MetricsMiddleware
+from .export import EXPORT_FORMATS, check_format_available, gzip_stream
+from .search import exact_query, rank, search_query
+from .stats import DEFAULT_IMDB_BINS, DEFAULT_RT_BINS, format_stats, parse_bins, stats_pipeline
+from .pagination import decode_cursor, encode_cursor, keyset_filter, sort_spec
+from .serialization import MovieChanges, MovieDetail, MoviePage, MovieSummary, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+# Runs the scraper as a tracked, single-flight child process
+job_manager = JobManager(scraper_jobs)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Create the sort/filter indexes once, before the first request is served
+    await ensure_indexes()
+    await job_manager.ensure_indexes()
+    # Release the lock of any scrape this process never saw finish
+    await job_manager.recover()
+    yield
+
 app = FastAPI(
     title="Movie Scraper API",
-    description="An API to access enriched movie data from IMDb and Rotten Tomatoes."
+    description="An API to access enriched movie data from IMDb and Rotten Tomatoes.",
+    lifespan=lifespan,
+    # Uncached endpoints are encoded with orjson too (cached ones, see cache.py)
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -24,127 +47,318 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the time spent in every other middleware is measured too
+app.add_middleware(MetricsMiddleware)
+
+# =====================================================================
+# SHARED FILTER PARAMETERS
+# =====================================================================
+class MovieFilters:
+    """
+    The filter and sort query parameters shared by /movies/filter, /stats and
+    the exports, turned into a Mongo query and a (sort key, direction) pair.
+    `title` narrows them to the movies /movies/search matches.
+    """
+    def __init__(
+        self,
+        min_rating: Optional[float] = Query(None, ge=0, le=10, description="Filter by minimum IMDb rating"),
+        min_year: Optional[int] = Query(None, ge=1800),
+        # UPDATED: Added 'discrepancy' to the list of allowed values
+        sort_by: Optional[str] = Query(None, enum=["imdb_rating", "tomatometer_score", "year", "runtime_minutes", "discrepancy"]),
+        order: str = Query("desc", enum=["asc", "desc"]),
+        title: Optional[str] = Query(None, description="Search text, matched like /movies/search"),
+    ):
+        self.query = {}
+        if min_rating is not None:
+            self.query["imdb_rating"] = {"$gte": min_rating}
+        if min_year is not None:
+            self.query["year"] = {"$gte": min_year}
+        if title:
+            search = search_query(title)
+            if search is None:
+                raise HTTPException(status_code=400, detail="Search text must contain letters or digits.")
+            self.query.update(search)
+        self.searching = bool(title)
+
+        # Results are ordered by (sort key, _id); without a sort_by we keep the
+        # historical default of best IMDb rating first.
+        self.sort_key = sort_by or "imdb_rating"
+        self.sort_direction = (1 if order == "asc" else -1) if sort_by else -1
+
+    def find(self, collection, query, projection=None):
+        """
+        The sorted cursor over `query`, pinned to the sort key's index: a
+        selective filter could otherwise win the plan race with its own index
+        and a blocking in-memory sort. A title search is left to the planner,
+        which reads the few matching movies from the search_terms index
+        instead of walking the whole sort index.
+        """
+        cursor = collection.find(query, projection).sort(sort_spec(self.sort_key, self.sort_direction))
+        if self.searching:
+            return cursor
+        _, index_name = sort_index(self.sort_key)
+        return cursor.hint(index_name)
+
+
+# Read endpoints are cached until the scraper bumps the collection version
+response_cache = ResponseCache(meta)
+
+# How many index matches /movies/search ranks before keeping the best `limit`
+SEARCH_CANDIDATES = 200
+
+
+# =====================================================================
+# KEYSET PAGINATION HELPER
+# =====================================================================
+async def build_page(cursor, limit, sort_key, fields):
+    """
+    Drains a cursor that was asked for `limit + 1` documents and returns one
+    page plus the opaque cursor of the next page (None on the last page).
+    """
+    docs = await cursor.to_list(length=limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "movies": [movie_helper(movie, fields) for movie in docs],
+        "next_cursor": encode_cursor(docs[-1], sort_key) if has_more else None,
+    }
+
 
 # =====================================================================
 # API ENDPOINTS TO GET MOVIES
 # =====================================================================
-@app.get("/movies", summary="Get a list of all movies")
-async def get_movies(skip: int = 0, limit: int = 25):
-    movies = []
-    async for movie in collection.find().skip(skip).limit(limit):
-        movies.append(movie_helper(movie))
-    return movies
+@app.get("/movies", summary="Get a page of movies", responses={200: {"model": MoviePage}})
+async def get_movies(
+    request: Request,
+    limit: int = Query(25, ge=1, le=250),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="'card' or a comma-separated list of fields"),
+):
+    field_names = parse_fields(fields)
+    query = {}
+    if cursor:
+        _, last_id = decode_cursor(cursor)
+        query["_id"] = {"$gt": last_id}
+
+    async def produce():
+        movies_cursor = collection.find(query, projection_for(field_names)).sort("_id", 1).limit(limit + 1)
+        return await build_page(movies_cursor, limit, None, field_names)
+
+    return await response_cache.respond(request, produce)
 
 
-@app.get("/movies/search", summary="Search for movies by title")
-async def search_movies(title: str):
-    movies = []
-    query = {"title": {"$regex": title, "$options": "i"}}
-    async for movie in collection.find(query):
-        movies.append(movie_helper(movie))
-    if not movies:
-        raise HTTPException(status_code=404, detail=f"No movies found with title containing '{title}'")
-    return movies
+@app.get("/movies/search", summary="Ranked search over titles, directors and cast", responses={200: {"model": List[Union[MovieDetail, MovieSummary]]}})
+async def search_movies(
+    request: Request,
+    title: str = Query(..., description="Search text; the last word may be a prefix"),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="'card' or a comma-separated list of fields"),
+):
+    field_names = parse_fields(fields)
+    query = search_query(title)
+    if query is None:
+        raise HTTPException(status_code=400, detail="Search text must contain letters or digits.")
+
+    async def produce():
+        # The search_terms index bounds the scan; only a capped candidate set is
+        # ranked, so latency does not grow with the collection. Full-term matches
+        # come first, then prefix matches fill the rest of the set.
+        projection = projection_for(field_names, "title", "director", "imdb_rating")
+        exact = await collection.find(exact_query(title), projection).limit(SEARCH_CANDIDATES).to_list(length=SEARCH_CANDIDATES)
+        exact_ids = [movie["_id"] for movie in exact]
+        remaining = SEARCH_CANDIDATES - len(exact)
+        prefix = []
+        if remaining:
+            prefix_query = {"$and": [query, {"_id": {"$nin": exact_ids}}]}
+            prefix = await collection.find(prefix_query, projection).limit(remaining).to_list(length=remaining)
+        movies = [movie_helper(movie, field_names) for movie in rank(exact + prefix, title, exact_ids)[:limit]]
+        if not movies:
+            raise HTTPException(status_code=404, detail=f"No movies found matching '{title}'")
+        return movies
+
+    return await response_cache.respond(request, produce)
 
 
 # =====================================================================
-# UPDATED FILTER ENDPOINT WITH DISCREPANCY SORT
+# FILTER ENDPOINT (INDEX-BACKED SORTING, INCLUDING DISCREPANCY)
 # =====================================================================
-@app.get("/movies/filter", summary="Filter and sort movies with detailed criteria")
+@app.get("/movies/filter", summary="Filter and sort movies with detailed criteria", responses={200: {"model": MoviePage}})
 async def filter_movies(
-    min_rating: Optional[float] = Query(None, ge=0, le=10, description="Filter by minimum IMDb rating"),
-    min_year: Optional[int] = Query(None, ge=1800),
-    # UPDATED: Added 'discrepancy' to the list of allowed values
-    sort_by: Optional[str] = Query(None, enum=["imdb_rating", "tomatometer_score", "year", "runtime_minutes", "discrepancy"]),
-    order: str = Query("desc", enum=["asc", "desc"])
+    request: Request,
+    filters: MovieFilters = Depends(),
+    limit: int = Query(25, ge=1, le=250),
+    cursor: Optional[str] = Query(None, description="The next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="'card' or a comma-separated list of fields"),
 ):
-    query = {}
-    if min_rating is not None:
-        query["imdb_rating"] = {"$gte": min_rating}
-    if min_year is not None:
-        query["year"] = {"$gte": min_year}
+    field_names = parse_fields(fields)
+    query = filters.query
+    sort_key, sort_direction = filters.sort_key, filters.sort_direction
+    after_cursor = keyset_filter(sort_key, sort_direction, cursor) if cursor else None
     
-    # --- NEW LOGIC FOR DISCREPANCY SORT ---
-    # If the user wants to sort by discrepancy, we must use a MongoDB Aggregation Pipeline.
-    if sort_by == 'discrepancy':
-        pipeline = [
-            # Stage 1: Match documents based on the initial query (e.g., min_year)
-            {'$match': query},
-            # Stage 2: Add new fields to each document without removing existing ones
-            {'$addFields': {
-                # Create a field that normalizes IMDb's 1-10 score to a 1-100 scale
-                'normalized_imdb': {'$multiply': ['$imdb_rating', 10]},
-            }},
-            {'$addFields': {
-                # Create the 'discrepancy' field by calculating the absolute difference
-                'discrepancy': {
-                    '$abs': {'$subtract': ['$normalized_imdb', '$tomatometer_score']}
-                }
-            }},
-            # Stage 3: Sort the documents by the new 'discrepancy' field
-            {'$sort': {'discrepancy': -1 if order == 'desc' else 1}}
-        ]
-        
-        movies = []
-        async for movie in collection.aggregate(pipeline):
-            movies.append(movie_helper(movie))
-        return movies
+    # 'discrepancy' is stored on every movie by the scraper pipeline, so all
+    # sort options are served by a (field, _id) index and a bounded cursor.
+    if after_cursor:
+        query = {"$and": [query, after_cursor]}
 
-    # --- REGULAR SORTING LOGIC (for all other sort_by options) ---
-    else:
-        movies = []
-        sort_direction = 1 if order == "asc" else -1
-        sort_criteria = []
-        if sort_by:
-            sort_criteria.append((sort_by, sort_direction))
-        else:
-            sort_criteria.append(("imdb_rating", -1)) # Default sort
-
-        cursor = collection.find(query).sort(sort_criteria)
-        async for movie in cursor:
-            movies.append(movie_helper(movie))
+    async def produce():
+        movies_cursor = filters.find(collection, query, projection_for(field_names, sort_key)).limit(limit + 1)
+        page = await build_page(movies_cursor, limit, sort_key, field_names)
             
-        if not movies:
+        if not page["movies"] and not cursor:
             raise HTTPException(status_code=404, detail="No movies found matching your criteria.")
             
-        return movies
+        return page
+
+    return await response_cache.respond(request, produce)
 
 
 # =====================================================================
-# CSV EXPORT ENDPOINT (No changes needed)
+# DELTA SYNC
 # =====================================================================
-@app.get("/export/csv", summary="Export all movie data to a CSV file")
-async def export_to_csv():
-    stream = io.StringIO()
-    writer = csv.writer(stream, delimiter=';')
-    headers = ["id", "title", "year", "imdb_rating", "tomatometer_score", "audience_score", "director", "plot_summary", "genres", "runtime_minutes", "cast", "source_imdb_url", "rotten_tomatoes_url"]
-    writer.writerow(headers)
-    movies_cursor = collection.find()
-    async for movie in movies_cursor:
-        genres_str = ", ".join(movie.get("genres", []))
-        cast_str = " | ".join([c.get("actor", "") for c in movie.get("cast", [])])
-        writer.writerow([
-            str(movie["_id"]), movie.get("title"), movie.get("year"), movie.get("imdb_rating"),
-            movie.get("tomatometer_score"), movie.get("audience_score"), movie.get("director"),
-            movie.get("plot_summary"), genres_str, movie.get("runtime_minutes"), cast_str,
-            movie.get("source_imdb_url"), movie.get("rotten_tomatoes_url"),
-        ])
-    stream.seek(0)
-    return StreamingResponse(iter([stream.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=movies.csv"})
+@app.get("/movies/changes", summary="Movies changed or deleted since a sync token", responses={200: {"model": MovieChanges}})
+async def movie_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="The next_token of the previous call; omit for a full snapshot"),
+    limit: int = Query(1000, ge=1, le=5000),
+    fields: Optional[str] = Query(None, description="'card' or a comma-separated list of fields"),
+):
+    """
+    Returns the movies upserted and the ids of the movies deleted since
+    `since`, oldest change first. Keep calling with `next_token` while
+    `has_more` is true; afterwards store it for the next sync.
+    """
+    field_names = parse_fields(fields)
+    since_seq = decode_token(since)
+
+    async def produce():
+        upto = watermark(await meta.find_one({"_id": collection.name}))
+        projection = projection_for(field_names, "updated_seq")
+        changes, has_more = await read_changes(collection, tombstones, since_seq, upto, limit, projection)
+        # A token never moves backwards, even if a writer has started a batch since
+        last_seq = changes[-1]["updated_seq"] if has_more else max(upto, since_seq)
+        return {
+            "upserts": [movie_helper(doc, field_names) for doc in changes if "movie_id" not in doc],
+            "deleted": [str(doc["movie_id"]) for doc in changes if "movie_id" in doc],
+            "next_token": encode_token(last_seq),
+            "has_more": has_more,
+        }
+
+    return await response_cache.respond(request, produce)
 
 
 # =====================================================================
-# SCRAPER ENDPOINT (No changes needed)
+# SINGLE MOVIE (DETAIL VIEW)
 # =====================================================================
-def run_scraper_script():
-    print("--- Background Task: Starting scraper script ---")
+@app.get("/movies/{movie_id}", summary="Get one movie with every field", responses={200: {"model": MovieDetail}})
+async def get_movie(request: Request, movie_id: str):
     try:
-        subprocess.run([sys.executable, "scraper/scraper.py"], check=True)
-        print("--- Background Task: Scraper script finished successfully ---")
-    except Exception as e:
-        print(f"--- Background Task: Scraper script failed: {e} ---")
+        object_id = ObjectId(movie_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid movie id.")
+
+    async def produce():
+        movie = await collection.find_one({"_id": object_id}, projection_for(None))
+        if movie is None:
+            raise HTTPException(status_code=404, detail="Movie not found.")
+        return movie_helper(movie)
+
+    return await response_cache.respond(request, produce)
+
+
+# =====================================================================
+# AGGREGATE STATISTICS FOR THE DASHBOARD
+# =====================================================================
+@app.get("/stats", summary="Counts, averages, histograms and breakdowns for the filtered movies")
+async def get_stats(
+    request: Request,
+    filters: MovieFilters = Depends(),
+    imdb_bins: Optional[str] = Query(None, description="IMDb histogram bin edges, e.g. '7,7.5,8,8.5,9,10'"),
+    rt_bins: Optional[str] = Query(None, description="Tomatometer histogram bin edges, e.g. '0,60,80,100'"),
+    scatter_points: int = Query(300, ge=1, le=2000, description="Maximum points in the IMDb vs RT scatter"),
+):
+    imdb_edges = parse_bins(imdb_bins, DEFAULT_IMDB_BINS)
+    rt_edges = parse_bins(rt_bins, DEFAULT_RT_BINS)
+
+    async def produce():
+        pipeline = stats_pipeline(filters.query, imdb_edges, rt_edges, scatter_points)
+        result = (await collection.aggregate(pipeline).to_list(length=1))[0]
+        return format_stats(result, imdb_edges, rt_edges)
+
+    return await response_cache.respond(request, produce)
+
+
+# =====================================================================
+# METRICS
+# =====================================================================
+@app.get("/metrics", summary="Prometheus metrics: request latency and Mongo time per route", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    cache = response_cache.stats()
+    extra = [
+        "# HELP api_response_cache_requests_total Cached read endpoint lookups.",
+        "# TYPE api_response_cache_requests_total counter",
+        f'api_response_cache_requests_total{{result="hit"}} {cache["hits"]}',
+        f'api_response_cache_requests_total{{result="miss"}} {cache["misses"]}',
+    ]
+    return PlainTextResponse(API_METRICS.prometheus(extra), media_type="text/plain; version=0.0.4")
 
+@app.get("/metrics/summary", summary="JSON summary of request latency and Mongo time per route since startup")
+async def metrics_summary():
+    return {**API_METRICS.summary(), "response_cache": response_cache.stats()}
+
+@app.get("/metrics/cache", summary="Hit ratio and latency of the response cache")
+async def cache_metrics():
+    return response_cache.stats()
+
+
+# =====================================================================
+# STREAMING EXPORT ENDPOINT (CSV, NDJSON, PARQUET, ARROW)
+# =====================================================================
+@app.get("/export/{export_format}", summary="Export movie data as CSV, NDJSON, Parquet or Arrow")
+async def export_movies(
+    export_format: str = Path(..., enum=list(EXPORT_FORMATS)),
+    filters: MovieFilters = Depends(),
+    gzip: bool = Query(False, description="Compress the export with gzip"),
+):
+    check_format_available(export_format)
+    exporter, media_type, extension = EXPORT_FORMATS[export_format]
+
+    movies_cursor = filters.find(collection, filters.query)
+    body = exporter(movies_cursor)
+    filename = f"movies.{extension}"
+    if gzip:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+# =====================================================================
+# SCRAPER JOBS
+# =====================================================================
 @app.post("/scraper/run", status_code=202, summary="Start a new scraping process")
-async def run_scraper(background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_scraper_script)
-    return {"message": "Scraping process started in the background. It will take several minutes to complete."}
\ No newline at end of file
+async def run_scraper():
+    """
+    Starts the scraper as a background job and returns its record. Only one
+    job runs at a time: while one is active this answers 409 with its id.
+    """
+    job = await job_manager.start()
+    return {"message": "Scraping job started.", "job_id": job["id"], "job": job}
+
+@app.get("/scraper/jobs/{job_id}", summary="Get the status and progress of a scraping job")
+async def get_scraper_job(job_id: str):
+    return await job_manager.get(job_id)
+
+@app.post("/scraper/jobs/{job_id}/cancel", summary="Cancel a running scraping job")
+async def cancel_scraper_job(job_id: str):
+    return await job_manager.cancel(job_id)
+
+@app.get("/scraper/jobs/{job_id}/events", summary="Stream a scraping job's progress as server-sent events")
+async def stream_scraper_job(job_id: str):
+    # Fail with a plain 404 before the stream starts
+    await job_manager.get(job_id)
+    return StreamingResponse(
+        job_manager.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
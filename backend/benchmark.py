@@ -0,0 +1,204 @@
+# backend/benchmark.py
+#
+# Micro-benchmarks for the API's query paths against a synthetic collection in
+# a scratch database (never the real `movies` collection). Needs a reachable
+# MongoDB at MONGO_URI.
+#
+#   python -m backend.benchmark search --movies 100000
+#
+# The serialize suite runs in memory only: it compares the original
+# movie_helper + jsonable_encoder path with the projected views encoded by
+# orjson, for pages of 250, 10k and 100k documents.
+#
+#   python -m backend.benchmark serialize
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+import bson
+from bson import ObjectId
+from dotenv import load_dotenv
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pymongo import MongoClient
+
+from .database import CARD_FIELDS, movie_helper, projection_for
+from .search import exact_query, rank, search_query
+from .serialization import MovieDetail, dumps
+
+# The synthetic movies get their search terms from the scraper pipeline, like real ones
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scraper"))
+from pipeline import compute_search_terms  # noqa: E402
+
+load_dotenv()
+
+WORDS = [
+    "dark", "knight", "return", "king", "star", "wars", "godfather", "pulp", "fiction", "matrix",
+    "lord", "rings", "fight", "club", "good", "bad", "ugly", "city", "god", "seven", "samurai",
+    "life", "beautiful", "spirited", "away", "saving", "private", "ryan", "green", "mile", "silence",
+]
+NAMES = ["Nolan", "Coppola", "Tarantino", "Kurosawa", "Scorsese", "Spielberg", "Miyazaki", "Leone", "Fincher"]
+
+
+def synthetic_movie(n, rng):
+    movie = {
+        "title": " ".join(rng.sample(WORDS, rng.randint(1, 4))).title() + f" {n}",
+        "year": rng.randint(1920, 2024),
+        "imdb_rating": round(rng.uniform(5, 9.5), 1),
+        "director": f"{rng.choice(WORDS).title()} {rng.choice(NAMES)}",
+        "cast": [{"actor": f"{rng.choice(WORDS).title()} {rng.choice(NAMES)}", "character": "N/A"} for _ in range(5)],
+        "source_imdb_url": f"https://www.imdb.com/title/tt{n:07d}/",
+    }
+    movie["search_terms"] = compute_search_terms(movie)
+    return movie
+
+
+def seed(collection, count, batch_size=5000):
+    rng = random.Random(42)
+    collection.drop()
+    for start in range(0, count, batch_size):
+        collection.insert_many([synthetic_movie(n, rng) for n in range(start, min(count, start + batch_size))])
+    collection.create_index("search_terms")
+
+
+def time_queries(run, queries, repeat=5):
+    """Returns (p50, p99) latency in milliseconds over every query."""
+    samples = []
+    for _ in range(repeat):
+        for text in queries:
+            start = time.perf_counter()
+            run(text)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def benchmark_search(collection, sizes, limit=20):
+    queries = ["dark kni", "godf", "nolan", "pulp fiction", "spirited aw", "sam"]
+
+    def old_search(text):
+        # The original unanchored, case-insensitive regex over the whole collection
+        return list(collection.find({"title": {"$regex": re.escape(text), "$options": "i"}}))
+
+    def new_search(text):
+        # As /movies/search: full-term matches first, then prefix matches
+        exact = list(collection.find(exact_query(text)).limit(200))
+        exact_ids = [movie["_id"] for movie in exact]
+        prefix = []
+        if len(exact) < 200:
+            prefix = list(collection.find({"$and": [search_query(text), {"_id": {"$nin": exact_ids}}]}).limit(200 - len(exact)))
+        return rank(exact + prefix, text, exact_ids)[:limit]
+
+    for size in sizes:
+        seed(collection, size)
+        old_p50, old_p99 = time_queries(old_search, queries)
+        new_p50, new_p99 = time_queries(new_search, queries)
+        print(f"{size:>8} movies | regex p50 {old_p50:8.2f} ms, p99 {old_p99:8.2f} ms"
+              f" | indexed p50 {new_p50:6.2f} ms, p99 {new_p99:6.2f} ms")
+
+
+# =====================================================================
+# SERIALIZATION
+# =====================================================================
+def legacy_movie_helper(movie):
+    """movie_helper as it was: every field of every document, unprojected."""
+    return {
+        "id": str(movie["_id"]),
+        "title": movie.get("title"),
+        "year": movie.get("year"),
+        "director": movie.get("director"),
+        "poster_url": movie.get("poster_url"),
+        "plot_summary": movie.get("plot_summary"),
+        "genres": movie.get("genres", []),
+        "runtime_minutes": movie.get("runtime_minutes"),
+        "cast": movie.get("cast", []),
+        "imdb_rating": movie.get("imdb_rating"),
+        "tomatometer_score": movie.get("tomatometer_score"),
+        "audience_score": movie.get("audience_score"),
+        "source_imdb_url": movie.get("source_imdb_url"),
+        "rotten_tomatoes_url": movie.get("rotten_tomatoes_url"),
+    }
+
+
+def full_movie(n, rng):
+    """A synthetic document with every field the scraper pipeline stores."""
+    movie = synthetic_movie(n, rng)
+    movie.update({
+        "_id": ObjectId(),
+        "poster_url": f"https://m.media-amazon.com/images/M/{n}.jpg",
+        "plot_summary": " ".join(rng.choice(WORDS) for _ in range(40)),
+        "genres": rng.sample(["Drama", "Crime", "Action", "Adventure", "Animation", "Western"], 2),
+        "runtime_minutes": rng.randint(80, 200),
+        "tomatometer_score": rng.randint(40, 100),
+        "audience_score": rng.randint(40, 100),
+        "rotten_tomatoes_url": f"https://www.rottentomatoes.com/m/movie_{n}",
+    })
+    movie["discrepancy"] = abs(movie["imdb_rating"] * 10 - movie["tomatometer_score"])
+    return movie
+
+
+def project(movie, projection):
+    """What MongoDB returns for `projection` (the _id is always included)."""
+    return {key: value for key, value in movie.items() if key == "_id" or key in projection}
+
+
+def time_best(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_serialization(sizes, repeat=3):
+    detail_adapter = TypeAdapter(list[MovieDetail])
+    rng = random.Random(42)
+    for size in sizes:
+        documents = [full_movie(n, rng) for n in range(size)]
+        detail_docs = [project(movie, projection_for(None)) for movie in documents]
+        card_docs = [project(movie, projection_for(CARD_FIELDS)) for movie in documents]
+        runs = max(1, min(repeat, 1_000_000 // size))
+        # (name, documents as fetched from MongoDB, encode the response body)
+        paths = [
+            ("movie_helper + jsonable_encoder", documents,
+             lambda: json.dumps(jsonable_encoder([legacy_movie_helper(m) for m in documents])).encode()),
+            ("detail view + orjson", detail_docs, lambda: dumps([movie_helper(m) for m in detail_docs])),
+            ("list view + orjson", card_docs, lambda: dumps([movie_helper(m, CARD_FIELDS) for m in card_docs])),
+            ("detail view validated by Pydantic", detail_docs,
+             lambda: detail_adapter.dump_json(detail_adapter.validate_python([movie_helper(m) for m in detail_docs]))),
+        ]
+
+        print(f"\n{size} documents:")
+        baseline = None
+        for name, fetched, encode in paths:
+            seconds = time_best(encode, runs)
+            baseline = baseline or seconds
+            body_kb = len(encode()) / 1024
+            fetched_kb = sum(len(bson.encode(m)) for m in fetched) / 1024
+            print(f"  {name:<35} {seconds * 1000:9.1f} ms | {size / seconds:>10,.0f} docs/s | {baseline / seconds:5.1f}x"
+                  f" | body {body_kb:7.0f} KB | fetched {fetched_kb:7.0f} KB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the API query paths on synthetic data.")
+    parser.add_argument("suite", choices=["search", "serialize"])
+    parser.add_argument("--movies", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    if args.suite == "serialize":
+        benchmark_serialization(args.movies or [250, 10000, 100000])
+        raise SystemExit
+
+    client = MongoClient(os.getenv("MONGO_URI"))
+    scratch = client.get_default_database()["movies_benchmark"]
+    try:
+        benchmark_search(scratch, args.movies or [1000, 10000, 100000])
+    finally:
+        scratch.drop()
+        client.close()
@@ -0,0 +1,144 @@
+# backend/cache.py
+
+import hashlib
+import json
+import os
+import statistics
+import time
+from collections import OrderedDict, deque
+
+from dotenv import load_dotenv
+from fastapi import Response
+
+from .serialization import dumps
+
+load_dotenv()
+
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 512))
+# How long the collection version read from MongoDB is trusted
+VERSION_POLL_SECONDS = float(os.getenv("RESPONSE_CACHE_VERSION_POLL", 2))
+
+# =====================================================================
+# CACHE BACKENDS
+# =====================================================================
+class MemoryBackend:
+    """An in-process LRU cache whose entries also expire after `ttl` seconds."""
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Shares cached responses between API workers through Redis (needs `redis`)."""
+    def __init__(self, url, ttl=RESPONSE_CACHE_TTL):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+
+    async def get(self, key):
+        value = await self._redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value):
+        await self._redis.set(key, json.dumps(value), ex=int(self.ttl))
+
+
+def make_backend():
+    redis_url = os.getenv("REDIS_URL")
+    return RedisBackend(redis_url) if redis_url else MemoryBackend()
+
+# =====================================================================
+# VERSIONED RESPONSE CACHE
+# =====================================================================
+class ResponseCache:
+    """
+    Caches the JSON body of read endpoints, keyed on the path, the normalized
+    query parameters and the collection version. The scraper pipeline bumps
+    that version (the `meta` collection's "movies" document) after every write,
+    which makes every older entry unreachable without an explicit purge.
+    """
+    def __init__(self, meta_collection, backend=None):
+        self.meta = meta_collection
+        self.backend = backend or make_backend()
+        self._version = None
+        self._version_read_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._hit_latencies = deque(maxlen=1000)
+        self._miss_latencies = deque(maxlen=1000)
+
+    async def version(self):
+        if time.monotonic() - self._version_read_at > VERSION_POLL_SECONDS:
+            doc = await self.meta.find_one({"_id": "movies"})
+            self._version = doc.get("version", 0) if doc else 0
+            self._version_read_at = time.monotonic()
+        return self._version
+
+    async def key_for(self, request):
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"v{await self.version()}:{request.url.path}?{params}"
+
+    async def respond(self, request, produce):
+        """
+        Returns the cached response for `request`, or builds it with
+        `await produce()` and caches it. Answers 304 when the client already
+        holds the current ETag.
+        """
+        start = time.perf_counter()
+        key = await self.key_for(request)
+        entry = await self.backend.get(key)
+        if entry is not None:
+            self.hits += 1
+            latencies = self._hit_latencies
+        else:
+            body = dumps(await produce())
+            entry = {"body": body.decode(), "etag": '"' + hashlib.sha1(body).hexdigest() + '"'}
+            await self.backend.set(key, entry)
+            self.misses += 1
+            latencies = self._miss_latencies
+
+        if request.headers.get("if-none-match") == entry["etag"]:
+            response = Response(status_code=304, headers={"ETag": entry["etag"]})
+        else:
+            response = Response(entry["body"], media_type="application/json", headers={"ETag": entry["etag"]})
+        latencies.append((time.perf_counter() - start) * 1000)
+        return response
+
+    def stats(self):
+        def percentiles(samples):
+            if not samples:
+                return {"p50_ms": None, "p99_ms": None}
+            ordered = sorted(samples)
+            return {
+                "p50_ms": round(statistics.median(ordered), 3),
+                "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+            }
+
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+            "version": self._version,
+            "latency_cached": percentiles(self._hit_latencies),
+            "latency_uncached": percentiles(self._miss_latencies),
+        }
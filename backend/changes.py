@@ -0,0 +1,67 @@
+# backend/changes.py
+
+import base64
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+# How long a batch reserved by the scraper pipeline may stay unwritten (e.g.
+# its writer crashed) before sync tokens move past it
+CHANGES_PENDING_TIMEOUT = float(os.getenv("CHANGES_PENDING_TIMEOUT", 300))
+
+# =====================================================================
+# DELTA SYNC
+# =====================================================================
+# The scraper pipeline stamps every movie whose content changed, and every
+# tombstone of a deleted movie, with the next value of a counter kept in the
+# `meta` collection (see scraper/pipeline.py). A sync token is the last value
+# a client has seen, so "what changed since" is a range scan on updated_seq.
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(json.dumps({"seq": seq}).encode()).decode()
+
+
+def decode_token(token):
+    """A missing token means "from the beginning", i.e. a full snapshot."""
+    if not token:
+        return 0
+    try:
+        seq = json.loads(base64.urlsafe_b64decode(token.encode()))["seq"]
+    except (ValueError, KeyError, TypeError):
+        seq = None
+    if not isinstance(seq, int) or seq < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync token.")
+    return seq
+
+
+def watermark(meta_doc, now=None):
+    """
+    The highest sequence number below which every change is written: the
+    counter itself, or just below the oldest batch a writer is still writing.
+    """
+    if not meta_doc:
+        return 0
+    now = now or time.time()
+    floors = [p["floor"] for p in meta_doc.get("pending_seqs", []) if now - p["at"] < CHANGES_PENDING_TIMEOUT]
+    return min(floors) - 1 if floors else meta_doc.get("seq", 0)
+
+
+async def read_changes(movies, tombstones, since, upto, limit, projection):
+    """
+    Returns (changes, has_more): the first `limit` movies and tombstones with
+    `since` < updated_seq <= `upto`, in sequence order. Tombstones are the
+    documents with a 'movie_id'.
+    """
+    seq_range = {"updated_seq": {"$gt": since, "$lte": upto}}
+    upserts = await movies.find(seq_range, projection).sort("updated_seq", 1).limit(limit + 1).to_list(length=limit + 1)
+    deleted = (
+        await tombstones.find(seq_range, {"movie_id": 1, "updated_seq": 1})
+        .sort("updated_seq", 1).limit(limit + 1).to_list(length=limit + 1)
+    )
+    changes = sorted(upserts + deleted, key=lambda doc: doc["updated_seq"])
+    return changes[:limit], len(changes) > limit
@@ -4,38 +4,109 @@ import os
 from dotenv import load_dotenv
 import motor.motor_asyncio
 from bson import ObjectId
+from fastapi import HTTPException
+
+from .metrics import MongoCommandTimer
 
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+# Every command is timed under the route that issued it (see metrics.py)
+client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
 db = client.get_default_database() 
 collection = db.movies
+# Holds the "movies" version counter the scraper pipeline bumps after each write
+meta = db.meta
+# One record per scraper run started through the API (see jobs.py)
+scraper_jobs = db.scraper_jobs
+# Deleted movies, kept so /movies/changes can report them (see changes.py)
+tombstones = db.movies_tombstones
+
+# =====================================================================
+# INDEXES FOR THE FILTER AND SORT ENDPOINTS
+# =====================================================================
+# Every sortable field of /movies/filter gets a (field, _id) index, matching
+# the keyset pagination order, so each page is an index scan bounded by the
+# page size. The same index is walked backwards for ascending sorts.
+#
+# The filters are ranges, so they follow the sort keys (equality, sort, range):
+# the index still returns movies in sort order (no in-memory SORT stage) and
+# the filters are checked on its keys before any document is fetched.
+SORT_FIELDS = ("imdb_rating", "tomatometer_score", "year", "runtime_minutes", "discrepancy")
+FILTER_FIELDS = ("imdb_rating", "year")
+
+def sort_index(field):
+    """(keys, name) of the index serving every filter combination sorted by `field`."""
+    keys = [(field, -1), ("_id", -1)] + [(name, 1) for name in FILTER_FIELDS if name != field]
+    return keys, f"{field}_sort_filter"
+
+async def ensure_indexes():
+    existing = await collection.index_information()
+    for field in SORT_FIELDS:
+        keys, name = sort_index(field)
+        await collection.create_index(keys, name=name)
+        # Superseded: the new index starts with the same (field, _id) keys
+        if f"{field}_sort" in existing:
+            await collection.drop_index(f"{field}_sort")
+    # The scraper upserts on this key
+    await collection.create_index("source_imdb_url", name="source_imdb_url")
+    # Multikey index behind /movies/search (see search.py)
+    await collection.create_index("search_terms", name="search_terms")
+    # Delta sync reads both collections in change order (see changes.py)
+    await collection.create_index("updated_seq", name="updated_seq")
+    await tombstones.create_index("updated_seq", name="updated_seq")
+
+# =====================================================================
+# FIELD PROJECTIONS
+# =====================================================================
+MOVIE_FIELDS = (
+    "title", "year", "director", "poster_url", "plot_summary", "genres", "runtime_minutes",
+    "cast", "imdb_rating", "tomatometer_score", "audience_score", "source_imdb_url",
+    "rotten_tomatoes_url",
+)
+
+# What a movie card in a list view shows
+CARD_FIELDS = ("title", "year", "poster_url", "imdb_rating", "tomatometer_score", "audience_score")
+
+# Fields returned as an empty list rather than null when a document lacks them
+LIST_FIELDS = frozenset(("genres", "cast"))
 
 # =====================================================================
 # THE FULLY UPDATED HELPER FUNCTION
 # =====================================================================
-def movie_helper(movie) -> dict:
+def movie_helper(movie, fields=None) -> dict:
+    """
+    Converts a movie document from the DB to a Python dict with the combined
+    IMDb and Rotten Tomatoes data, ready to be encoded as JSON.
+    When `fields` is given, only those fields (plus "id") are returned.
+    """
+    movie_dict = {"id": str(movie["_id"])}
+    for field in fields or MOVIE_FIELDS:
+        movie_dict[field] = movie.get(field, [] if field in LIST_FIELDS else None)
+    return movie_dict
+
+# =====================================================================
+# FIELD SELECTION
+# =====================================================================
+def parse_fields(fields):
+    """
+    Turns a `fields=` query value ("card" or a comma-separated list of movie
+    fields) into a tuple of field names; None means every field.
+    """
+    if not fields:
+        return None
+    if fields == "card":
+        return CARD_FIELDS
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in MOVIE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def projection_for(fields, *extra):
     """
-    Converts a movie document from the DB to a Python dict.
-    This version is updated to handle the combined IMDb and Rotten Tomatoes data.
+    The MongoDB projection fetching `fields` (every movie field when None)
+    plus any `extra` (e.g. the sort key), so internal fields such as
+    search_terms never leave the database.
     """
-    return {
-        "id": str(movie["_id"]),
-        "title": movie.get("title"),
-        "year": movie.get("year"),
-        "director": movie.get("director"),
-        "poster_url": movie.get("poster_url"),
-        "plot_summary": movie.get("plot_summary"),
-        "genres": movie.get("genres", []),
-        "runtime_minutes": movie.get("runtime_minutes"),
-        "cast": movie.get("cast", []),
-
-        # --- UPDATED & NEW FIELDS ---
-        "imdb_rating": movie.get("imdb_rating"),           # RENAMED from 'rating'
-        "tomatometer_score": movie.get("tomatometer_score"), # NEW field
-        "audience_score": movie.get("audience_score"),       # NEW field
-        
-        "source_imdb_url": movie.get("source_imdb_url"),   # RENAMED from 'source_url'
-        "rotten_tomatoes_url": movie.get("rotten_tomatoes_url") # NEW field
-    }
\ No newline at end of file
+    return {field: 1 for field in (*(fields or MOVIE_FIELDS), *extra)}
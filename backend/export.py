@@ -0,0 +1,155 @@
+# backend/export.py
+
+import csv
+import importlib.util
+import io
+import json
+import zlib
+
+from fastapi import HTTPException
+
+# =====================================================================
+# STREAMING EXPORTERS
+# =====================================================================
+# Each exporter is an async generator that reads the Mongo cursor in batches
+# of `batch_size` documents and yields encoded bytes as soon as a batch is
+# ready, so memory stays flat no matter how many movies are exported.
+
+EXPORT_COLUMNS = [
+    "id", "title", "year", "imdb_rating", "tomatometer_score", "audience_score", "director",
+    "plot_summary", "genres", "runtime_minutes", "cast", "source_imdb_url", "rotten_tomatoes_url",
+]
+
+EXPORT_BATCH_SIZE = 500
+
+
+async def _batches(cursor, batch_size):
+    batch = []
+    async for movie in cursor.batch_size(batch_size):
+        batch.append(movie)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _row(movie):
+    """One flat export row; genres and cast are joined into strings."""
+    return {
+        "id": str(movie["_id"]),
+        "title": movie.get("title"),
+        "year": movie.get("year"),
+        "imdb_rating": movie.get("imdb_rating"),
+        "tomatometer_score": movie.get("tomatometer_score"),
+        "audience_score": movie.get("audience_score"),
+        "director": movie.get("director"),
+        "plot_summary": movie.get("plot_summary"),
+        "genres": ", ".join(movie.get("genres", [])),
+        "runtime_minutes": movie.get("runtime_minutes"),
+        "cast": " | ".join([c.get("actor", "") for c in movie.get("cast", [])]),
+        "source_imdb_url": movie.get("source_imdb_url"),
+        "rotten_tomatoes_url": movie.get("rotten_tomatoes_url"),
+    }
+
+
+async def stream_csv(cursor, batch_size=EXPORT_BATCH_SIZE):
+    stream = io.StringIO()
+    writer = csv.writer(stream, delimiter=';')
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in _batches(cursor, batch_size):
+        for movie in batch:
+            row = _row(movie)
+            writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        yield stream.getvalue().encode()
+        stream.seek(0)
+        stream.truncate()
+    if stream.tell():
+        # Only the header was written (empty export)
+        yield stream.getvalue().encode()
+
+
+async def stream_ndjson(cursor, batch_size=EXPORT_BATCH_SIZE):
+    async for batch in _batches(cursor, batch_size):
+        yield "".join(json.dumps(_row(movie)) + "\n" for movie in batch).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only file that hands back whatever was written since the last drain."""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("id", pa.string()), ("title", pa.string()), ("year", pa.int64()),
+        ("imdb_rating", pa.float64()), ("tomatometer_score", pa.int64()), ("audience_score", pa.int64()),
+        ("director", pa.string()), ("plot_summary", pa.string()), ("genres", pa.string()),
+        ("runtime_minutes", pa.int64()), ("cast", pa.string()), ("source_imdb_url", pa.string()),
+        ("rotten_tomatoes_url", pa.string()),
+    ])
+
+
+async def _stream_arrow(cursor, batch_size, open_writer, write_batch):
+    """Shared body of the Parquet and Arrow exporters: one record batch per Mongo batch."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = open_writer(pa, sink, schema)
+    async for batch in _batches(cursor, batch_size):
+        rows = [_row(movie) for movie in batch]
+        write_batch(writer, pa.RecordBatch.from_pylist(rows, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_parquet(cursor, batch_size=EXPORT_BATCH_SIZE):
+    def open_writer(pa, sink, schema):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema)
+    return _stream_arrow(cursor, batch_size, open_writer, lambda writer, batch: writer.write_batch(batch))
+
+
+def stream_arrow(cursor, batch_size=EXPORT_BATCH_SIZE):
+    def open_writer(pa, sink, schema):
+        return pa.ipc.new_stream(sink, schema)
+    return _stream_arrow(cursor, batch_size, open_writer, lambda writer, batch: writer.write_batch(batch))
+
+
+async def gzip_stream(chunks):
+    """Compresses a byte stream on the fly into a single gzip member."""
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def check_format_available(export_format):
+    """Parquet and Arrow rely on the optional 'pyarrow' package."""
+    if export_format in ("parquet", "arrow") and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet and Arrow exports need the 'pyarrow' package.")
+
+
+# format -> (exporter, media type, file extension)
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv", "csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson", "ndjson"),
+    "parquet": (stream_parquet, "application/vnd.apache.parquet", "parquet"),
+    "arrow": (stream_arrow, "application/vnd.apache.arrow.stream", "arrows"),
+}
@@ -0,0 +1,297 @@
+# backend/jobs.py
+
+import asyncio
+import json
+import os
+import signal
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from .metrics import current_scope
+
+try:
+    import psutil
+except ImportError:  # The platform's own process APIs are used instead
+    psutil = None
+
+# The scraper prints its progress counters on lines starting with this prefix
+# when run with --progress-json (see ScrapeProgress in scraper/scraper.py)
+PROGRESS_PREFIX = "@@progress "
+# stderr shares the pipe, and tqdm redraws its bar with '\r' and no newline,
+# so one "line" can hold many bar updates before the next newline
+OUTPUT_LINE_LIMIT = 1024 * 1024
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPER_SCRIPT = os.path.join(PROJECT_ROOT, "scraper", "scraper.py")
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "interrupted")
+
+# Only one job may hold this lock at a time; a unique sparse index enforces it
+SCRAPER_LOCK = "scraper"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _windows_process(pid):
+    """(alive, start time) of `pid` through OpenProcess, GetExitCodeProcess and GetProcessTimes."""
+    import ctypes
+    from ctypes import wintypes
+
+    PROCESS_QUERY_LIMITED_INFORMATION, STILL_ACTIVE, ERROR_ACCESS_DENIED = 0x1000, 259, 5
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        # Access denied: the process exists but belongs to someone else
+        return ctypes.get_last_error() == ERROR_ACCESS_DENIED, None
+    try:
+        exit_code = wintypes.DWORD()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)) or exit_code.value != STILL_ACTIVE:
+            return False, None
+        created, exited, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        if not kernel32.GetProcessTimes(handle, *(ctypes.byref(t) for t in (created, exited, kernel, user))):
+            return True, None
+        # FILETIME counts 100 ns intervals since 1601-01-01
+        return True, ((created.dwHighDateTime << 32) | created.dwLowDateTime) / 10 ** 7 - 11644473600
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+def _linux_start_time(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field 22 (starttime, in clock ticks since boot); the name in (...) may contain spaces
+            ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+def _process_info(pid):
+    """
+    (alive, start time in seconds since the epoch or None if unknown) of `pid`.
+    Never signals the process: on Windows os.kill(pid, 0) would terminate it.
+    """
+    if not pid:
+        return False, None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return process.status() != psutil.STATUS_ZOMBIE, process.create_time()
+        except psutil.AccessDenied:
+            return True, None
+        except psutil.Error:
+            return False, None
+    if sys.platform == "win32":
+        return _windows_process(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False, None
+    except PermissionError:
+        pass
+    return True, _linux_start_time(pid)
+
+
+def _pid_alive(pid, started=None):
+    """
+    True if `pid` is running and, when its recorded start time `started` is
+    known, is still that process rather than a later one that reused the pid.
+    """
+    alive, current = _process_info(pid)
+    if alive and started is not None and current is not None:
+        return abs(current - started) < 1
+    return alive
+
+
+def job_helper(job) -> dict:
+    return {
+        "id": job["_id"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "progress": job.get("progress", {}),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "return_code": job.get("return_code"),
+        "error": job.get("error"),
+    }
+
+# =====================================================================
+# SCRAPER JOB MANAGER
+# =====================================================================
+class JobManager:
+    """
+    Runs the scraper as a child process and keeps a persisted record of each
+    run in `jobs_collection`: status, stage and the done/failed/cached counters
+    the scraper reports on stdout. A unique index on `lock` makes runs
+    single-flight, even across several API workers.
+    """
+    def __init__(self, jobs_collection, script=SCRAPER_SCRIPT):
+        self.jobs = jobs_collection
+        self.script = script
+        self._processes = {}
+        self._watchers = set()
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index("lock", name="single_flight", unique=True, sparse=True)
+        await self.jobs.create_index([("created_at", -1)], name="created_at")
+
+    async def recover(self):
+        """
+        Marks jobs left active by a previous API process whose scraper is no
+        longer running as interrupted, releasing the lock they held.
+        """
+        async for job in self.jobs.find({"status": {"$in": list(ACTIVE_STATUSES)}}):
+            if job["_id"] not in self._processes and not _pid_alive(job.get("pid"), job.get("pid_started")):
+                await self._finish(job["_id"], "interrupted", error="The API restarted while this job was running.")
+
+    async def start(self):
+        """Creates a job and launches the scraper, or raises 409 if one is already active."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "_id": job_id,
+            "status": "queued",
+            "lock": SCRAPER_LOCK,
+            "stage": None,
+            "progress": {"total": 0, "done": 0, "failed": 0, "cached": 0, "skipped": 0},
+            "created_at": _now(),
+        }
+        try:
+            await self.jobs.insert_one(job)
+        except DuplicateKeyError:
+            active = await self.jobs.find_one({"lock": SCRAPER_LOCK}, {"_id": 1})
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "A scraping job is already running.", "job_id": active["_id"] if active else None},
+            )
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, self.script, "--progress-json",
+                cwd=PROJECT_ROOT,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=OUTPUT_LINE_LIMIT,
+            )
+        except OSError as e:
+            await self._finish(job_id, "failed", error=str(e))
+            raise HTTPException(status_code=500, detail=f"Could not start the scraper: {e}")
+
+        self._processes[job_id] = process
+        await self.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "running", "pid": process.pid, "pid_started": _process_info(process.pid)[1], "started_at": _now()}},
+        )
+        watcher = asyncio.create_task(self._watch(job_id, process))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+        return await self.get(job_id)
+
+    async def _watch(self, job_id, process):
+        """
+        Follows the scraper's output until it exits, then records the outcome.
+        The job is always finished (and the lock released), even if following
+        it fails.
+        """
+        # Outlives the POST /scraper/run request: its queries are background work
+        current_scope.set(None)
+        tail = []
+        return_code = None
+        status, error = "failed", "The API stopped following the scraper."
+        try:
+            async for raw in process.stdout:
+                # The tqdm bar (drawn with '\r', never ended by a newline) is
+                # usually glued in front of the progress text
+                text = raw.decode("utf-8", "replace").rstrip()
+                _, found, payload = text.rpartition(PROGRESS_PREFIX)
+                line = text.rpartition("\r")[2]
+                if found:
+                    try:
+                        progress = json.loads(payload)
+                    except ValueError:
+                        continue
+                    stage = progress.pop("stage", None)
+                    await self.jobs.update_one({"_id": job_id}, {"$set": {"stage": stage, "progress": progress}})
+                elif line:
+                    # Kept for the error message if the run fails
+                    tail = (tail + [line])[-20:]
+            return_code = await process.wait()
+
+            job = await self.jobs.find_one({"_id": job_id}, {"cancel_requested": 1})
+            if job and job.get("cancel_requested"):
+                status, error = "cancelled", None
+            elif return_code == 0:
+                status, error = "succeeded", None
+            else:
+                status, error = "failed", "\n".join(tail) or f"The scraper exited with code {return_code}."
+        except Exception as e:
+            error = f"Lost track of the scraper: {type(e).__name__}: {e}"
+        finally:
+            self._processes.pop(job_id, None)
+            if process.returncode is None:
+                # Nobody would follow it any more, and the lock is about to be released
+                process.terminate()
+                await process.wait()
+            await self._finish(job_id, status, return_code=return_code, error=error)
+
+    async def _finish(self, job_id, status, return_code=None, error=None):
+        await self.jobs.update_one(
+            {"_id": job_id},
+            {
+                "$set": {"status": status, "finished_at": _now(), "return_code": return_code, "error": error},
+                "$unset": {"lock": ""},
+            },
+        )
+
+    async def get(self, job_id):
+        job = await self.jobs.find_one({"_id": job_id})
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+        return job_helper(job)
+
+    async def cancel(self, job_id):
+        """
+        Asks the scraper to stop with SIGTERM; it skips the movies still queued
+        and flushes what it already scraped, after which the job is 'cancelled'.
+        """
+        job = await self.get(job_id)
+        if job["status"] in FINISHED_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job '{job_id}' has already finished ({job['status']}).")
+        await self.jobs.update_one({"_id": job_id}, {"$set": {"cancel_requested": True}})
+        process = self._processes.get(job_id)
+        if process is not None and process.returncode is None:
+            process.terminate()
+        else:
+            # Started by another API worker: signal its process directly
+            record = await self.jobs.find_one({"_id": job_id}, {"pid": 1, "pid_started": 1})
+            if _pid_alive(record.get("pid"), record.get("pid_started")):
+                os.kill(record["pid"], signal.SIGTERM)
+            else:
+                await self._finish(job_id, "cancelled")
+        return await self.get(job_id)
+
+    async def events(self, job_id, interval=1.0):
+        """
+        Yields server-sent events with the job record whenever it changes,
+        ending with the finished record.
+        """
+        last = None
+        while True:
+            job = await self.get(job_id)
+            payload = json.dumps(job, default=str)
+            if payload != last:
+                event = "done" if job["status"] in FINISHED_STATUSES else "progress"
+                yield f"event: {event}\ndata: {payload}\n\n"
+                last = payload
+            if job["status"] in FINISHED_STATUSES:
+                return
+            await asyncio.sleep(interval)
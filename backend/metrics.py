@@ -0,0 +1,182 @@
+# backend/metrics.py
+
+import contextvars
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+
+from pymongo import monitoring
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The ASGI scope of the request being served; Motor copies context variables
+# into its executor threads, so Mongo command events can be tied to a route.
+current_scope = contextvars.ContextVar("current_scope", default=None)
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def route_of(scope):
+    """The route template ('/scraper/jobs/{job_id}') rather than the raw path, to bound label cardinality."""
+    if scope is None:
+        # Startup work and background tasks
+        return "background"
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class Histogram:
+    """Prometheus-style cumulative buckets plus the last samples for percentiles."""
+    def __init__(self, buckets=LATENCY_BUCKETS, samples=1000):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=samples)
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.samples.append(seconds)
+
+    def percentiles(self):
+        if not self.samples:
+            return {"p50_ms": None, "p99_ms": None}
+        ordered = sorted(self.samples)
+        return {
+            "p50_ms": round(statistics.median(ordered) * 1000, 3),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+        }
+
+    def exposition(self, name, **labels):
+        lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in zip(self.buckets, self.counts)]
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {self.count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {self.sum}")
+        lines.append(f"{name}_count{_labels(**labels)} {self.count}")
+        return lines
+
+# =====================================================================
+# API METRICS
+# =====================================================================
+class ApiMetrics:
+    """
+    Request latency per (method, route), response counts per status code and
+    MongoDB command time per (route, command), exported in the Prometheus text
+    format and as a JSON summary since the API started.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.requests = defaultdict(Histogram)
+        self.responses = defaultdict(int)
+        self.commands = defaultdict(Histogram)
+        self.command_failures = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def observe_request(self, method, route, status, seconds):
+        with self._lock:
+            self.requests[(method, route)].observe(seconds)
+            self.responses[(method, route, status)] += 1
+
+    def observe_command(self, route, command, seconds, failed=False):
+        with self._lock:
+            self.commands[(route, command)].observe(seconds)
+            if failed:
+                self.command_failures[(route, command)] += 1
+
+    def prometheus(self, extra=()):
+        lines = [
+            "# HELP api_request_duration_seconds Time to serve a request, per route.",
+            "# TYPE api_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (method, route), histogram in sorted(self.requests.items()):
+                lines += histogram.exposition("api_request_duration_seconds", method=method, route=route)
+            lines += ["# HELP api_responses_total Responses per route and status code.", "# TYPE api_responses_total counter"]
+            for (method, route, status), count in sorted(self.responses.items()):
+                lines.append(f"api_responses_total{_labels(method=method, route=route, status=status)} {count}")
+            lines += [
+                "# HELP api_mongo_command_duration_seconds MongoDB command time, per route and command.",
+                "# TYPE api_mongo_command_duration_seconds histogram",
+            ]
+            for (route, command), histogram in sorted(self.commands.items()):
+                lines += histogram.exposition("api_mongo_command_duration_seconds", route=route, command=command)
+            lines += ["# HELP api_mongo_command_failures_total Failed MongoDB commands.", "# TYPE api_mongo_command_failures_total counter"]
+            for (route, command), count in sorted(self.command_failures.items()):
+                lines.append(f"api_mongo_command_failures_total{_labels(route=route, command=command)} {count}")
+        lines += list(extra)
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        with self._lock:
+            routes = {}
+            for (method, route), histogram in sorted(self.requests.items()):
+                statuses = {
+                    str(status): count for (m, r, status), count in sorted(self.responses.items())
+                    if (m, r) == (method, route)
+                }
+                mongo = {
+                    command: {"count": h.count, "total_ms": round(h.sum * 1000, 3), **h.percentiles()}
+                    for (r, command), h in sorted(self.commands.items()) if r == route
+                }
+                routes[f"{method} {route}"] = {
+                    "count": histogram.count,
+                    **histogram.percentiles(),
+                    "status_codes": statuses,
+                    "mongo": mongo,
+                }
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "routes": routes,
+        }
+
+
+API_METRICS = ApiMetrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request (streamed bodies included)."""
+    def __init__(self, app, metrics=API_METRICS):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_and_record_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            self.metrics.observe_request(scope["method"], route_of(scope), status["code"], time.perf_counter() - start)
+            current_scope.reset(token)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Records the duration of every MongoDB command under the route that issued it."""
+    def __init__(self, metrics=API_METRICS):
+        self.metrics = metrics
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.metrics.observe_command(route_of(current_scope.get()), event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        self.metrics.observe_command(route_of(current_scope.get()), event.command_name, event.duration_micros / 1e6, failed=True)
@@ -0,0 +1,57 @@
+# backend/pagination.py
+
+import base64
+import json
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# =====================================================================
+# OPAQUE KEYSET CURSORS
+# =====================================================================
+# A cursor remembers the sort value and _id of the last movie of a page. The
+# next page starts strictly after that (value, _id) pair, so every page is an
+# index range scan instead of a growing `skip`.
+
+def encode_cursor(movie, sort_key):
+    """`sort_key` is None when pages are ordered by _id alone."""
+    payload = {"v": movie.get(sort_key) if sort_key else None, "id": str(movie["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return payload["v"], ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+
+def keyset_filter(sort_key, direction, cursor):
+    """
+    Returns the query matching every movie after `cursor` in (sort_key, _id)
+    order. MongoDB sorts null/missing values before every number, which puts
+    them at the end of a descending sort and at the start of an ascending one.
+    """
+    value, last_id = decode_cursor(cursor)
+    after = "$lt" if direction == -1 else "$gt"
+
+    if value is None:
+        same_value_after = {sort_key: None, "_id": {after: last_id}}
+        if direction == -1:
+            return same_value_after
+        return {"$or": [same_value_after, {sort_key: {"$ne": None}}]}
+
+    conditions = [
+        {sort_key: {after: value}},
+        {sort_key: value, "_id": {after: last_id}},
+    ]
+    if direction == -1:
+        conditions.append({sort_key: None})
+    return {"$or": conditions}
+
+
+def sort_spec(sort_key, direction):
+    """The sort order matching `keyset_filter`, with _id as the tiebreak."""
+    return [(sort_key, direction), ("_id", direction)]
@@ -0,0 +1,89 @@
+# backend/search.py
+
+import re
+import unicodedata
+
+# =====================================================================
+# SEARCH TERMS
+# =====================================================================
+# Every movie stores a `search_terms` array: the normalized words of its title,
+# director and cast, written by the scraper pipeline (compute_search_terms in
+# scraper/pipeline.py). Search text must be split into words the same way;
+# tests/test_search.py checks that both tokenizers agree. A multikey index on
+# that array turns exact words and anchored prefixes into index range scans.
+
+def tokenize(text):
+    """Lower-cased, accent-free alphanumeric words of `text`."""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def search_query(text):
+    """
+    The Mongo query for a search string: every word but the last must be a full
+    term, the last one may be the start of a term (autocomplete as you type).
+    Returns None when the text has no searchable characters.
+    """
+    words = tokenize(text)
+    if not words:
+        return None
+    # Only [a-z0-9] survives tokenize, so the prefix can never contain regex syntax
+    conditions = [{"search_terms": {"$regex": f"^{words[-1]}"}}]
+    if len(words) > 1:
+        conditions.insert(0, {"search_terms": {"$all": words[:-1]}})
+    return {"$and": conditions}
+
+
+def exact_query(text):
+    """
+    The movies matching every word of the search as a full term: a subset of
+    `search_query`, fetched first so prefix matches can never crowd them out.
+    """
+    words = tokenize(text)
+    if not words:
+        return None
+    return {"search_terms": {"$all": words}}
+
+# =====================================================================
+# RELEVANCE RANKING
+# =====================================================================
+def relevance(movie, text, exact=False):
+    """
+    Scores a candidate: the whole title matching beats a title prefix, which
+    beats title words, which beat director and then cast matches. A movie
+    matching every word as a full term (`exact`, as found by `exact_query`)
+    outranks any match on the start of the last word only.
+    """
+    words = tokenize(text)
+    phrase = " ".join(words)
+    title = " ".join(tokenize(movie.get("title")))
+
+    def matches(field_words):
+        return all(word in field_words for word in words[:-1]) and any(
+            field_word.startswith(words[-1]) for field_word in field_words
+        )
+
+    if title == phrase:
+        score = 100
+    elif title.startswith(phrase):
+        score = 80
+    elif matches(title.split()):
+        score = 60
+    elif matches(tokenize(movie.get("director"))):
+        score = 40
+    else:
+        score = 20
+    return score + (100 if exact else 0)
+
+
+def rank(movies, text, exact_ids=()):
+    """
+    Most relevant first; equally relevant movies by IMDb rating. `exact_ids`
+    are the _ids of the candidates that matched `exact_query`.
+    """
+    exact_ids = set(exact_ids)
+    return sorted(
+        movies,
+        key=lambda movie: (relevance(movie, text, movie.get("_id") in exact_ids), movie.get("imdb_rating") or 0),
+        reverse=True,
+    )
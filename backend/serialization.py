@@ -0,0 +1,80 @@
+# backend/serialization.py
+
+import json
+from typing import List, Optional, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # The standard library is used instead (slower on large pages)
+    orjson = None
+
+# =====================================================================
+# RESPONSE MODELS
+# =====================================================================
+# They document the shape of every movie response in the OpenAPI schema.
+# Rows are built by `movie_helper` from projected documents and serialized
+# as they are: validating each row through these models would cost more than
+# the serialization itself (see `python -m backend.benchmark serialize`).
+# The endpoints therefore list them under `responses=` rather than as a
+# `response_model`, which FastAPI skips anyway for the prebuilt responses of
+# the response cache; tests/test_serialization.py checks the shapes agree.
+
+class CastMember(BaseModel):
+    actor: Optional[str] = None
+    character: Optional[str] = None
+
+
+class MovieSummary(BaseModel):
+    """The compact list view (`fields=card`): what a movie card shows."""
+    id: str
+    title: Optional[str] = None
+    year: Optional[int] = None
+    poster_url: Optional[str] = None
+    imdb_rating: Optional[float] = None
+    tomatometer_score: Optional[int] = None
+    audience_score: Optional[int] = None
+
+
+class MovieDetail(MovieSummary):
+    """The full detail view (the default)."""
+    director: Optional[str] = None
+    plot_summary: Optional[str] = None
+    genres: List[str] = []
+    runtime_minutes: Optional[int] = None
+    cast: List[CastMember] = []
+    source_imdb_url: Optional[str] = None
+    rotten_tomatoes_url: Optional[str] = None
+
+
+class MoviePage(BaseModel):
+    movies: List[Union[MovieDetail, MovieSummary]]
+    next_cursor: Optional[str] = None
+
+
+class MovieChanges(BaseModel):
+    """What changed since a sync token: new or updated movies and the ids of deleted ones."""
+    upserts: List[Union[MovieDetail, MovieSummary]]
+    deleted: List[str]
+    next_token: str
+    has_more: bool
+
+# =====================================================================
+# JSON ENCODING
+# =====================================================================
+def dumps(content) -> bytes:
+    """
+    Encodes `content` as JSON bytes with orjson when it is installed.
+    ObjectIds and any other unknown type are written as strings.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=str, separators=(",", ":")).encode()
+
+
+class ORJSONResponse(JSONResponse):
+    """The API's default response class: JSONResponse rendered with `dumps`."""
+    def render(self, content) -> bytes:
+        return dumps(content)
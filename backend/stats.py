@@ -0,0 +1,107 @@
+# backend/stats.py
+
+from fastapi import HTTPException
+
+# =====================================================================
+# DASHBOARD STATISTICS
+# =====================================================================
+# Everything the dashboard's summary cards and charts need, computed by one
+# $facet aggregation in MongoDB instead of in the browser over the full list.
+
+DEFAULT_IMDB_BINS = (7, 7.5, 8, 8.5, 9, 10)
+DEFAULT_RT_BINS = (0, 60, 70, 80, 90, 100)
+
+
+def parse_bins(bins, default):
+    """Turns "7,7.5,8" into an increasing tuple of at least two edges."""
+    if not bins:
+        return default
+    try:
+        edges = tuple(float(edge) for edge in bins.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid bin edges: '{bins}'")
+    if len(edges) < 2 or any(low >= high for low, high in zip(edges, edges[1:])):
+        raise HTTPException(status_code=400, detail="Bin edges must be at least two increasing numbers.")
+    return edges
+
+
+def _histogram_stage(field, edges):
+    """
+    Counts `field` per [edge, next edge) bin; the last bin also includes its
+    upper edge, like the dashboard's "9-10" bin.
+    """
+    boundaries = list(edges[:-1]) + [edges[-1] + 1e-9]
+    return [
+        {"$match": {field: {"$gte": edges[0], "$lte": edges[-1]}}},
+        {"$bucket": {"groupBy": f"${field}", "boundaries": boundaries, "output": {"count": {"$sum": 1}}}},
+    ]
+
+
+def _format_histogram(buckets, edges):
+    counts = {bucket["_id"]: bucket["count"] for bucket in buckets}
+    return [
+        {"name": f"{low:g}-{high:g}", "min": low, "max": high, "count": counts.get(low, 0)}
+        for low, high in zip(edges, edges[1:])
+    ]
+
+
+def stats_pipeline(query, imdb_bins, rt_bins, scatter_points):
+    return [
+        {"$match": query},
+        {"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "avg_imdb": {"$avg": "$imdb_rating"},
+                "avg_tomatometer": {"$avg": "$tomatometer_score"},
+                "avg_audience": {"$avg": "$audience_score"},
+            }}],
+            "imdb_histogram": _histogram_stage("imdb_rating", imdb_bins),
+            "tomatometer_histogram": _histogram_stage("tomatometer_score", rt_bins),
+            "genres": [
+                {"$unwind": "$genres"},
+                {"$group": {"_id": "$genres", "count": {"$sum": 1}, "avg_imdb": {"$avg": "$imdb_rating"}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ],
+            "decades": [
+                {"$match": {"year": {"$type": "number"}}},
+                {"$group": {
+                    "_id": {"$subtract": ["$year", {"$mod": ["$year", 10]}]},
+                    "count": {"$sum": 1},
+                    "avg_imdb": {"$avg": "$imdb_rating"},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            # Downsampled: the chart only needs its shape, not every movie
+            "scatter": [
+                {"$match": {"imdb_rating": {"$ne": None}, "tomatometer_score": {"$ne": None}}},
+                {"$sample": {"size": scatter_points}},
+                {"$project": {"_id": 0, "name": "$title", "imdb": "$imdb_rating", "rt": "$tomatometer_score"}},
+            ],
+        }},
+    ]
+
+
+def _round(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+def format_stats(result, imdb_bins, rt_bins):
+    summary = result["summary"][0] if result["summary"] else {}
+    return {
+        "total": summary.get("total", 0),
+        "avg_imdb": _round(summary.get("avg_imdb")),
+        "avg_tomatometer": _round(summary.get("avg_tomatometer")),
+        "avg_audience": _round(summary.get("avg_audience")),
+        "imdb_histogram": _format_histogram(result["imdb_histogram"], imdb_bins),
+        "tomatometer_histogram": _format_histogram(result["tomatometer_histogram"], rt_bins),
+        "genres": [
+            {"genre": row["_id"], "count": row["count"], "avg_imdb": _round(row["avg_imdb"])}
+            for row in result["genres"]
+        ],
+        "decades": [
+            {"decade": int(row["_id"]), "count": row["count"], "avg_imdb": _round(row["avg_imdb"])}
+            for row in result["decades"]
+        ],
+        "scatter": result["scatter"],
+    }
@@ -9,7 +9,7 @@ const sortOptions = [
   { value: 'runtime_minutes', label: 'Runtime' },
   { value: 'discrepancy', label: 'Rating Discrepancy' },
 ];
-import { getMovies, searchMovies } from './services/api';
+import { getMovie, getMovies, getStats, searchMovies } from './services/api';
 import Navbar from './components/Navbar';
 import HeroSection from './components/HeroSection';
 import Charts from './components/Charts';
@@ -17,20 +17,34 @@ import MovieCard from './components/MovieCard';
 import MovieDetailModal from './components/MovieDetailModal';
 import Footer from './components/Footer';
 import SummaryStats from './components/SummaryStats';
+import ScraperJobPanel from './components/ScraperJobPanel';
 
 const PAGE_SIZE = 24;
 
 const API_BASE = "http://localhost:8000";
 
+// Drops empty filters so they don't get sent to the API
+const cleanFilters = (filters) => {
+  const effectiveFilters = { ...filters };
+  Object.keys(effectiveFilters).forEach(key => {
+    if (effectiveFilters[key] === '' || effectiveFilters[key] === null) {
+      delete effectiveFilters[key];
+    }
+  });
+  return effectiveFilters;
+};
+
 function App() {
-  const [allMovies, setAllMovies] = useState([]);
-  const [visibleMovies, setVisibleMovies] = useState([]);
+  const [movies, setMovies] = useState([]);
+  const [stats, setStats] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
-  const [canLoadMore, setCanLoadMore] = useState(true);
+  const [heroMovie, setHeroMovie] = useState(null);
   const [selectedMovie, setSelectedMovie] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
-  const [filters, setFilters] = useState({ limit: 250, sort_by: 'imdb_rating', order: 'desc', min_rating: '', min_year: '', title: '' });
+  const [filters, setFilters] = useState({ limit: PAGE_SIZE, sort_by: 'imdb_rating', order: 'desc', min_rating: '', min_year: '', title: '' });
 
   const handleOpenModal = (movie) => { setSelectedMovie(movie); setIsModalOpen(true); };
   const handleCloseModal = () => setIsModalOpen(false);
@@ -38,34 +52,36 @@ function App() {
   const fetchMovies = useCallback(async () => {
     try {
       setLoading(true); setError(null);
-      let response;
-      const effectiveFilters = { ...filters }; // Create a copy of filters
-      
+      const effectiveFilters = cleanFilters(filters);
+      const { title } = effectiveFilters;
+      // Summary cards and charts come pre-aggregated from the server, for the
+      // same movies as the list: the search results (which ignore the other
+      // filters) while searching, the filtered catalogue otherwise
+      const statsFilters = title ? { title } : { ...effectiveFilters };
+      delete statsFilters.limit;
+
+      const statsRequest = getStats(statsFilters);
+
       // Use search endpoint if title is present, otherwise use filter endpoint
-      if (effectiveFilters.title) {
-        response = await searchMovies(effectiveFilters.title);
+      if (title) {
+        const response = await searchMovies(title);
+        setMovies(response.data);
+        setNextCursor(null);
       } else {
-        // Remove empty filters so they don't get sent to the API
-        Object.keys(effectiveFilters).forEach(key => {
-          if (effectiveFilters[key] === '' || effectiveFilters[key] === null) {
-            delete effectiveFilters[key];
-          }
-        });
-        response = await getMovies(effectiveFilters);
+        const response = await getMovies(effectiveFilters);
+        setMovies(response.data.movies);
+        setNextCursor(response.data.next_cursor);
       }
-      
-      const fetchedMovies = response.data;
-      setAllMovies(fetchedMovies);
-      setVisibleMovies(fetchedMovies.slice(0, PAGE_SIZE));
-      setCanLoadMore(fetchedMovies.length > PAGE_SIZE);
+      setStats((await statsRequest).data);
 
     } catch (err) {
       const errorMsg = err.response?.status === 404 
         ? 'No movies found matching your criteria.' 
         : 'Could not fetch movies. Is the backend server running?';
       setError(errorMsg);
-      setAllMovies([]);
-      setVisibleMovies([]);
+      setMovies([]);
+      setStats(null);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
@@ -76,12 +92,29 @@ function App() {
     return () => clearTimeout(handler);
   }, [fetchMovies]);
 
-  const handleLoadMore = () => {
-    const currentLength = visibleMovies.length;
-    const nextMovies = allMovies.slice(currentLength, currentLength + PAGE_SIZE);
-    setVisibleMovies(prev => [...prev, ...nextMovies]);
-    if (currentLength + PAGE_SIZE >= allMovies.length) {
-      setCanLoadMore(false);
+  // The list only carries card fields; the hero also shows the plot, so it
+  // gets the first movie's full document
+  const heroId = movies[0]?.id;
+  useEffect(() => {
+    if (!heroId) { setHeroMovie(null); return; }
+    let cancelled = false;
+    getMovie(heroId)
+      .then(response => { if (!cancelled) setHeroMovie(response.data); })
+      .catch(() => { if (!cancelled) setHeroMovie(null); });
+    return () => { cancelled = true; };
+  }, [heroId]);
+
+  // Fetches the next page from the server with the cursor of the previous one
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await getMovies({ ...cleanFilters(filters), cursor: nextCursor });
+      setMovies(prev => [...prev, ...response.data.movies]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError('Could not fetch movies. Is the backend server running?');
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -89,16 +122,18 @@ function App() {
 
   return (
     <Box sx={{ display: 'flex', flexDirection: 'column', minHeight: '100vh', bgcolor: 'background.default' }}>
-      <Navbar filters={filters} setFilters={setFilters} movies={allMovies} />
+      <Navbar filters={filters} setFilters={setFilters} canExport={stats?.total > 0} />
 
       <Box component="main" sx={{ flexGrow: 1 }}>
         <Container maxWidth={false} sx={{ py: 4, px: 4 }}>
           
-          {!loading && allMovies.length > 0 && <HeroSection movie={allMovies[0]} onClick={() => handleOpenModal(allMovies[0])} />}
+          <ScraperJobPanel onFinished={fetchMovies} />
+
+          {!loading && movies.length > 0 && <HeroSection movie={heroMovie?.id === heroId ? heroMovie : movies[0]} onClick={() => handleOpenModal(movies[0])} />}
           
           {/* Charts are now part of the main flow */}
-          {!loading && allMovies.length > 0 && <SummaryStats movies={allMovies} />}
-          {!loading && allMovies.length > 0 && <Charts movies={allMovies} />}
+          {!loading && stats && stats.total > 0 && <SummaryStats stats={stats} searchTitle={filters.title} />}
+          {!loading && stats && stats.total > 0 && <Charts stats={stats} />}
            
 
           {/* Sort and order controls above the movie grid */}
@@ -156,16 +191,16 @@ function App() {
           ) : (
             <>
               <Grid container spacing={3} justifyContent="center">
-                {visibleMovies.map(movie => (
+                {movies.map(movie => (
                   <Grid key={movie.id} xs={12} sm={6} md={4} lg={3} xl={2.4}>
                     <MovieCard movie={movie} onClick={() => handleOpenModal(movie)} />
                   </Grid>
                 ))}
               </Grid>
               
-              {canLoadMore && (
+              {nextCursor && (
                 <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}>
-                  <Button variant="contained" onClick={handleLoadMore}>Load More</Button>
+                  <Button variant="contained" onClick={handleLoadMore} disabled={loadingMore}>Load More</Button>
                 </Box>
               )}
             </>
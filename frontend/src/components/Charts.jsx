@@ -7,46 +7,18 @@ import {
   ScatterChart, Scatter, ZAxis
 } from 'recharts';
 
-// (The data processing functions at the top of the file do not need to change)
-const processScatterData = (movies) => {
-  if (!movies) return [];
-  return movies
-    .filter(movie => movie.imdb_rating && movie.tomatometer_score)
-    .map(movie => ({
-      name: movie.title,
-      imdb: movie.imdb_rating,
-      rt: movie.tomatometer_score,
-    }));
-};
-
-const processHistogramData = (movies) => {
-    if (!movies) return [];
-    const ratings = movies.map(m => m.imdb_rating).filter(r => r);
-    const bins = [
-        { name: '7-7.4', count: 0 }, { name: '7.5-7.9', count: 0 },
-        { name: '8-8.4', count: 0 }, { name: '8.5-8.9', count: 0 },
-        { name: '9-10', count: 0 },
-    ];
-    ratings.forEach(rating => {
-        if (rating >= 7 && rating < 7.5) bins[0].count++;
-        else if (rating >= 7.5 && rating < 8) bins[1].count++;
-        else if (rating >= 8 && rating < 8.5) bins[2].count++;
-        else if (rating >= 8.5 && rating < 9) bins[3].count++;
-        else if (rating >= 9 && rating <= 10) bins[4].count++;
-    });
-    return bins;
-};
-
+// The histogram bins and the (downsampled) scatter points are computed by the
+// /stats endpoint, so the charts no longer need the full movie list.
 
 // --- The Main Chart Component ---
-function Charts({ movies }) {
+function Charts({ stats }) {
   // Return early if there are no movies to prevent errors
-  if (!movies || movies.length === 0) {
+  if (!stats || stats.total === 0) {
     return null;
   }
 
-  const scatterData = processScatterData(movies);
-  const histogramData = processHistogramData(movies);
+  const scatterData = stats.scatter;
+  const histogramData = stats.imdb_histogram;
 
   // The ultimate NaN fix: Don't render charts until the processed data is ready.
   const canRenderCharts = scatterData.length > 0 && histogramData.length > 0;
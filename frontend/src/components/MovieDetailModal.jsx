@@ -1,10 +1,11 @@
 // src/components/MovieDetailModal.jsx
  
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import {
-  Modal, Box, Typography, List, ListItem, ListItemText, Chip, Divider, IconButton
+  Modal, Box, Typography, List, ListItem, ListItemText, Chip, Divider, IconButton, CircularProgress
 } from '@mui/material';
 import CloseIcon from '@mui/icons-material/Close';
+import { getMovie } from '../services/api';
  
 // Style for the modal box
 const style = {
@@ -22,10 +23,30 @@ const style = {
   overflowY: 'auto'
 };
  
-function MovieDetailModal({ movie, open, handleClose }) {
-  if (!movie) {
+// `movie` is the card that was clicked (list views only load card fields);
+// every other field is fetched from /movies/{id} when the modal opens
+function MovieDetailModal({ movie: card, open, handleClose }) {
+  const [details, setDetails] = useState(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    if (!open || !card?.id) return;
+    let cancelled = false;
+    setDetails(null);
+    setError(null);
+    setLoading(true);
+    getMovie(card.id)
+      .then(response => { if (!cancelled) setDetails(response.data); })
+      .catch(() => { if (!cancelled) setError('Could not load the movie details.'); })
+      .finally(() => { if (!cancelled) setLoading(false); });
+    return () => { cancelled = true; };
+  }, [open, card?.id]);
+
+  if (!card) {
     return null;
   }
+  const movie = details || card;
  
   return (
     <Modal
@@ -51,6 +72,15 @@ function MovieDetailModal({ movie, open, handleClose }) {
           {movie.title} ({movie.year})
         </Typography>
        
+        {loading && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', my: 2 }}>
+            <CircularProgress size={32} />
+          </Box>
+        )}
+        {error && (
+          <Typography color="error" sx={{ mb: 2 }}>{error}</Typography>
+        )}
+
         <Typography variant="body1" sx={{ mb: 2 }}>
           {movie.plot_summary}
         </Typography>
@@ -58,15 +88,15 @@ function MovieDetailModal({ movie, open, handleClose }) {
         <Divider sx={{ my: 2 }} />
  
         <Box sx={{ display: 'flex', flexWrap: 'wrap', gap: 1, mb: 2 }}>
-          {movie.genres.map(genre => <Chip key={genre} label={genre} />)}
+          {(movie.genres || []).map(genre => <Chip key={genre} label={genre} />)}
         </Box>
        
         <List dense>
             <ListItem>
-                <ListItemText primary="Director" secondary={movie.director} />
+                <ListItemText primary="Director" secondary={movie.director || 'N/A'} />
             </ListItem>
             <ListItem>
-                <ListItemText primary="Runtime" secondary={`${movie.runtime_minutes} minutes`} />
+                <ListItemText primary="Runtime" secondary={movie.runtime_minutes ? `${movie.runtime_minutes} minutes` : 'N/A'} />
             </ListItem>
             <ListItem>
                 <ListItemText primary="IMDb Rating" secondary={movie.imdb_rating} />
@@ -82,7 +112,7 @@ function MovieDetailModal({ movie, open, handleClose }) {
         <Divider sx={{ my: 2 }}>Cast</Divider>
        
         <List dense>
-            {movie.cast.map((member, index) => (
+            {(movie.cast || []).map((member, index) => (
                 <ListItem key={index}>
                     <ListItemText primary={member.actor} secondary={member.character} />
                 </ListItem>
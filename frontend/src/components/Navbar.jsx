@@ -6,6 +6,7 @@ import React, { useState, useEffect } from 'react';
 import { AppBar, Toolbar, Box, Grid, TextField, MenuItem, FormControl, InputLabel, Select, Typography, Button } from '@mui/material';
 import TheatersIcon from '@mui/icons-material/Theaters';
 import DownloadIcon from '@mui/icons-material/Download';
+import { getExportUrl } from '../services/api';
 
 const sortOptions = [
   { value: 'imdb_rating', label: 'IMDb Rating' },
@@ -15,9 +16,8 @@ const sortOptions = [
   { value: 'discrepancy', label: 'Rating Discrepancy' },
 ];
 
-// --- STEP 1: ADD `movies` TO PROPS ---
-// The component now needs the movies data to export it.
-function Navbar({ filters, setFilters, movies }) {
+// `canExport` is false while there is nothing to export.
+function Navbar({ filters, setFilters, canExport }) {
 
   // --- Debouncing logic from the first component (no changes needed here) ---
   const [localFilters, setLocalFilters] = useState({
@@ -51,42 +51,16 @@ function Navbar({ filters, setFilters, movies }) {
     }));
   };
 
-  // --- STEP 2: PASTE THE CSV EXPORT FUNCTION ---
-  // This is the exact function from your second Navbar.
+  // --- CSV EXPORT ---
+  // The server streams the whole filtered collection, not just the loaded page.
+  // While searching, it exports the search results (like the list, without the other filters).
   const handleExportCSV = () => {
-    if (!movies || movies.length === 0) return;
-    const headers = [
-      "id", "title", "year", "imdb_rating", "tomatometer_score", "audience_score", "director", "plot_summary", "genres", "runtime_minutes", "cast", "source_imdb_url", "rotten_tomatoes_url"
-    ];
-    const csvRows = [headers.join(",")];
-    movies.forEach(movie => {
-      const row = [
-        movie.id,
-        '"' + (movie.title || '').replace(/"/g, '""') + '"',
-        movie.year,
-        movie.imdb_rating,
-        movie.tomatometer_score,
-        movie.audience_score,
-        '"' + (movie.director || '').replace(/"/g, '""') + '"',
-        '"' + (movie.plot_summary || '').replace(/"/g, '""') + '"',
-        '"' + (Array.isArray(movie.genres) ? movie.genres.join('; ') : '') + '"',
-        movie.runtime_minutes,
-        '"' + (Array.isArray(movie.cast) ? movie.cast.map(c => `${c.actor} (${c.character})`).join('; ') : '') + '"',
-        movie.source_imdb_url,
-        movie.rotten_tomatoes_url
-      ];
-      csvRows.push(row.map(v => v === undefined ? '' : v).join(","));
+    const params = {};
+    const keys = filters.title ? ['title', 'sort_by', 'order'] : ['min_rating', 'min_year', 'sort_by', 'order'];
+    keys.forEach(key => {
+      if (filters[key] !== '' && filters[key] !== null && filters[key] !== undefined) params[key] = filters[key];
     });
-    const csvString = csvRows.join("\n");
-    const blob = new Blob([csvString], { type: 'text/csv' });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = 'movies.csv';
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    URL.revokeObjectURL(url);
+    window.location.href = getExportUrl(params);
   };
 
   return (
@@ -115,7 +89,7 @@ function Navbar({ filters, setFilters, movies }) {
                   variant="outlined"
                   startIcon={<DownloadIcon />}
                   onClick={handleExportCSV}
-                  disabled={!movies || movies.length === 0}
+                  disabled={!canExport}
                   sx={{ whiteSpace: 'nowrap' }}
                 >
                   Export CSV
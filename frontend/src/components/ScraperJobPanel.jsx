@@ -0,0 +1,92 @@
+// src/components/ScraperJobPanel.jsx
+
+import React, { useState, useEffect } from 'react';
+import { Box, Button, LinearProgress, Paper, Typography } from '@mui/material';
+import { startScraperJob, cancelScraperJob, getJobEventsUrl } from '../services/api';
+
+const FINISHED_STATUSES = ['succeeded', 'failed', 'cancelled', 'interrupted'];
+
+// Movies handled so far (scraped, failed, unchanged or skipped) out of the total
+const progressPercent = (progress) => {
+  if (!progress || !progress.total) return 0;
+  const handled = (progress.done || 0) + (progress.failed || 0) + (progress.cached || 0) + (progress.skipped || 0);
+  return Math.min(100, (handled / progress.total) * 100);
+};
+
+// Starts the scraper through the API and follows its progress over server-sent
+// events. `onFinished` is called once a job ends, to reload the movies.
+function ScraperJobPanel({ onFinished }) {
+  const [job, setJob] = useState(null);
+  const [error, setError] = useState(null);
+
+  const jobId = job?.id;
+  const running = job && !FINISHED_STATUSES.includes(job.status);
+
+  useEffect(() => {
+    if (!jobId) return undefined;
+    const events = new EventSource(getJobEventsUrl(jobId));
+    events.addEventListener('progress', (event) => setJob(JSON.parse(event.data)));
+    events.addEventListener('done', (event) => {
+      setJob(JSON.parse(event.data));
+      events.close();
+      if (onFinished) onFinished();
+    });
+    events.onerror = () => {
+      // The browser reconnects by itself; only give up once the stream is closed
+      if (events.readyState === EventSource.CLOSED) setError('Lost the connection to the scraping job.');
+    };
+    return () => events.close();
+  }, [jobId, onFinished]);
+
+  const handleStart = async () => {
+    setError(null);
+    try {
+      const response = await startScraperJob();
+      setJob(response.data);
+    } catch (err) {
+      const detail = err.response?.data?.detail;
+      if (err.response?.status === 409 && detail?.job_id) {
+        // Another job is already running: follow that one
+        setJob({ id: detail.job_id, status: 'running' });
+      } else {
+        setError('Could not start the scraper.');
+      }
+    }
+  };
+
+  const handleCancel = async () => {
+    try {
+      await cancelScraperJob(jobId);
+    } catch (err) {
+      setError('Could not cancel the scraping job.');
+    }
+  };
+
+  const progress = job?.progress;
+
+  return (
+    <Paper elevation={1} sx={{ p: 2, mb: 3 }}>
+      <Box sx={{ display: 'flex', alignItems: 'center', gap: 2, flexWrap: 'wrap' }}>
+        <Button variant="contained" onClick={handleStart} disabled={running}>Run scraper</Button>
+        {running && <Button variant="outlined" color="warning" onClick={handleCancel}>Cancel</Button>}
+        {job && (
+          <Typography variant="body2" color="text.secondary">
+            {running
+              ? `${job.stage || 'starting'}: ${progress?.done || 0} scraped, ${progress?.cached || 0} unchanged, ${progress?.failed || 0} failed of ${progress?.total || '?'}`
+              : `Last job ${job.status}${job.error ? `: ${job.error.split('\n').pop()}` : ''}`}
+          </Typography>
+        )}
+        {error && <Typography variant="body2" color="error">{error}</Typography>}
+      </Box>
+      {running && (
+        <LinearProgress
+          sx={{ mt: 2 }}
+          variant={progress?.total ? 'determinate' : 'indeterminate'}
+          value={progressPercent(progress)}
+        />
+      )}
+    </Paper>
+  );
+}
+
+export default ScraperJobPanel;
@@ -3,22 +3,16 @@
 import React from 'react';
 import { Box, Grid, Paper, Typography } from '@mui/material';
 
-// Helper function to calculate stats
-const calculateStats = (movies) => {
-  if (!movies || movies.length === 0) {
+// Formats the aggregates returned by the /stats endpoint for the cards
+const formatStats = (stats) => {
+  if (!stats || stats.total === 0) {
     return { total: 0, avgImdb: 0, avgRt: 0 };
   }
 
-  const imdbRatings = movies.map(m => m.imdb_rating).filter(r => r !== null && r !== undefined);
-  const rtScores = movies.map(m => m.tomatometer_score).filter(s => s !== null && s !== undefined);
-
-  const avgImdb = imdbRatings.reduce((a, b) => a + b, 0) / imdbRatings.length;
-  const avgRt = rtScores.reduce((a, b) => a + b, 0) / rtScores.length;
-
   return {
-    total: movies.length,
-    avgImdb: avgImdb.toFixed(2), // Format to 2 decimal places
-    avgRt: Math.round(avgRt),    // Round to nearest whole number
+    total: stats.total,
+    avgImdb: stats.avg_imdb !== null ? stats.avg_imdb.toFixed(2) : '-', // Format to 2 decimal places
+    avgRt: stats.avg_tomatometer !== null ? Math.round(stats.avg_tomatometer) : '-', // Round to nearest whole number
   };
 };
 
@@ -32,11 +26,17 @@ function StatCard({ title, value }) {
   );
 }
 
-function SummaryStats({ movies }) {
-  const stats = calculateStats(movies);
+// `searchTitle` labels the aggregates while a title search is active
+function SummaryStats({ stats: rawStats, searchTitle }) {
+  const stats = formatStats(rawStats);
 
   return (
     <Box sx={{ my: 4 }}>
+      {searchTitle && (
+        <Typography variant="subtitle1" color="text.secondary" align="center" sx={{ mb: 2 }}>
+          Statistics for all movies matching "{searchTitle}"
+        </Typography>
+      )}
       <Grid container spacing={3} justifyContent="center">
         <Grid item xs={12} sm={4}>
           <StatCard title="Total Movies" value={stats.total} />
@@ -26,7 +26,8 @@ export const useMovies = (filters) => {
         ? await searchMovies(effectiveFilters.title)
         : await getMovies(effectiveFilters);
      
-      const fetchedMovies = response.data;
+      // /movies/filter returns one page ({ movies, next_cursor }); search returns a list
+      const fetchedMovies = Array.isArray(response.data) ? response.data : response.data.movies;
       setAllMovies(fetchedMovies);
       setVisibleMovies(fetchedMovies.slice(0, PAGE_SIZE));
       setCanLoadMore(fetchedMovies.length > PAGE_SIZE);
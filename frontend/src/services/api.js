@@ -8,12 +8,45 @@ const apiClient = axios.create({
   }
 });
 
-// Function to get a list of movies with filters
+// List views only need what a movie card shows; the modal fetches the rest with getMovie
+const CARD_FIELDS = 'card';
+
+// Function to get a page of movies with filters: { movies, next_cursor }
 export const getMovies = (params) => {
-  return apiClient.get('/movies/filter', { params });
+  return apiClient.get('/movies/filter', { params: { fields: CARD_FIELDS, ...params } });
 };
 
 // Function to search for movies by title
 export const searchMovies = (title) => {
-  return apiClient.get('/movies/search', { params: { title } });
-};
\ No newline at end of file
+  return apiClient.get('/movies/search', { params: { title, fields: CARD_FIELDS } });
+};
+
+// Function to get every field of one movie (plot, genres, cast...)
+export const getMovie = (id) => {
+  return apiClient.get(`/movies/${id}`);
+};
+
+// Function to get aggregate statistics (averages, histograms...) for the same filters
+export const getStats = (params) => {
+  return apiClient.get('/stats', { params });
+};
+
+// URL of the server-side streaming CSV export for the given filters
+export const getExportUrl = (params) => {
+  const query = new URLSearchParams(params).toString();
+  return `${apiClient.defaults.baseURL}/export/csv${query ? `?${query}` : ''}`;
+};
+
+// Starts a scraping job; a 409 carries the id of the job already running
+export const startScraperJob = () => {
+  return apiClient.post('/scraper/run');
+};
+
+export const cancelScraperJob = (jobId) => {
+  return apiClient.post(`/scraper/jobs/${jobId}/cancel`);
+};
+
+// URL of a job's server-sent progress events ("progress", then one "done")
+export const getJobEventsUrl = (jobId) => {
+  return `${apiClient.defaults.baseURL}/scraper/jobs/${jobId}/events`;
+};
@@ -0,0 +1,823 @@
+# scraper/benchmark.py
+#
+# Compares the old sequential scraping loop with the concurrent engine against a
+# local stub HTTP server, so no request ever reaches IMDb or Rotten Tomatoes.
+#
+#   python scraper/benchmark.py --movies 20 --latency 0.3
+#
+# With --discovery it instead compares the time and memory of the HTTP and
+# Selenium URL-discovery backends on a real list page:
+#
+#   python scraper/benchmark.py --discovery https://www.imdb.com/chart/top/
+#
+# With --parsers it micro-benchmarks the original BeautifulSoup parsers against
+# the lxml field-spec parsers, on saved pages (imdb_*.html / rt_*.html) when a
+# directory is given and on the stub pages otherwise:
+#
+#   python scraper/benchmark.py --parsers path/to/saved/pages
+#
+# With --queue it shares one run between several worker processes through the
+# MongoDB work queue (scratch collections, needs MONGO_URI). Every tenth stub
+# movie fails so retries and dead-lettering are exercised, and --kill-one
+# kills a worker mid-run to show its leased URLs being picked up again:
+#
+#   python scraper/benchmark.py --queue 3 --movies 60 --kill-one
+#
+# With --faults it injects failures into the stub server (transient 503s, 429s
+# with Retry-After when RT is crowded, an RT outage that never answers) and
+# compares the old single-attempt fetching with retries, adaptive per-host
+# concurrency and the circuit breaker:
+#
+#   python scraper/benchmark.py --faults throttle --movies 30
+#
+# With --record / --replay it builds the offline baseline: --record scrapes a
+# few movies live and saves every response into a fixture archive; --replay
+# runs the whole pipeline against a local server serving that archive and
+# reports pages/sec, per-stage p50/p99, parse CPU vs fetch wait, peak RSS and
+# (with --mongo) Mongo write throughput. Each replay is appended to
+# benchmark_history.jsonl and compared with the previous run of the same
+# archive and settings:
+#
+#   python scraper/benchmark.py --record top250.zip --movies 50
+#   python scraper/benchmark.py --replay top250.zip --latency 0.2 --error-rate 0.05
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from bs4 import BeautifulSoup
+
+import scraper
+from throttle import HostLimiter, RetryPolicy
+from metrics import RunMetrics
+from cache import ResponseCache, LookupCache
+from replay import FixtureArchive, ReplayServer, recording_fetch, replay_session
+
+IMDB_PAGE = """<html><body>
+<h1>Stub Movie {n}</h1>
+<ul><li><a>1994</a></li><li>2h 22m</li></ul>
+<div data-testid="hero-rating-bar__aggregate-rating__score"><span>9.3</span></div>
+<li data-testid="title-pc-principal-credit"><a>Stub Director</a></li>
+<div data-testid="hero-media__poster"><img src="http://example.com/{n}.jpg"></div>
+<span data-testid="plot-l">A plot summary.</span>
+<div data-testid="genres"><a>Drama</a></div>
+<div data-testid="title-cast-item">
+  <a data-testid="title-cast-item__actor">Actor {n}</a>
+  <a data-testid="cast-item-character-name">Character {n}</a>
+</div>
+</body></html>"""
+
+STUB_LIST_SIZE = 50
+
+RT_PAGE = """<html><body><search-page-result>
+<search-page-media-row releaseyear="1994" tomatometerscore="91" audiencescore="98">
+  <a data-qa="info-name" href="https://www.rottentomatoes.com/m/{slug}">{title}</a>
+</search-page-media-row>
+</search-page-result></body></html>"""
+
+# A chart page listing the stub movies, so discovery (and --record) can run
+# against the stub server too
+LIST_PAGE = "<html><body>" + "".join(
+    f'<a href="/title/tt{n:07d}/">Stub {n}</a>' for n in range(STUB_LIST_SIZE)
+) + "</body></html>"
+
+
+def make_handler(latency, fail_every=0, request_log=None):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            parsed = urlparse(self.path)
+            if request_log is not None:
+                request_log.append((time.monotonic(), parsed.path))
+            if fail_every and parsed.path.startswith("/title/") and int(parsed.path.strip("/")[-7:]) % fail_every == fail_every - 1:
+                self.send_error(500)
+                return
+            if parsed.path.startswith("/title/"):
+                body = IMDB_PAGE.format(n=parsed.path.strip("/").split("/")[-1])
+            elif parsed.path == "/chart/top/":
+                body = LIST_PAGE
+            elif parsed.path == "/search":
+                title = parse_qs(parsed.query).get("search", [""])[0]
+                body = RT_PAGE.format(title=title, slug=title.replace(" ", "_").lower())
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def run_sequential(urls, delay):
+    """The original loop: one movie at a time followed by a global sleep."""
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    start = time.perf_counter()
+    for url in urls:
+        scraper.scrape_movie_details(url)
+        time.sleep(delay)
+    return time.perf_counter() - start
+
+
+def run_concurrent(urls, workers):
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    start = time.perf_counter()
+    scraper.scrape_all(urls, workers=workers)
+    return time.perf_counter() - start
+
+
+# =====================================================================
+# ORIGINAL BEAUTIFULSOUP PARSERS (BASELINE FOR --parsers)
+# =====================================================================
+def legacy_parse_imdb_page(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    raw_title = soup.find('h1').get_text(strip=True) if soup.find('h1') else "N/A"
+    raw_year = soup.select_one('h1 ~ ul a').get_text(strip=True) if soup.select_one('h1 ~ ul a') else "N/A"
+    raw_rating = soup.select_one('div[data-testid="hero-rating-bar__aggregate-rating__score"] span').get_text(strip=True) if soup.select_one('div[data-testid="hero-rating-bar__aggregate-rating__score"] span') else "N/A"
+    raw_director = soup.select_one('li[data-testid="title-pc-principal-credit"] a').get_text(strip=True) if soup.select_one('li[data-testid="title-pc-principal-credit"] a') else "N/A"
+    poster_img = soup.select_one('div[data-testid="hero-media__poster"] img')
+    poster_url = poster_img['src'] if poster_img else "N/A"
+    plot_summary = soup.select_one('span[data-testid="plot-l"]').get_text(strip=True) if soup.select_one('span[data-testid="plot-l"]') else "N/A"
+    genres = [link.get_text(strip=True) for link in soup.select('div[data-testid="genres"] a')]
+    runtime_text = next((item.get_text(strip=True) for item in soup.select('h1 ~ ul li') if 'h' in item.get_text() or 'm' in item.get_text()), "N/A")
+    cast = []
+    for item in soup.select('div[data-testid="title-cast-item"]')[:5]:
+        actor = item.select_one('a[data-testid="title-cast-item__actor"]')
+        character = item.select_one('a[data-testid="cast-item-character-name"]')
+        cast.append({
+            "actor": actor.get_text(strip=True) if actor else "N/A",
+            "character": character.get_text(strip=True) if character else "N/A"
+        })
+    return {
+        "title": raw_title,
+        "year": int(raw_year) if raw_year.isdigit() else None,
+        "imdb_rating": float(raw_rating) if raw_rating.replace('.', '', 1).isdigit() else None,
+        "director": raw_director,
+        "poster_url": poster_url,
+        "plot_summary": plot_summary,
+        "genres": genres,
+        "runtime_minutes": scraper.convert_runtime_to_minutes(runtime_text),
+        "cast": cast,
+    }
+
+def legacy_parse_rt_search(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    container = soup.find("search-page-result")
+    if not container:
+        return []
+    results = []
+    for movie in container.find_all("search-page-media-row"):
+        try:
+            tomatometer = movie.get('tomatometerscore')
+            audience_score = movie.get('audiencescore')
+            link_tag = movie.find('a', {'data-qa': 'info-name'})
+            results.append({
+                "release_year": int(movie.get('releaseyear', 0)),
+                "rotten_tomatoes_url": link_tag['href'] if link_tag else "N/A",
+                "tomatometer_score": int(tomatometer) if tomatometer else None,
+                "audience_score": int(audience_score) if audience_score else None
+            })
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return results
+
+
+def load_corpus(directory):
+    """Returns (imdb_pages, rt_pages) as raw bytes."""
+    if not directory:
+        imdb = [IMDB_PAGE.format(n=n).encode() for n in range(50)]
+        rt = [RT_PAGE.format(title=f"Stub {n}", slug=f"stub_{n}").encode() for n in range(50)]
+        return imdb, rt
+    read = lambda path: open(path, 'rb').read()
+    imdb = [read(path) for path in sorted(glob.glob(os.path.join(directory, "imdb_*.html")))]
+    rt = [read(path) for path in sorted(glob.glob(os.path.join(directory, "rt_*.html")))]
+    return imdb, rt
+
+
+def measure_parser(parse, pages, rounds):
+    """
+    Returns (pages per second, peak traced allocation in bytes). tracemalloc only
+    sees Python-level allocations, not memory libxml2 allocates in C.
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            parse(page)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for page in pages:
+        parse(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rounds * len(pages) / elapsed, peak
+
+
+def _same_output(old, new):
+    if isinstance(old, list):
+        return len(old) == len(new) and all(_same_output(a, b) for a, b in zip(old, new))
+    return all(new.get(key) == value for key, value in old.items())
+
+
+def compare_parsers(directory, rounds=5):
+    imdb_pages, rt_pages = load_corpus(directory)
+    suites = [
+        ("IMDb", imdb_pages, legacy_parse_imdb_page, scraper.parse_imdb_page),
+        ("RT", rt_pages, legacy_parse_rt_search, scraper.parse_rt_search),
+    ]
+    for label, pages, old, new in suites:
+        if not pages:
+            continue
+        # Newer parsers may return extra keys; compare the ones the original returned
+        mismatches = sum(not _same_output(old(page), new(page)) for page in pages)
+        print(f"\n{label}: {len(pages)} pages, {mismatches} with different output")
+        for name, parse in (("bs4/html.parser", old), ("lxml field specs", new)):
+            pages_per_sec, peak = measure_parser(parse, pages, rounds)
+            print(f"  {name:>17}: {pages_per_sec:8.1f} pages/s | peak allocations: {peak / 1024:8.1f} KB")
+
+
+def compare_discovery(list_url):
+    """Times both discovery backends and reports their peak memory."""
+    try:
+        import resource
+    except ImportError: # Not available on Windows
+        resource = None
+
+    for backend in ("http", "selenium"):
+        tracemalloc.start()
+        start = time.perf_counter()
+        urls = scraper.get_movie_urls(list_url, backend=backend)
+        elapsed = time.perf_counter() - start
+        python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        line = f"{backend:>8}: {len(urls):3d} URLs in {elapsed:6.2f}s | Python peak: {python_peak / 1e6:6.1f} MB"
+        if resource and backend == "selenium":
+            # Chrome and chromedriver run as child processes (ru_maxrss is in KB on Linux)
+            children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            line += f" | browser peak RSS: {children_rss / 1024:6.1f} MB"
+        print(line)
+
+
+# =====================================================================
+# DISTRIBUTED WORK QUEUE
+# =====================================================================
+def _queue_worker(base_url, run_id, threads, imdb_rate, rt_rate):
+    """One worker process: scrapes the stub server through the shared queue."""
+    from pymongo import MongoClient
+    from pipeline import MONGO_URI, use_collection
+    import worker
+    from workqueue import WorkQueue
+
+    scraper.RT_SEARCH_URL = base_url + "/search?search={}"
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    client = MongoClient(MONGO_URI)
+    database = client.get_default_database()
+    # Real upserts, so a killed worker's unflushed batch would show up as missing movies
+    use_collection(database["movies_benchmark_queue"])
+    scraper.LIMITERS["imdb"] = HostLimiter(4, imdb_rate, name="imdb")
+    scraper.LIMITERS["rt"] = HostLimiter(4, rt_rate, name="rt")
+    worker.share_rate_limits(database["rate_limits_benchmark"])
+    queue = WorkQueue(database["scrape_queue_benchmark"], run_id, lease_seconds=3, max_attempts=3, backoff_seconds=0.2)
+    worker.work(queue, threads)
+    client.close()
+
+
+def compare_queue_workers(processes, movies, latency, threads, imdb_rate, rt_rate, kill_one):
+    from pymongo import MongoClient
+    from pipeline import MONGO_URI
+    from workqueue import WorkQueue
+
+    requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency, fail_every=10, request_log=requests_seen))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    client = MongoClient(MONGO_URI)
+    database = client.get_default_database()
+    run_id = f"benchmark-{os.getpid()}"
+    queue = WorkQueue(database["scrape_queue_benchmark"], run_id)
+    queue.ensure_indexes()
+    try:
+        queue.enqueue([f"{base_url}/title/tt{n:07d}/" for n in range(movies)])
+        start = time.perf_counter()
+        workers = [
+            multiprocessing.Process(target=_queue_worker, args=(base_url, run_id, threads, imdb_rate, rt_rate))
+            for _ in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        if kill_one:
+            time.sleep(1)
+            os.kill(workers[0].pid, signal.SIGKILL)
+            print(f"Killed worker pid {workers[0].pid} mid-run.")
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+        counts = queue.counts()
+        done_urls = [item["url"] for item in database["scrape_queue_benchmark"].find({"run_id": run_id, "status": "done"}, {"url": 1})]
+        saved = database["movies_benchmark_queue"].count_documents({"source_imdb_url": {"$in": done_urls}})
+    finally:
+        database["scrape_queue_benchmark"].delete_many({"run_id": run_id})
+        database["rate_limits_benchmark"].drop()
+        database["movies_benchmark_queue"].drop()
+        database["meta"].delete_one({"_id": "movies_benchmark_queue"})
+        client.close()
+        server.shutdown()
+
+    imdb_hits = [t for t, path in requests_seen if path.startswith("/title/")]
+    observed_rate = (len(imdb_hits) - 1) / (imdb_hits[-1] - imdb_hits[0]) if len(imdb_hits) > 1 else 0
+    expected_dead = sum(1 for n in range(movies) if n % 10 == 9)
+    print(f"\nWorkers: {processes} x {threads} threads | movies: {movies} | stub latency: {latency}s")
+    print(f"Finished in {elapsed:.2f}s: {counts}")
+    print(f"Dead-lettered {counts['dead']} (expected {expected_dead}: every tenth stub movie always fails)")
+    print(f"IMDb requests: {len(imdb_hits)}, observed {observed_rate:.2f}/s for a shared limit of {imdb_rate}/s")
+    missing = len(done_urls) - saved
+    print(("✅" if not missing else "❌") + f" {saved} of {len(done_urls)} done movies are in MongoDB ({missing} lost)")
+    return missing
+
+
+# =====================================================================
+# FAULT INJECTION: RETRIES, ADAPTIVE CONCURRENCY, CIRCUIT BREAKING
+# =====================================================================
+FAULT_SCENARIOS = ("transient", "throttle", "outage")
+
+
+class FaultInjector:
+    """
+    Decides which stub responses fail:
+      transient  every third IMDb and RT URL answers 503 the first time it is requested
+      throttle   RT is slow (`slow` seconds) and answers 429 (Retry-After: 1)
+                 while more than `capacity` RT requests are in flight
+      outage     RT hangs for `hang` seconds (past the fetch timeout) on every request
+    """
+    def __init__(self, scenario, capacity=2, slow=0.5, hang=3.0):
+        self.scenario = scenario
+        self.capacity = capacity
+        self.slow = slow
+        self.hang = hang
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # Requests still hanging from an earlier run must not count in this one
+            self._generation += 1
+            self.requests = defaultdict(int)
+            self.injected = defaultdict(int)
+            self._seen = []
+            self._rt_in_flight = 0
+
+    @contextmanager
+    def request(self, parsed):
+        source = "rt" if parsed.path == "/search" else "imdb"
+        key = parsed.path + "?" + parsed.query
+        with self._lock:
+            generation = self._generation
+            self.requests[source] += 1
+            first = key not in self._seen
+            if first:
+                self._seen.append(key)
+            if source == "rt":
+                self._rt_in_flight += 1
+                crowded = self._rt_in_flight > self.capacity
+
+            fault, delay = None, 0
+            if self.scenario == "transient" and first and len(self._seen) % 3 == 0:
+                fault = (503, {})
+            elif self.scenario == "throttle" and source == "rt":
+                fault, delay = ((429, {"Retry-After": "1"}) if crowded else None), self.slow
+            elif self.scenario == "outage" and source == "rt":
+                fault, delay = (503, {}), self.hang
+            if fault:
+                self.injected[fault[0]] += 1
+        time.sleep(delay)
+        try:
+            yield fault
+        finally:
+            if source == "rt":
+                with self._lock:
+                    if generation == self._generation:
+                        self._rt_in_flight -= 1
+
+
+def make_fault_handler(latency, injector):
+    class FaultHandler(make_handler(latency)):
+        def do_GET(self):
+            with injector.request(urlparse(self.path)) as fault:
+                try:
+                    if fault is None:
+                        super().do_GET()
+                        return
+                    status, headers = fault
+                    time.sleep(latency)
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client timed out and already gave up
+
+    return FaultHandler
+
+
+def run_fault_scenario(urls, injector, workers, imdb_rate, rt_rate, adaptive):
+    """
+    Scrapes `urls` once with the single-attempt behaviour (`adaptive=False`:
+    no retries, fixed concurrency, no circuit breaker) or the adaptive fetch
+    layer, and returns what was recovered and what it cost.
+    """
+    injector.reset()
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    scraper.METRICS = RunMetrics()
+    scraper.FETCH_TIMEOUT = 1.0
+    threshold = scraper.CIRCUIT_FAILURE_THRESHOLD if adaptive else float("inf")
+    scraper.RETRY_POLICY = RetryPolicy(retries=3 if adaptive else 0)
+    scraper.LIMITERS["imdb"] = HostLimiter(4, imdb_rate, name="imdb", failure_threshold=threshold)
+    scraper.LIMITERS["rt"] = HostLimiter(4, rt_rate, name="rt", failure_threshold=threshold)
+    if not adaptive:
+        for limiter in scraper.LIMITERS.values():
+            limiter.concurrency.min_limit = limiter.max_concurrency
+
+    start = time.perf_counter()
+    results = scraper.scrape_all(urls, workers=workers)
+    elapsed = time.perf_counter() - start
+
+    stages = scraper.METRICS.summary()["stages"]
+    return {
+        "elapsed_s": elapsed,
+        "scraped": sum(1 for movie in results if movie is not None),
+        "with_rt": sum(1 for movie in results if movie is not None and movie.get("tomatometer_score") is not None),
+        "retries": sum(stats["retries"] for stats in stages.values()),
+        "breaker_trips": sum(limiter.breaker.opened for limiter in scraper.LIMITERS.values()),
+        "rt_concurrency": scraper.LIMITERS["rt"].concurrency.limit,
+        "requests": dict(injector.requests),
+        "injected": dict(injector.injected),
+    }
+
+
+def compare_fault_handling(scenarios, movies, latency, workers, imdb_rate, rt_rate):
+    scraper.save_to_mongodb = lambda movie_data: None
+    for scenario in scenarios:
+        injector = FaultInjector(scenario)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_fault_handler(latency, injector))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        scraper.RT_SEARCH_URL = base_url + "/search?search={}"
+        urls = [f"{base_url}/title/tt{n:07d}/" for n in range(movies)]
+
+        print(f"\nScenario: {scenario} | movies: {movies} | stub latency: {latency}s")
+        for label, adaptive in (("single attempt", False), ("adaptive", True)):
+            r = run_fault_scenario(urls, injector, workers, imdb_rate, rt_rate, adaptive)
+            print(
+                f"  {label:<15} {r['elapsed_s']:6.2f}s | scraped {r['scraped']}/{movies}, with RT scores {r['with_rt']}"
+                f" | retries {r['retries']} | breaker trips {r['breaker_trips']} | RT concurrency {r['rt_concurrency']:.1f}"
+                f" | requests {r['requests']} | injected {r['injected']}"
+            )
+        server.shutdown()
+
+
+# =====================================================================
+# OFFLINE SUITE: RECORDED FIXTURES AND REPLAY
+# =====================================================================
+HISTORY_PATH = "benchmark_history.jsonl"
+# A metric this much worse than the previous comparable run is a regression
+REGRESSION_THRESHOLD = 0.10
+# ...and moves by at least this much (sub-millisecond stages are mostly noise)
+MIN_LATENCY_CHANGE_MS = 1.0
+
+
+class StageTimer:
+    """Collects wall-clock samples and thread CPU time per pipeline stage."""
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.cpu = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+                with self._lock:
+                    self.samples[stage].append(wall)
+                    self.cpu[stage] += cpu
+        return timed
+
+    def summary(self):
+        stages = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            stages[stage] = {
+                "count": len(ordered),
+                "p50_ms": round(statistics.median(ordered) * 1000, 3),
+                "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+                "wall_s": round(sum(ordered), 3),
+                "cpu_s": round(self.cpu[stage], 3),
+            }
+        return stages
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_fixtures(archive_path, list_url, movies):
+    """Scrapes `movies` movies of `list_url` live (politely) and saves every response."""
+    archive = FixtureArchive(archive_path, list_url, movies)
+    scraper.fetch = recording_fetch(scraper.fetch, archive)
+    scraper.save_to_mongodb = lambda movie_data: None
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+
+    urls = scraper.get_movie_urls(list_url, backend="http", limit=movies)
+    scraper.scrape_all(urls)
+    archive.movies = len(urls)
+    archive.save()
+    print(f"✅ Recorded {len(archive.index)} responses for {len(urls)} movies into {archive_path}")
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process in MB: from `resource` on Unix, from
+    psutil on Windows, or None if neither is available.
+    """
+    try:
+        import resource
+    except ImportError: # Not available on Windows
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux but in bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def replay_fixtures(archive_path, latency, jitter, error_rate, workers, imdb_rate, rt_rate, mongo=False):
+    """
+    Runs discovery and the full scrape against a ReplayServer and returns the
+    run's measurements. Peak memory is the process's peak RSS where it can be
+    read, otherwise the peak of Python allocations traced by tracemalloc.
+    """
+    from pipeline import MONGO_URI, MongoWriter
+
+    archive = FixtureArchive.load(archive_path)
+    # Errors are only injected on movie pages, so every run discovers the same URLs
+    server = ReplayServer(
+        archive, latency=latency, jitter=jitter, error_rate=error_rate, never_fail=[archive.list_url],
+    ).start()
+    sessions = threading.local()
+
+    def get_replay_session():
+        if not hasattr(sessions, "session"):
+            sessions.session = replay_session(server.base_url)
+            sessions.session.headers.update(scraper.HEADERS)
+        return sessions.session
+
+    scraper.get_session = get_replay_session
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    scraper.LIMITERS["imdb"] = HostLimiter(max_concurrency=4, rate=imdb_rate, name="imdb")
+    scraper.LIMITERS["rt"] = HostLimiter(max_concurrency=4, rate=rt_rate, name="rt")
+
+    timer = StageTimer()
+    writer = client = None
+    if mongo and MONGO_URI:
+        # Real upserts, but into a scratch collection
+        from pymongo import MongoClient
+        client = MongoClient(MONGO_URI)
+        writer = MongoWriter(collection=client.get_default_database()["movies_benchmark"])
+        writer.flush = timer.wrap("db_write", writer.flush)
+        scraper.save_to_mongodb = writer.add
+    else:
+        scraper.save_to_mongodb = lambda movie_data: None
+
+    fetch = scraper.fetch
+    memory_source = "rss" if _peak_rss_mb() is not None else "tracemalloc"
+    if memory_source == "tracemalloc":
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    try:
+        urls = timer.wrap("discovery", scraper.get_movie_urls)(archive.list_url, backend="http", limit=archive.movies)
+
+        # Per-stage timing; discovery's own request is counted under "discovery"
+        timed_fetch = {source: timer.wrap(f"{source}_fetch", fetch) for source in scraper.LIMITERS}
+        scraper.fetch = lambda url, source, **kwargs: timed_fetch[source](url, source, **kwargs)
+        scraper.parse_imdb_page = timer.wrap("imdb_parse", scraper.parse_imdb_page)
+        scraper.parse_rt_search = timer.wrap("rt_parse", scraper.parse_rt_search)
+        scraper.parse_rt_movie_page = timer.wrap("rt_parse", scraper.parse_rt_movie_page)
+
+        start = time.perf_counter()
+        results = scraper.scrape_all(urls, workers=workers)
+        if writer is not None:
+            writer.close()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+        scraper.fetch = fetch
+        if client is not None:
+            client.get_default_database()["movies_benchmark"].drop()
+            client.close()
+    process_cpu = time.process_time() - cpu_start
+    if memory_source == "rss":
+        peak_memory_mb = _peak_rss_mb()
+    else:
+        peak_memory_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    stages = timer.summary()
+    scraped = sum(1 for movie in results if movie is not None)
+    db_write = stages.get("db_write")
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "archive": os.path.basename(archive_path),
+        "settings": {
+            "latency": latency, "jitter": jitter, "error_rate": error_rate,
+            "workers": workers, "imdb_rate": imdb_rate, "rt_rate": rt_rate, "mongo": writer is not None,
+        },
+        "movies": len(urls),
+        "scraped": scraped,
+        "failed": len(urls) - scraped,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_sec": round(scraped / elapsed, 3) if elapsed else None,
+        "requests": {"served": server.served, "injected_errors": server.errors, "missing": server.missing},
+        "stages": stages,
+        "parse_cpu_s": round(sum(stages.get(stage, {}).get("cpu_s", 0) for stage in ("imdb_parse", "rt_parse")), 3),
+        "fetch_wait_s": round(sum(stages.get(stage, {}).get("wall_s", 0) for stage in ("imdb_fetch", "rt_fetch")), 3),
+        "process_cpu_s": round(process_cpu, 3),
+        "peak_rss_mb": peak_memory_mb,
+        "memory_source": memory_source,
+        "mongo_docs_per_sec": round(writer.written / db_write["wall_s"], 1) if db_write and db_write["wall_s"] else None,
+    }
+
+
+def find_regressions(result, previous, threshold=REGRESSION_THRESHOLD):
+    """Compares a run with the previous run of the same archive and settings."""
+    def metrics(run):
+        values = {
+            "pages_per_sec": (run["pages_per_sec"], True),
+            "peak_rss_mb": (run["peak_rss_mb"], False),
+            "mongo_docs_per_sec": (run["mongo_docs_per_sec"], True),
+        }
+        for stage, numbers in run["stages"].items():
+            values[f"{stage}.p99_ms"] = (numbers["p99_ms"], False)
+        return values
+
+    regressions = []
+    old_metrics = metrics(previous)
+    for name, (value, higher_is_better) in metrics(result).items():
+        old = old_metrics.get(name, (None, None))[0]
+        if value is None or not old:
+            continue
+        if name.endswith("_ms") and abs(value - old) < MIN_LATENCY_CHANGE_MS:
+            continue
+        change = (value - old) / old
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(f"{name}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def track_run(result, history_path=HISTORY_PATH):
+    """Appends `result` to the history file and returns its regressions."""
+    previous = None
+    if os.path.exists(history_path):
+        with open(history_path, encoding="utf-8") as f:
+            for line in f:
+                run = json.loads(line)
+                if run["archive"] == result["archive"] and run["settings"] == result["settings"]:
+                    previous = run
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+    return previous, find_regressions(result, previous) if previous else []
+
+
+def print_replay_report(result):
+    settings = result["settings"]
+    print(f"\nReplay of {result['archive']} at commit {result['commit']} | latency {settings['latency']}s"
+          f" (+{settings['jitter']}s jitter) | error rate {settings['error_rate']:.0%} | {settings['workers']} workers")
+    print(f"Movies: {result['scraped']}/{result['movies']} in {result['elapsed_s']:.2f}s"
+          f" -> {result['pages_per_sec']:.2f} pages/sec | requests: {result['requests']}")
+    print(f"{'stage':<12} {'count':>6} {'p50 ms':>9} {'p99 ms':>9} {'wall s':>8} {'cpu s':>7}")
+    for stage, numbers in result["stages"].items():
+        print(f"{stage:<12} {numbers['count']:>6} {numbers['p50_ms']:>9.2f} {numbers['p99_ms']:>9.2f}"
+              f" {numbers['wall_s']:>8.2f} {numbers['cpu_s']:>7.2f}")
+    print(f"CPU parsing: {result['parse_cpu_s']:.2f}s vs waiting on fetches: {result['fetch_wait_s']:.2f}s"
+          f" | process CPU: {result['process_cpu_s']:.2f}s | peak memory: {result['peak_rss_mb']} MB ({result['memory_source']})")
+    if result["mongo_docs_per_sec"] is not None:
+        print(f"Mongo writes: {result['mongo_docs_per_sec']} docs/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scraping engine against a local stub server.")
+    parser.add_argument("--movies", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds the stub server waits per response")
+    parser.add_argument("--delay", type=float, default=1.5, help="Sleep between movies in the sequential baseline")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--imdb-rate", type=float, default=4)
+    parser.add_argument("--rt-rate", type=float, default=4)
+    parser.add_argument("--discovery", metavar="LIST_URL", help="Compare the URL-discovery backends instead")
+    parser.add_argument("--parsers", metavar="PAGES_DIR", nargs="?", const="", help="Compare the page parsers instead")
+    parser.add_argument("--queue", metavar="PROCESSES", type=int, help="Share one run between worker processes instead")
+    parser.add_argument("--kill-one", action="store_true", help="With --queue, kill one worker mid-run")
+    parser.add_argument("--faults", metavar="SCENARIO", nargs="?", const="all", choices=FAULT_SCENARIOS + ("all",),
+                        help="Inject failures (default: every scenario) and compare single-attempt and adaptive fetching")
+    parser.add_argument("--record", metavar="ARCHIVE", help="Record live responses into a fixture archive instead")
+    parser.add_argument("--list-url", default="https://www.imdb.com/chart/top/", help="List page to record (--record)")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="Benchmark the pipeline against a fixture archive instead")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency per replayed response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of replayed requests answering 503")
+    parser.add_argument("--mongo", action="store_true", help="With --replay, measure real upserts into a scratch collection")
+    parser.add_argument("--history", default=HISTORY_PATH, help="Run history used for regression tracking")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 if a regression is found")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record, args.list_url, args.movies)
+        raise SystemExit
+
+    if args.replay:
+        result = replay_fixtures(args.replay, args.latency, args.jitter, args.error_rate,
+                                 args.workers, args.imdb_rate, args.rt_rate, mongo=args.mongo)
+        print_replay_report(result)
+        previous, regressions = track_run(result, args.history)
+        if previous is None:
+            print(f"No earlier run with these settings in {args.history}; this run is the baseline.")
+        elif regressions:
+            print(f"⚠️ Regressions against the run of {previous['timestamp']} ({previous['commit']}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+        else:
+            print(f"✅ No regression against the run of {previous['timestamp']} ({previous['commit']}).")
+        raise SystemExit(1 if regressions and args.fail_on_regression else 0)
+
+    if args.queue:
+        missing = compare_queue_workers(args.queue, args.movies, args.latency, args.workers, args.imdb_rate, args.rt_rate, args.kill_one)
+        raise SystemExit(1 if missing else 0)
+
+    if args.faults:
+        scenarios = FAULT_SCENARIOS if args.faults == "all" else (args.faults,)
+        compare_fault_handling(scenarios, args.movies, args.latency, args.workers, args.imdb_rate, args.rt_rate)
+        raise SystemExit
+
+    if args.parsers is not None:
+        compare_parsers(args.parsers)
+        raise SystemExit
+
+    if args.discovery:
+        compare_discovery(args.discovery)
+        raise SystemExit
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Point the scraper at the stub server and never touch the database.
+    scraper.RT_SEARCH_URL = base_url + "/search?search={}"
+    scraper.save_to_mongodb = lambda movie_data: None
+    scraper.LIMITERS["imdb"] = HostLimiter(max_concurrency=4, rate=args.imdb_rate, name="imdb")
+    scraper.LIMITERS["rt"] = HostLimiter(max_concurrency=4, rate=args.rt_rate, name="rt")
+
+    urls = [f"{base_url}/title/tt{n:07d}/" for n in range(args.movies)]
+
+    sequential = run_sequential(urls, args.delay)
+    concurrent = run_concurrent(urls, args.workers)
+    server.shutdown()
+
+    print(f"\nMovies: {args.movies} | stub latency: {args.latency}s")
+    print(f"Sequential loop:   {sequential:7.2f}s")
+    print(f"Concurrent engine: {concurrent:7.2f}s  ({sequential / concurrent:.1f}x faster)")
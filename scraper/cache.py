@@ -0,0 +1,227 @@
+# scraper/cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def content_hash(data):
+    """Returns a stable SHA-256 hex digest for bytes or any JSON-serialisable value."""
+    if not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResponseCache:
+    """
+    A persistent, SQLite-backed cache of fetched pages, keyed by URL.
+
+    Only the parsed result of a page is stored, together with its ETag /
+    Last-Modified validators and a hash of the raw body. A page is served from
+    the cache without any request while it is younger than its source's TTL;
+    after that it is revalidated with a conditional request, and a 304 or an
+    identical body skips parsing altogether. The hash of every movie record
+    MongoDB acknowledged is kept too, so unchanged records never reach it again.
+
+    Each parsed result is stored with `parser_version`; results of any other
+    version are ignored (the page is fetched unconditionally and parsed again),
+    so a fixed parser reaches unchanged pages too.
+
+    `observer(stage, result)`, if set, is told the result of every lookup.
+    """
+    def __init__(self, path, ttls=None, observer=None, parser_version=None):
+        self.ttls = ttls or {}
+        self.observer = observer
+        self.parser_version = parser_version
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body_hash TEXT,
+                    body_size INTEGER,
+                    parsed TEXT,
+                    fetched_at REAL,
+                    parser TEXT
+                )""")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+            if "parser" not in columns:
+                # Caches written before parser versions existed: every row is re-parsed once
+                self._conn.execute("ALTER TABLE responses ADD COLUMN parser TEXT")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    url TEXT PRIMARY KEY,
+                    record_hash TEXT
+                )""")
+        self.stats = {"hits": 0, "revalidated": 0, "unchanged": 0, "misses": 0, "bytes_saved": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _result(self, stage, result):
+        self._count(result)
+        if self.observer is not None:
+            self.observer(stage, result)
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, last_modified, body_hash, body_size, parsed, fetched_at FROM responses "
+                "WHERE url = ? AND parser IS ?",
+                (url, self.parser_version),
+            ).fetchone()
+
+    def _store(self, url, etag, last_modified, body_hash, body_size, parsed):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body_hash, body_size, json.dumps(parsed), time.time(), self.parser_version),
+            )
+
+    def _touch(self, url):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def get_or_fetch(self, url, source, fetch, parse, stage=None):
+        """
+        Returns `parse(response.content)` for `url`, reusing the cached result
+        whenever the page is still fresh or the server reports it unchanged.
+        `fetch(url, source, headers=..., stage=...)` performs the actual request;
+        `stage` names the lookup in metrics (the source by default).
+        """
+        stage = stage or source
+        row = self._lookup(url)
+        headers = {}
+        if row:
+            etag, last_modified, body_hash, body_size, parsed, fetched_at = row
+            if time.time() - fetched_at < self.ttls.get(source, 0):
+                self._result(stage, "hits")
+                self._count("bytes_saved", body_size)
+                return json.loads(parsed)
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = fetch(url, source, headers=headers, stage=stage)
+
+        if row and response.status_code == 304:
+            self._result(stage, "revalidated")
+            self._count("bytes_saved", body_size)
+            self._touch(url)
+            return json.loads(parsed)
+
+        new_hash = content_hash(response.content)
+        if row and new_hash == body_hash:
+            # The body was downloaded again, but parsing it would give the same result
+            self._result(stage, "unchanged")
+            result = json.loads(parsed)
+        else:
+            self._result(stage, "misses")
+            result = parse(response.content)
+
+        self._store(
+            url,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            new_hash,
+            len(response.content),
+            result,
+        )
+        return result
+
+    def record_changed(self, url, record):
+        """Returns True if `record` differs from the last record saved for `url`."""
+        with self._lock:
+            row = self._conn.execute("SELECT record_hash FROM records WHERE url = ?", (url,)).fetchone()
+        return not row or row[0] != content_hash(record)
+
+    def remember_records(self, records):
+        """
+        Remembers the hashes of records MongoDB acknowledged, keyed by their
+        'source_imdb_url'. Only call it once the write succeeded: a record that
+        was never saved must still count as changed on the next run.
+        """
+        rows = [(record["source_imdb_url"], content_hash(record)) for record in records]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO records VALUES (?, ?)", rows)
+
+    def hit_rate(self):
+        total = sum(self.stats[key] for key in ("hits", "revalidated", "unchanged", "misses"))
+        served = self.stats["hits"] + self.stats["revalidated"] + self.stats["unchanged"]
+        return served / total if total else 0.0
+
+    def report(self):
+        s = self.stats
+        return (
+            f"Cache hit rate: {self.hit_rate():.0%} "
+            f"(fresh: {s['hits']}, 304: {s['revalidated']}, unchanged: {s['unchanged']}, misses: {s['misses']}) | "
+            f"bytes saved: {s['bytes_saved'] / 1024:.0f} KB"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LookupCache:
+    """
+    A persistent key -> result store for lookups such as "which Rotten Tomatoes
+    page belongs to this (title, year)". Positive results are kept until
+    replaced; negative results (None) expire after `negative_ttl` seconds so a
+    movie that was not found is searched for again, but not on every run.
+    """
+    def __init__(self, path, negative_ttl=0):
+        self.negative_ttl = negative_ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS lookups (
+                    key TEXT PRIMARY KEY,
+                    result TEXT,
+                    looked_up_at REAL
+                )""")
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0}
+
+    def get(self, key):
+        """Returns (found, result); a stale negative entry counts as not found."""
+        with self._lock:
+            row = self._conn.execute("SELECT result, looked_up_at FROM lookups WHERE key = ?", (key,)).fetchone()
+        if row:
+            result = json.loads(row[0])
+            if result is not None:
+                return True, result
+            if time.time() - row[1] < self.negative_ttl:
+                return True, None
+        return False, None
+
+    def put(self, key, result):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time()),
+            )
+
+    def delete(self, key):
+        """Forgets `key`, e.g. once its result turned out to be wrong."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM lookups WHERE key = ?", (key,))
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def report(self):
+        s = self.stats
+        return f"Lookup cache: {s['hits']} hits, {s['negative_hits']} negative hits, {s['misses']} misses"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,135 @@
+# scraper/discovery.py
+
+import json
+import re
+import time
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+TITLE_ID_PATTERN = re.compile(r'/title/(tt\d+)')
+
+# =====================================================================
+# HTTP DISCOVERY (DEFAULT)
+# =====================================================================
+def _ids_from_json_ld(soup):
+    """Reads the schema.org ItemList IMDb embeds in chart and list pages."""
+    ids = []
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for entry in data.get('itemListElement', []) if isinstance(data, dict) else []:
+            item = entry.get('item', entry) if isinstance(entry, dict) else {}
+            match = TITLE_ID_PATTERN.search(item.get('url', '') or '')
+            if match:
+                ids.append(match.group(1))
+    return ids
+
+def _ids_from_next_data(soup):
+    """Falls back to the title ids referenced by the page's Next.js state."""
+    script = soup.find('script', id='__NEXT_DATA__')
+    if not script or not script.string:
+        return []
+    return re.findall(r'"(tt\d{7,})"', script.string)
+
+def _ids_from_anchors(soup):
+    """Last resort: the title links present in the server-rendered HTML."""
+    ids = []
+    for link in soup.select('a[href*="/title/tt"]'):
+        match = TITLE_ID_PATTERN.search(link['href'])
+        if match:
+            ids.append(match.group(1))
+    return ids
+
+def extract_title_urls(html, list_url):
+    """
+    Returns the de-duplicated IMDb title URLs of a chart or list page, in page
+    order. Works for any IMDb page that lists titles, not only `/chart/top/`.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for strategy in (_ids_from_json_ld, _ids_from_next_data, _ids_from_anchors):
+        ids = strategy(soup)
+        if ids:
+            break
+    else:
+        return []
+
+    urls = []
+    seen_ids = set()
+    for title_id in ids:
+        if title_id not in seen_ids:
+            seen_ids.add(title_id)
+            urls.append(urljoin(list_url, f"/title/{title_id}/"))
+    return urls
+
+def discover_with_http(list_url, fetch):
+    """Downloads the list page with a plain GET request and parses it."""
+    response = fetch(list_url, "imdb")
+    return extract_title_urls(response.text, list_url)
+
+# =====================================================================
+# SELENIUM DISCOVERY (OPT-IN FALLBACK)
+# =====================================================================
+def discover_with_selenium(list_url, user_agent, driver_path='./chromedriver.exe'):
+    """
+    Renders the page in headless Chrome and scrolls it before reading the links.
+    Much slower and heavier than the HTTP path; only used when asked for.
+    """
+    # Selenium is imported here so the default path does not need it installed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+
+    # Configure Selenium WebDriver
+    service = Service(executable_path=driver_path)
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('user-agent=' + user_agent)
+    options.add_argument("--lang=en-US")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    driver = webdriver.Chrome(service=service, options=options)
+    wait = WebDriverWait(driver, 20) # Increased wait time for reliability
+    urls = []
+
+    try:
+        driver.get(list_url)
+        print("Browser session started. Waiting for page to load...")
+
+        # Scroll down to ensure all movies are loaded on the page
+        print("Scrolling down to load all movies...")
+        body = wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+        for _ in range(12): # Increased scroll count
+            body.send_keys(Keys.PAGE_DOWN)
+            time.sleep(0.5)
+
+        print("Finished scrolling. Finding all link elements...")
+
+        # Wait for movie links to be present
+        movie_elements = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.ipc-title-link-wrapper")))
+        print(f"Found {len(movie_elements)} potential link elements. Filtering now...")
+
+        seen_urls = set()
+        for link_element in movie_elements:
+            href = link_element.get_attribute('href')
+            if href and '/title/tt' in href:
+                # Get the base URL without query parameters
+                full_url = href.split('?')[0]
+                if full_url not in seen_urls:
+                    seen_urls.add(full_url)
+                    urls.append(full_url)
+
+    finally:
+        print("Closing the browser session.")
+        driver.quit()
+
+    return urls
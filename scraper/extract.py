@@ -0,0 +1,102 @@
+# scraper/extract.py
+
+import lxml.html
+from lxml.cssselect import CSSSelector
+
+_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+# Stored with every cached parse result (see cache.ResponseCache). Bump it
+# whenever a spec below or a parse_* function in scraper.py changes its output,
+# so pages cached by the previous version are parsed again.
+PARSER_VERSION = "1"
+
+# =====================================================================
+# DECLARATIVE FIELD SPECS
+# =====================================================================
+class Field:
+    """
+    Describes one value to extract from a page.
+
+    - `selector`: CSS selector, compiled once; None means the current element.
+    - `attr`: read this attribute instead of the element's text.
+    - `many`: return a list of every match instead of the first one.
+    - `where`: keep only elements whose raw text passes this predicate.
+    - `limit`: cap the number of matches when `many` is set.
+    - `fields`: nested specs evaluated on each match, giving a dict per match.
+    - `default`: value used when nothing matches (single fields only).
+    """
+    def __init__(self, name, selector=None, attr=None, many=False, where=None, limit=None, fields=None, default="N/A"):
+        self.name = name
+        self.selector = CSSSelector(selector) if selector else None
+        self.attr = attr
+        self.many = many
+        self.where = where
+        self.limit = limit
+        self.fields = fields
+        self.default = default
+
+    def _matches(self, element):
+        matches = self.selector(element) if self.selector is not None else [element]
+        if self.where is not None:
+            matches = [match for match in matches if self.where(match.text_content())]
+        return matches
+
+    def _value(self, element):
+        if self.fields is not None:
+            return extract_fields(element, self.fields)
+        if self.attr is not None:
+            return element.get(self.attr, self.default)
+        # Same result as BeautifulSoup's get_text(strip=True)
+        return "".join(text.strip() for text in element.itertext())
+
+    def extract(self, element):
+        matches = self._matches(element)
+        if self.many:
+            return [self._value(match) for match in matches[:self.limit]]
+        return self._value(matches[0]) if matches else self.default
+
+
+def extract_fields(element, fields):
+    """Evaluates every field of a spec against `element`, one selector pass each."""
+    return {field.name: field.extract(element) for field in fields}
+
+def parse_html(content):
+    """Parses raw page bytes (or text) into an lxml element tree."""
+    return lxml.html.document_fromstring(content, parser=_PARSER if isinstance(content, bytes) else None)
+
+# =====================================================================
+# IMDB AND ROTTEN TOMATOES SPECS
+# =====================================================================
+IMDB_FIELDS = [
+    Field("title", "h1"),
+    Field("year", "h1 ~ ul a"),
+    Field("rating", 'div[data-testid="hero-rating-bar__aggregate-rating__score"] span'),
+    Field("director", 'li[data-testid="title-pc-principal-credit"] a'),
+    Field("poster_url", 'div[data-testid="hero-media__poster"] img', attr="src"),
+    Field("plot_summary", 'span[data-testid="plot-l"]'),
+    Field("genres", 'div[data-testid="genres"] a', many=True),
+    Field("runtime", "h1 ~ ul li", where=lambda text: 'h' in text or 'm' in text),
+    Field("cast", 'div[data-testid="title-cast-item"]', many=True, limit=5, fields=[
+        Field("actor", 'a[data-testid="title-cast-item__actor"]'),
+        Field("character", 'a[data-testid="cast-item-character-name"]'),
+    ]),
+]
+
+RT_SEARCH_FIELDS = [
+    Field("results", "search-page-result search-page-media-row", many=True, fields=[
+        Field("release_year", attr="releaseyear", default=None),
+        Field("tomatometer_score", attr="tomatometerscore", default=None),
+        Field("audience_score", attr="audiencescore", default=None),
+        Field("rotten_tomatoes_url", 'a[data-qa="info-name"]', attr="href"),
+        Field("title", 'a[data-qa="info-name"]'),
+    ]),
+]
+
+# Scores on a movie page, from the current <media-scorecard> layout or the
+# older <score-board> element's attributes.
+RT_MOVIE_FIELDS = [
+    Field("critics_score", 'media-scorecard rt-text[slot="criticsScore"]', default=None),
+    Field("audience_score", 'media-scorecard rt-text[slot="audienceScore"]', default=None),
+    Field("board_critics_score", "score-board", attr="tomatometerscore", default=None),
+    Field("board_audience_score", "score-board", attr="audiencescore", default=None),
+]
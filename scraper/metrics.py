@@ -0,0 +1,216 @@
+# scraper/metrics.py
+
+import functools
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class StageStats:
+    """Everything recorded for one stage: durations, bytes, status codes, cache results."""
+    def __init__(self):
+        self.durations = []
+        self.errors = 0
+        self.bytes = 0
+        self.retries = 0
+        self.records = 0
+        self.statuses = Counter()
+        self.cache = Counter()
+
+# =====================================================================
+# PER-RUN STAGE METRICS
+# =====================================================================
+class RunMetrics:
+    """
+    Thread-safe timing spans for the stages of a scrape (discovery, fetches,
+    parsing, database upserts). A span is a dict the instrumented code can
+    annotate with 'bytes', 'status', 'retries' or 'records'; it is recorded
+    with its duration when the `with` block ends. The totals are
+    exported as Prometheus text and as a JSON summary of the run.
+    """
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages = defaultdict(StageStats)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage):
+        attributes = {}
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except Exception:
+            attributes["error"] = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **attributes)
+
+    def timed(self, stage):
+        """Decorator recording every call of a function as a span of `stage`."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, stage, seconds, **attributes):
+        with self._lock:
+            stats = self.stages[stage]
+            stats.durations.append(seconds)
+            stats.errors += bool(attributes.get("error"))
+            stats.bytes += attributes.get("bytes", 0)
+            stats.retries += attributes.get("retries", 0)
+            stats.records += attributes.get("records", 0)
+            if attributes.get("status") is not None:
+                stats.statuses[attributes["status"]] += 1
+
+    def count_cache(self, stage, result):
+        """Counts a response cache result (hits never reach a fetch span)."""
+        with self._lock:
+            self.stages[stage].cache[result] += 1
+
+    def summary(self):
+        with self._lock:
+            stages = {}
+            for stage, stats in self.stages.items():
+                ordered = sorted(stats.durations)
+                stages[stage] = {
+                    "count": len(ordered),
+                    "errors": stats.errors,
+                    "total_s": round(sum(ordered), 3),
+                    "p50_ms": round(statistics.median(ordered) * 1000, 3) if ordered else None,
+                    "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3) if ordered else None,
+                    "bytes": stats.bytes,
+                    "retries": stats.retries,
+                    "records": stats.records,
+                    "status_codes": {str(code): count for code, count in sorted(stats.statuses.items())},
+                    "cache": dict(stats.cache),
+                }
+        return {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "elapsed_s": round(time.time() - self.started_at, 3),
+            "stages": stages,
+        }
+
+    def prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP scraper_stage_duration_seconds Time spent per scraper stage.",
+            "# TYPE scraper_stage_duration_seconds histogram",
+        ]
+        counters = {
+            "scraper_stage_errors_total": ("Spans that raised an error.", []),
+            "scraper_stage_bytes_total": ("Response bytes downloaded per stage.", []),
+            "scraper_stage_retries_total": ("Request retries per stage.", []),
+            "scraper_stage_records_total": ("Records written per stage.", []),
+            "scraper_http_responses_total": ("HTTP responses per stage and status code.", []),
+            "scraper_cache_results_total": ("Response cache results per stage.", []),
+        }
+        with self._lock:
+            for stage, stats in sorted(self.stages.items()):
+                ordered = sorted(stats.durations)
+                index = 0
+                for bound in DURATION_BUCKETS:
+                    while index < len(ordered) and ordered[index] <= bound:
+                        index += 1
+                    lines.append(f"scraper_stage_duration_seconds_bucket{_labels(stage=stage, le=bound)} {index}")
+                lines.append(f"scraper_stage_duration_seconds_bucket{_labels(stage=stage, le='+Inf')} {len(ordered)}")
+                lines.append(f"scraper_stage_duration_seconds_sum{_labels(stage=stage)} {sum(ordered)}")
+                lines.append(f"scraper_stage_duration_seconds_count{_labels(stage=stage)} {len(ordered)}")
+
+                counters["scraper_stage_errors_total"][1].append(f"{_labels(stage=stage)} {stats.errors}")
+                counters["scraper_stage_bytes_total"][1].append(f"{_labels(stage=stage)} {stats.bytes}")
+                counters["scraper_stage_retries_total"][1].append(f"{_labels(stage=stage)} {stats.retries}")
+                counters["scraper_stage_records_total"][1].append(f"{_labels(stage=stage)} {stats.records}")
+                for code, count in sorted(stats.statuses.items()):
+                    counters["scraper_http_responses_total"][1].append(f"{_labels(stage=stage, status=code)} {count}")
+                for result, count in sorted(stats.cache.items()):
+                    counters["scraper_cache_results_total"][1].append(f"{_labels(stage=stage, result=result)} {count}")
+
+        for name, (help_text, samples) in counters.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(name + sample for sample in samples)
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_textfile(self, path):
+        """Writes the Prometheus metrics atomically, for node_exporter's textfile collector."""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, path)
+
+    def serve(self, port):
+        """Serves GET /metrics on `port` from a daemon thread for as long as the run lasts."""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Shared by scraper.py, pipeline.py and worker.py
+METRICS = RunMetrics()
+
+# Optional outputs of a run (see publish_run_metrics); nothing is written
+# unless a path is configured
+SCRAPER_METRICS_SUMMARY = os.getenv("SCRAPER_METRICS_SUMMARY")
+SCRAPER_METRICS_TEXTFILE = os.getenv("SCRAPER_METRICS_TEXTFILE")
+SCRAPER_METRICS_PORT = int(os.getenv("SCRAPER_METRICS_PORT", 0))
+
+
+def start_metrics_server():
+    """Starts the /metrics endpoint if SCRAPER_METRICS_PORT is set."""
+    if SCRAPER_METRICS_PORT:
+        METRICS.serve(SCRAPER_METRICS_PORT)
+        print(f"Serving scraper metrics on http://0.0.0.0:{SCRAPER_METRICS_PORT}/metrics")
+
+
+def publish_run_metrics():
+    """Writes the run's JSON summary and the Prometheus textfile, each if configured."""
+    if SCRAPER_METRICS_SUMMARY:
+        METRICS.write_summary(SCRAPER_METRICS_SUMMARY)
+        print(f"Run metrics written to {SCRAPER_METRICS_SUMMARY}")
+    if SCRAPER_METRICS_TEXTFILE:
+        METRICS.write_textfile(SCRAPER_METRICS_TEXTFILE)
@@ -1,59 +1,419 @@
 # scraper/pipeline.py
 
-from pymongo import MongoClient
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+import argparse
+import atexit
+import itertools
 import os
+import re
+import unicodedata
+import threading
+import time
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+from cache import content_hash
+from metrics import METRICS
+
 # Load environment variables from the .env file
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", 50))
+MONGO_FLUSH_INTERVAL = float(os.getenv("MONGO_FLUSH_INTERVAL", 5))
+
+# =====================================================================
+# DERIVED FIELDS
+# =====================================================================
+def compute_discrepancy(movie_data):
+    """
+    The gap between IMDb (scaled to 0-100) and the Tomatometer, stored with the
+    movie so the API can sort on an indexed field. None if either score is missing.
+    """
+    imdb_rating = movie_data.get('imdb_rating')
+    tomatometer = movie_data.get('tomatometer_score')
+    if imdb_rating is None or tomatometer is None:
+        return None
+    return abs(imdb_rating * 10 - tomatometer)
+
+# The same formula as an update pipeline, for documents saved before the field existed
+DISCREPANCY_EXPRESSION = {'$abs': {'$subtract': [{'$multiply': ['$imdb_rating', 10]}, '$tomatometer_score']}}
+
+def backfill_discrepancy(collection):
+    """Adds 'discrepancy' to every document that does not have it yet."""
+    result = collection.update_many(
+        {'discrepancy': {'$exists': False}},
+        [{'$set': {'discrepancy': DISCREPANCY_EXPRESSION}}],
+    )
+    return result.modified_count
+
+# Scraped from Rotten Tomatoes. A record without them (RT could not be reached)
+# keeps the values already stored instead of overwriting them with None.
+RT_DEFAULTS = {'rotten_tomatoes_url': 'N/A', 'tomatometer_score': None, 'audience_score': None}
+
+def complete_records(collection, batch):
+    """Fills the RT fields missing from records of `batch` with the stored values."""
+    partial = [movie['source_imdb_url'] for movie in batch if any(field not in movie for field in RT_DEFAULTS)]
+    if not partial:
+        return batch
+    projection = {'source_imdb_url': 1, **{field: 1 for field in RT_DEFAULTS}}
+    stored = {doc['source_imdb_url']: doc for doc in collection.find({'source_imdb_url': {'$in': partial}}, projection)}
+    completed = []
+    for movie in batch:
+        previous = stored.get(movie['source_imdb_url'], {})
+        completed.append({**{field: previous.get(field, default) for field, default in RT_DEFAULTS.items()}, **movie})
+    return completed
+
+def tokenize(text):
+    """
+    Lower-cased, accent-free alphanumeric words of `text`. The API splits search
+    text with the same rules (backend/search.py); tests/test_search.py checks
+    that the two agree.
+    """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode()
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+def compute_search_terms(movie_data):
+    """The words of the title, director and cast that /movies/search looks up."""
+    terms = tokenize(movie_data.get('title'))
+    terms += tokenize(movie_data.get('director'))
+    for member in movie_data.get('cast', []):
+        terms += tokenize(member.get('actor'))
+    return sorted(set(terms))
+
+def backfill_search_terms(collection, batch_size=500):
+    """Adds 'search_terms' to every document that does not have it yet."""
+    updated = 0
+    operations = []
+    projection = {'title': 1, 'director': 1, 'cast': 1}
+    for movie in collection.find({'search_terms': {'$exists': False}}, projection):
+        operations.append(UpdateOne({'_id': movie['_id']}, {'$set': {'search_terms': compute_search_terms(movie)}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+def bump_version(collection):
+    """
+    Increments the collection version in the `meta` collection, which tells
+    the API that its cached responses are stale.
+    """
+    collection.database['meta'].update_one({'_id': collection.name}, {'$inc': {'version': 1}}, upsert=True)
+
+# =====================================================================
+# CHANGE SEQUENCE (FOR /movies/changes)
+# =====================================================================
+# Every movie whose content changes, and every tombstone of a deleted movie,
+# is stamped with the next value of the collection's 'seq' counter in `meta`.
+# A batch reserves its numbers before writing and stays listed in
+# 'pending_seqs' until its write is done; the API never hands out a token past
+# the lowest pending range, so a client cannot skip a batch that another
+# worker is still writing.
+
+def tombstones_for(collection):
+    return collection.database[f'{collection.name}_tombstones']
+
+def reserve_seqs(collection, count):
+    """
+    Reserves `count` consecutive sequence numbers and returns (first, reservation id).
+    The reservation is listed with a floor no higher than `first`.
+    """
+    meta = collection.database['meta']
+    current = (meta.find_one({'_id': collection.name}, {'seq': 1}) or {}).get('seq', 0)
+    reservation = ObjectId()
+    doc = meta.find_one_and_update(
+        {'_id': collection.name},
+        {
+            '$inc': {'seq': count},
+            '$push': {'pending_seqs': {'id': reservation, 'floor': current + 1, 'at': time.time()}},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return doc['seq'] - count + 1, reservation
+
+def release_seqs(collection, reservation, bump=True):
+    """Ends a reservation once its batch is written, bumping the collection version by default."""
+    update = {'$pull': {'pending_seqs': {'id': reservation}}}
+    if bump:
+        update['$inc'] = {'version': 1}
+    collection.database['meta'].update_one({'_id': collection.name}, update)
+
+def content_hash_of(movie_data):
+    """The hash the pipeline compares to decide whether a movie really changed."""
+    return content_hash({key: value for key, value in movie_data.items() if key not in ('_id', 'updated_seq', 'content_hash')})
+
+def upsert_operation(movie, seq):
+    """
+    Upserts `movie` on 'source_imdb_url', stamping it with `seq` only when its
+    content hash differs from the stored one (or it is new).
+    """
+    digest = content_hash_of(movie)
+    fields = {**movie, 'content_hash': digest}
+    return UpdateOne(
+        {'source_imdb_url': movie['source_imdb_url']},
+        [
+            {'$set': {'updated_seq': {'$cond': [{'$eq': ['$content_hash', digest]}, '$updated_seq', seq]}}},
+            # $literal keeps strings starting with '$' and nested objects (cast) as plain values
+            {'$set': {key: {'$literal': value} for key, value in fields.items()}},
+        ],
+        upsert=True,
+    )
+
+def delete_movies(collection, urls):
+    """
+    Deletes the movies scraped from `urls`, leaving a tombstone (the movie id
+    and a sequence number) so /movies/changes can report the deletion.
+    """
+    movies = list(collection.find({'source_imdb_url': {'$in': list(urls)}}, {'source_imdb_url': 1}))
+    if not movies:
+        return 0
+    first, reservation = reserve_seqs(collection, len(movies))
+    try:
+        tombstones_for(collection).insert_many([
+            {'movie_id': movie['_id'], 'source_imdb_url': movie['source_imdb_url'], 'updated_seq': first + i, 'deleted_at': time.time()}
+            for i, movie in enumerate(movies)
+        ])
+        deleted = collection.delete_many({'_id': {'$in': [movie['_id'] for movie in movies]}}).deleted_count
+    finally:
+        release_seqs(collection, reservation)
+    return deleted
+
+def backfill_updated_seq(collection, batch_size=500):
+    """
+    Stamps every movie saved before change tracking existed with a sequence
+    number and content hash, reading `batch_size` movies at a time.
+    """
+    updated = 0
+    cursor = collection.find({'updated_seq': {'$exists': False}}, batch_size=batch_size)
+    while True:
+        batch = list(itertools.islice(cursor, batch_size))
+        if not batch:
+            break
+        first, reservation = reserve_seqs(collection, len(batch))
+        try:
+            operations = [
+                UpdateOne({'_id': movie['_id']}, {'$set': {'updated_seq': first + i, 'content_hash': content_hash_of(movie)}})
+                for i, movie in enumerate(batch)
+            ]
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+        finally:
+            release_seqs(collection, reservation)
+    return updated
+
+# =====================================================================
+# BATCHED MONGODB WRITER
+# =====================================================================
+class MongoWriter:
+    """
+    A long-lived writer that reuses one pooled `MongoClient` for the whole run.
+    Upserts are buffered by 'source_imdb_url' (a later record for the same movie
+    replaces the earlier one) and sent as unordered `bulk_write` batches once
+    `batch_size` records are waiting or `flush_interval` seconds have passed.
+
+    After every flush each of `listeners` is called with (written, failed): the
+    records (as passed to `add`) MongoDB acknowledged, and those it did not.
+    """
+    def __init__(self, uri=None, collection=None, batch_size=MONGO_BATCH_SIZE, flush_interval=MONGO_FLUSH_INTERVAL, listeners=None):
+        self._client = None
+        if collection is None:
+            # maxPoolSize bounds the sockets shared by every scraper thread
+            self._client = MongoClient(uri or MONGO_URI, maxPoolSize=10)
+            collection = self._client.get_default_database()['movies']
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.listeners = listeners if listeners is not None else []
+
+        self._buffer = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self.written = 0
+        self.failed = 0
+
+        self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._timer.start()
+
+    def add(self, movie_data):
+        """Queues one movie for upsert, flushing if the batch is full."""
+        key = movie_data['source_imdb_url']
+        with self._lock:
+            self._buffer[key] = movie_data
+            is_full = len(self._buffer) >= self.batch_size
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        """Sends everything currently buffered as one unordered bulk write."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer.values())
+                self._buffer = {}
+            if not batch:
+                return
+
+            reservation = None
+            with METRICS.span('db_upsert') as span:
+                try:
+                    # Unchanged movies keep their old updated_seq, so their reserved number is simply unused
+                    records = complete_records(self.collection, batch)
+                    first, reservation = reserve_seqs(self.collection, len(batch))
+                    operations = [
+                        upsert_operation(
+                            {**movie, 'discrepancy': compute_discrepancy(movie), 'search_terms': compute_search_terms(movie)},
+                            first + i,
+                        )
+                        for i, movie in enumerate(records)
+                    ]
+                    self.collection.bulk_write(operations, ordered=False)
+                    self.written += len(batch)
+                    span['records'] = len(batch)
+                    release_seqs(self.collection, reservation)
+                    written, failed = batch, []
+                except BulkWriteError as e:
+                    # With ordered=False every other operation of the batch is still applied
+                    errors = e.details.get('writeErrors', [])
+                    for error in errors:
+                        movie = batch[error['index']]
+                        tqdm.write(f"❌ Error saving '{movie.get('title', 'N/A')}' to MongoDB: {error.get('errmsg')}")
+                    # The writes were applied, but not acknowledged by as many members as asked for
+                    for error in e.details.get('writeConcernErrors', []):
+                        tqdm.write(f"⚠️ MongoDB write concern error: {error.get('errmsg')}")
+                    self.failed += len(errors)
+                    self.written += len(batch) - len(errors)
+                    span['records'] = len(batch) - len(errors)
+                    span['error'] = True
+                    try:
+                        release_seqs(self.collection, reservation)
+                    except Exception as release_error:
+                        # The API stops waiting for it after CHANGES_PENDING_TIMEOUT
+                        tqdm.write(f"❌ Could not release the batch's sequence numbers: {release_error}")
+                    failed_indexes = {error['index'] for error in errors}
+                    written = [movie for i, movie in enumerate(batch) if i not in failed_indexes]
+                    failed = [batch[i] for i in sorted(failed_indexes)]
+                except Exception as e:
+                    # Connection-level problems fail the whole batch
+                    tqdm.write(f"❌ An unexpected error occurred with MongoDB: {e}")
+                    self.failed += len(batch)
+                    span['error'] = True
+                    if reservation is not None:
+                        try:
+                            # Part of the batch may have been written before the error: bump the
+                            # version so no cached response outlives it
+                            release_seqs(self.collection, reservation)
+                        except Exception:
+                            pass  # The API stops waiting for it after CHANGES_PENDING_TIMEOUT
+                    self._notify([], batch)
+                    return
+
+            tqdm.write(f"✅ Saved a batch of {len(batch)} movies to MongoDB.")
+            self._notify(written, failed)
+
+    def _notify(self, written, failed):
+        for listener in self.listeners:
+            try:
+                listener(written, failed)
+            except Exception as e:
+                tqdm.write(f"❌ A MongoDB write listener failed: {type(e).__name__}: {e}")
+
+    def close(self):
+        """Flushes the remaining records and releases the connection pool."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+        if self._client:
+            self._client.close()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+# Told about every flush of the process-wide writer (see MongoWriter)
+_write_listeners = []
+
+def get_writer():
+    """Returns the process-wide writer, creating it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = MongoWriter(listeners=_write_listeners)
+            atexit.register(_writer.close)
+        return _writer
+
+def add_write_listener(listener):
+    """Calls `listener(written, failed)` after every flush of the process-wide writer."""
+    _write_listeners.append(listener)
+
+def remove_write_listener(listener):
+    if listener in _write_listeners:
+        _write_listeners.remove(listener)
+
+def use_collection(collection, **kwargs):
+    """Sends the process-wide writer's upserts to `collection` instead (benchmarks and tests)."""
+    global _writer
+    close_writer()
+    with _writer_lock:
+        _writer = MongoWriter(collection=collection, listeners=_write_listeners, **kwargs)
+        atexit.register(_writer.close)
+        return _writer
 
 def save_to_mongodb(movie_data):
     """
-    Connects to MongoDB and saves a single movie's data.
-    Uses 'update_one' with 'upsert=True' to prevent duplicate entries based on the
-    source IMDb URL.
+    Queues a single movie's data on the shared writer. The upsert on
+    'source_imdb_url' still prevents duplicate entries; it is simply sent to
+    MongoDB together with other movies instead of on its own connection.
     """
     if not MONGO_URI:
         # Use tqdm.write so the message doesn't interfere with the progress bar
         tqdm.write("❌ MONGO_URI not found in .env file. Cannot save to database.")
         return
 
-    client = None
     try:
-        # 1. Establish a connection to the MongoDB server
-        client = MongoClient(MONGO_URI)
-        
-        # 2. Select your database (the default one from the URI)
-        db = client.get_default_database()
-        
-        # 3. Select your collection
-        collection = db['movies']
-        
-        # 4. Use 'update_one' for an "upsert" operation.
-        # This checks if a document with the 'source_imdb_url' already exists.
-        # If it does, it updates it. If not, it inserts it.
-        # This is the key fix to match the scraper's data structure.
-        collection.update_one(
-            {'source_imdb_url': movie_data['source_imdb_url']},
-            {'$set': movie_data},
-            upsert=True
-        )
-        
-        # Use tqdm.write for clean output with the progress bar
-        tqdm.write(f"✅ Successfully saved '{movie_data.get('title', 'N/A')}' to MongoDB.")
-        
+        get_writer().add(movie_data)
     except KeyError as e:
         # This will catch if 'source_imdb_url' is missing for some reason
         tqdm.write(f"❌ Error saving to MongoDB: Missing key {e} in movie data.")
-        
-    except Exception as e:
-        # Catch other potential database errors (e.g., connection issues)
-        tqdm.write(f"❌ An unexpected error occurred with MongoDB: {e}")
-        
-    finally:
-        # 5. Ensure the connection is always closed
-        if client:
-            client.close()
\ No newline at end of file
+
+def close_writer():
+    """Flushes and closes the shared writer, if one was created."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+# =====================================================================
+# MAINTENANCE ENTRY POINT
+# =====================================================================
+if __name__ == "__main__":
+    # python scraper/pipeline.py  ->  backfill derived fields on existing movies
+    # python scraper/pipeline.py --delete URL [URL ...]  ->  delete movies, leaving tombstones
+    parser = argparse.ArgumentParser(description="Maintenance of the movies collection.")
+    parser.add_argument("--delete", metavar="IMDB_URL", nargs="+", help="Delete these movies (by source_imdb_url)")
+    args = parser.parse_args()
+
+    with MongoClient(MONGO_URI) as client:
+        movies = client.get_default_database()['movies']
+        if args.delete:
+            print(f"✅ Deleted {delete_movies(movies, args.delete)} movies.")
+        else:
+            print(f"✅ Backfilled 'discrepancy' on {backfill_discrepancy(movies)} movies.")
+            print(f"✅ Backfilled 'search_terms' on {backfill_search_terms(movies)} movies.")
+            print(f"✅ Backfilled 'updated_seq' on {backfill_updated_seq(movies)} movies.")
+            bump_version(movies)
@@ -0,0 +1,179 @@
+# scraper/replay.py
+#
+# Records the real responses behind a scrape into a fixture archive and serves
+# them again from a local HTTP server, so the scraper can be benchmarked
+# offline (see `python scraper/benchmark.py --record / --replay`).
+
+import hashlib
+import json
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+INDEX_NAME = "index.json"
+
+# =====================================================================
+# FIXTURE ARCHIVE
+# =====================================================================
+class FixtureArchive:
+    """
+    A zip file holding one body per recorded URL plus an index.json with the
+    list page that was discovered, the number of movies scraped from it, and
+    the status code and content type of each response.
+    """
+    def __init__(self, path, list_url=None, movies=0):
+        self.path = path
+        self.list_url = list_url
+        self.movies = movies
+        self.index = {}
+        self.bodies = {}
+
+    @classmethod
+    def load(cls, path):
+        with zipfile.ZipFile(path) as zf:
+            manifest = json.loads(zf.read(INDEX_NAME))
+            archive = cls(path, manifest["list_url"], manifest["movies"])
+            archive.index = manifest["responses"]
+            for url, entry in archive.index.items():
+                archive.bodies[url] = zf.read(entry["file"])
+        return archive
+
+    def add(self, url, status, content_type, body):
+        name = "bodies/" + hashlib.sha1(url.encode()).hexdigest()
+        self.index[url] = {"status": status, "content_type": content_type, "file": name}
+        self.bodies[url] = body
+
+    def save(self):
+        with zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            manifest = {"list_url": self.list_url, "movies": self.movies, "responses": self.index}
+            zf.writestr(INDEX_NAME, json.dumps(manifest, indent=1, sort_keys=True))
+            for url, entry in self.index.items():
+                zf.writestr(entry["file"], self.bodies[url])
+
+    def get(self, url):
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        return entry["status"], entry["content_type"], self.bodies[url]
+
+
+def _record(archive, response):
+    # Keyed on the URL as requests sent it (before any redirect), which is
+    # also what the ReplayAdapter asks the server for
+    first = response.history[0] if response.history else response
+    archive.add(first.request.url, response.status_code, response.headers.get("Content-Type", ""), response.content)
+
+
+def recording_fetch(fetch, archive):
+    """Wraps the scraper's `fetch` so every response (errors included) is added to `archive`."""
+    def fetch_and_record(url, source, **kwargs):
+        try:
+            response = fetch(url, source, **kwargs)
+        except requests.HTTPError as e:
+            _record(archive, e.response)
+            raise
+        _record(archive, response)
+        return response
+    return fetch_and_record
+
+# =====================================================================
+# REPLAY SERVER
+# =====================================================================
+class ReplayServer:
+    """
+    Serves an archive on 127.0.0.1. Each response waits `latency` seconds
+    (plus up to `jitter` more) and a seeded `error_rate` fraction of requests
+    answers `error_status` instead, to exercise retries and failure paths.
+    URLs in `never_fail` (e.g. the list page) are always served.
+    Requests look like GET /replay?url=<original url>.
+    """
+    def __init__(self, archive, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=42, never_fail=()):
+        self.archive = archive
+        self.never_fail = set(never_fail)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.served = 0
+        self.errors = 0
+        self.missing = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def _make_handler(self):
+        replay = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = parse_qs(urlparse(self.path).query).get("url", [""])[0]
+                with replay._lock:
+                    delay = replay.latency + replay._random.uniform(0, replay.jitter)
+                    inject_error = replay._random.random() < replay.error_rate and url not in replay.never_fail
+                time.sleep(delay)
+
+                recorded = replay.archive.get(url)
+                with replay._lock:
+                    if recorded is None:
+                        replay.missing += 1
+                    elif inject_error:
+                        replay.errors += 1
+                    else:
+                        replay.served += 1
+                if recorded is None:
+                    self.send_error(404, "Not in the fixture archive")
+                    return
+                if inject_error:
+                    self.send_error(replay.error_status)
+                    return
+                status, content_type, body = recorded
+                self.send_response(status)
+                self.send_header("Content-Type", content_type or "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return ReplayHandler
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    A requests transport adapter that sends every request to a ReplayServer
+    instead of the real host, so the scraper runs unchanged against fixtures.
+    """
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        request.url = f"{self.base_url}/replay?url={quote(original_url, safe='')}"
+        response = super().send(request, **kwargs)
+        response.url = original_url
+        return response
+
+
+def replay_session(base_url):
+    session = requests.Session()
+    adapter = ReplayAdapter(base_url, pool_connections=4, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
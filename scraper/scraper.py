@@ -1,84 +1,185 @@
 # scraper/scraper.py
 
+import argparse
+import functools
+import json
+import os
 import requests
-from bs4 import BeautifulSoup
-import time
+import signal
+import sys
 import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
+from dotenv import load_dotenv
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-
-from pipeline import save_to_mongodb
+from pipeline import add_write_listener, save_to_mongodb, close_writer
+from throttle import HostLimiter, RetryPolicy, parse_retry_after
+from cache import ResponseCache, LookupCache
+from metrics import METRICS, publish_run_metrics, start_metrics_server
+import discovery
+from extract import IMDB_FIELDS, PARSER_VERSION, RT_SEARCH_FIELDS, RT_MOVIE_FIELDS, extract_fields, parse_html
 from tqdm import tqdm
 
+load_dotenv()
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
     'Accept-Language': 'en-US,en;q=0.9'
 }
 
+RT_SEARCH_URL = "https://www.rottentomatoes.com/search?search={}"
+
 # =====================================================================
-# FUNCTION TO GET MOVIE URLS (STABLE)
+# CONCURRENCY AND PER-HOST RATE LIMITS
 # =====================================================================
-def get_movie_urls(list_url):
-    print(f"Fetching movie URLs from: {list_url} using Selenium...")
-    
-    # Configure Selenium WebDriver
-    service = Service(executable_path='./chromedriver.exe')
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('user-agent=' + HEADERS['User-Agent'])
-    options.add_argument("--lang=en-US")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-    
-    driver = webdriver.Chrome(service=service, options=options)
-    wait = WebDriverWait(driver, 20) # Increased wait time for reliability
+# Each source gets its own cap on in-flight requests and its own token bucket,
+# which replaces the old global `time.sleep(1.5)` between movies. The cap
+# shrinks when a host answers 429 and its circuit opens after
+# CIRCUIT_FAILURE_THRESHOLD consecutive failures.
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", 8))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+
+LIMITERS = {
+    "imdb": HostLimiter(
+        max_concurrency=int(os.getenv("IMDB_CONCURRENCY", 4)),
+        rate=float(os.getenv("IMDB_RATE_PER_SEC", 2)),
+        name="imdb",
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=CIRCUIT_RESET_SECONDS,
+    ),
+    "rt": HostLimiter(
+        max_concurrency=int(os.getenv("RT_CONCURRENCY", 2)),
+        rate=float(os.getenv("RT_RATE_PER_SEC", 2)),
+        name="rt",
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=CIRCUIT_RESET_SECONDS,
+    ),
+}
+
+# Transient failures (timeouts, connection errors, 429 and 5xx) are retried
+# with jittered exponential backoff, or after the server's Retry-After
+RETRY_POLICY = RetryPolicy(
+    retries=int(os.getenv("FETCH_RETRIES", 3)),
+    base=float(os.getenv("FETCH_BACKOFF_BASE", 0.5)),
+    cap=float(os.getenv("FETCH_BACKOFF_MAX", 30)),
+)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", 15))
+
+_thread_local = threading.local()
+
+def get_session():
+    """Returns a keep-alive `requests.Session` owned by the calling worker thread."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _thread_local.session = session
+    return session
+
+def fetch(url, source, headers=None, timeout=None, stage=None):
+    """
+    Performs a GET request for `url` while holding a slot of the given source's
+    limiter, then raises for HTTP error statuses. Transient failures are
+    retried per RETRY_POLICY (honoring Retry-After), and while the source's
+    circuit is open CircuitOpenError is raised without sending anything. The
+    request (limiter waits and retries included) is recorded as a span of `stage`.
+    """
+    limiter = LIMITERS[source]
+    with METRICS.span(stage or f"{source}_fetch") as span:
+        for attempt in range(RETRY_POLICY.retries + 1):
+            limiter.breaker.check()
+            retry_after = None
+            try:
+                with limiter.slot():
+                    response = get_session().get(url, headers=headers, timeout=timeout or FETCH_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout):
+                limiter.on_failure()
+                if attempt == RETRY_POLICY.retries:
+                    raise
+            except requests.RequestException:
+                limiter.on_failure()
+                raise
+            except Exception:
+                # Not the host's fault (e.g. the shared rate limit's MongoDB is
+                # down), but a half-open trial must not stay claimed forever
+                limiter.breaker.release_trial()
+                raise
+            else:
+                span["status"] = response.status_code
+                span["bytes"] = span.get("bytes", 0) + len(response.content)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    # 404s and the like are answers, not signs of a struggling host
+                    limiter.on_success()
+                    response.raise_for_status()
+                    return response
+                limiter.on_failure(throttled=response.status_code == 429)
+                if attempt == RETRY_POLICY.retries:
+                    response.raise_for_status()
+                retry_after = parse_retry_after(response)
+            span["retries"] = attempt + 1
+            RETRY_POLICY.wait(attempt, retry_after)
+
+# =====================================================================
+# PERSISTENT RESPONSE CACHE
+# =====================================================================
+# Pages younger than their source's TTL (in seconds) are not requested at all;
+# older ones are revalidated with If-None-Match / If-Modified-Since.
+RESPONSE_CACHE = ResponseCache(
+    os.getenv("SCRAPER_CACHE_PATH", "scraper_cache.sqlite3"),
+    ttls={
+        "imdb": float(os.getenv("IMDB_CACHE_TTL", 6 * 3600)),
+        "rt": float(os.getenv("RT_CACHE_TTL", 6 * 3600)),
+    },
+    observer=METRICS.count_cache,
+    parser_version=PARSER_VERSION,
+)
+
+def remember_saved_records(written, failed):
+    """Remembers the records MongoDB acknowledged, so they are skipped while unchanged."""
+    RESPONSE_CACHE.remember_records(written)
+
+add_write_listener(remember_saved_records)
+
+# (normalized title, year) -> RT movie page; "not found" is remembered for
+# RT_NEGATIVE_TTL seconds.
+RT_LOOKUPS = LookupCache(
+    os.getenv("SCRAPER_CACHE_PATH", "scraper_cache.sqlite3"),
+    negative_ttl=float(os.getenv("RT_NEGATIVE_TTL", 7 * 24 * 3600)),
+)
+
+# =====================================================================
+# FUNCTION TO GET MOVIE URLS (PLUGGABLE DISCOVERY)
+# =====================================================================
+# "http" parses the list page's embedded JSON/HTML with a plain request;
+# "selenium" drives headless Chrome and needs chromedriver.
+DISCOVERY_BACKEND = os.getenv("SCRAPER_DISCOVERY", "http")
+SELENIUM_FALLBACK = os.getenv("SCRAPER_SELENIUM_FALLBACK", "0") == "1"
+
+@METRICS.timed("discovery")
+def get_movie_urls(list_url, backend=None, limit=250):
+    backend = backend or DISCOVERY_BACKEND
+    print(f"Fetching movie URLs from: {list_url} using {backend} discovery...")
     urls = []
 
     try:
-        driver.get(list_url)
-        print("Browser session started. Waiting for page to load...")
-        
-        # Scroll down to ensure all movies are loaded on the page
-        print("Scrolling down to load all movies...")
-        body = wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-        for _ in range(12): # Increased scroll count
-            body.send_keys(Keys.PAGE_DOWN)
-            time.sleep(0.5)
-
-        print("Finished scrolling. Finding all link elements...")
-        
-        # Wait for movie links to be present
-        movie_elements = wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.ipc-title-link-wrapper")))
-        print(f"Found {len(movie_elements)} potential link elements. Filtering now...")
-
-        seen_urls = set()
-        for link_element in movie_elements:
-            href = link_element.get_attribute('href')
-            if href and '/title/tt' in href:
-                # Get the base URL without query parameters
-                full_url = href.split('?')[0]
-                if full_url not in seen_urls:
-                    seen_urls.add(full_url)
-                    urls.append(full_url)
-
+        if backend == "selenium":
+            urls = discovery.discover_with_selenium(list_url, HEADERS['User-Agent'])
+        else:
+            urls = discovery.discover_with_http(list_url, functools.partial(fetch, stage="list_fetch"))
     except Exception as e:
-        print(f"❌ An error occurred during Selenium navigation: {e}")
+        print(f"❌ An error occurred during {backend} discovery: {e}")
 
-    finally:
-        print("Closing the browser session.")
-        driver.quit()
+    if not urls and backend != "selenium" and SELENIUM_FALLBACK:
+        print("No movies found over HTTP, falling back to Selenium...")
+        return get_movie_urls(list_url, backend="selenium", limit=limit)
 
-    # Limit to a maximum of 250 URLs
-    final_urls = urls[:250]
+    # Limit to a maximum of `limit` URLs (250 for the Top 250 chart)
+    final_urls = urls[:limit]
     
     print(f"✅ Found {len(final_urls)} movie URLs after filtering.")
     return final_urls
@@ -86,57 +187,116 @@ def get_movie_urls(list_url):
 # =====================================================================
 # REWRITTEN FUNCTION TO GET ROTTEN TOMATOES DATA (MORE ROBUST)
 # =====================================================================
+@METRICS.timed("rt_parse")
+def parse_rt_search(content):
+    """
+    Parses a Rotten Tomatoes search page into a list of movie results, each with
+    its release year, URL and scores.
+    """
+    results = []
+    for movie in extract_fields(parse_html(content), RT_SEARCH_FIELDS)["results"]:
+        try:
+            tomatometer = movie["tomatometer_score"]
+            audience_score = movie["audience_score"]
+            results.append({
+                "release_year": int(movie["release_year"] or 0),
+                "rotten_tomatoes_url": movie["rotten_tomatoes_url"],
+                "tomatometer_score": int(tomatometer) if tomatometer else None,
+                "audience_score": int(audience_score) if audience_score else None,
+                "title": movie["title"]
+            })
+        except (ValueError, TypeError):
+            # If one search result has bad data, skip it and check the next one
+            continue
+    return results
+
+@METRICS.timed("rt_parse")
+def parse_rt_movie_page(content):
+    """Reads the Tomatometer and audience scores from a Rotten Tomatoes movie page."""
+    raw = extract_fields(parse_html(content), RT_MOVIE_FIELDS)
+    scores = {}
+    for key, fallback in (("critics_score", "board_critics_score"), ("audience_score", "board_audience_score")):
+        digits = re.sub(r'\D', '', raw[key] or raw[fallback] or '')
+        scores[key] = int(digits) if digits else None
+    return {"tomatometer_score": scores["critics_score"], "audience_score": scores["audience_score"]}
+
+def normalize_title(title):
+    """Lower-cases a title and strips accents, punctuation and a leading article."""
+    title = unicodedata.normalize('NFKD', title).encode('ascii', 'ignore').decode()
+    title = title.lower().replace('&', ' and ')
+    title = re.sub(r'[^a-z0-9]+', ' ', title).strip()
+    return re.sub(r'^(the|a|an) ', '', title)
+
+def match_rt_result(results, movie_title, movie_year):
+    """
+    Picks the search result for a movie. A result whose normalized title matches
+    wins, preferring the exact release year over one year either side (RT and
+    IMDb often disagree by a year). Without a title match, an exact year match
+    is used as before.
+    """
+    wanted = normalize_title(movie_title)
+    candidates = []
+    for movie in results:
+        year_gap = abs(movie["release_year"] - movie_year)
+        title_matches = normalize_title(movie.get("title") or "") == wanted
+        if title_matches and year_gap <= 1:
+            candidates.append((0, year_gap, movie))
+        elif year_gap == 0:
+            candidates.append((1, 0, movie))
+    if not candidates:
+        return None
+    return min(candidates, key=lambda candidate: candidate[:2])[2]
+
 def get_rotten_tomatoes_data(movie_title, movie_year):
     """
-    Searches Rotten Tomatoes and scrapes scores directly from the search results page.
-    This is more efficient and less likely to break than visiting each movie page.
+    Finds the Rotten Tomatoes scores for a movie. Once a movie's RT page is known
+    (from an earlier run) its scores are read straight from that page; otherwise
+    RT is searched and the scores are taken from the search results page. Movies
+    that could not be found are not searched again until their negative entry
+    expires, and a known page that is gone (404/410) is forgotten and searched
+    for again.
+
+    Returns an empty dict when RT could not be reached (timeouts, 5xx, open
+    circuit): the RT fields are then left out of the record, so the pipeline
+    keeps the scores already stored instead of overwriting them with None.
     """
     default_rt_data = {"rotten_tomatoes_url": "N/A", "tomatometer_score": None, "audience_score": None}
+    lookup_key = f"{normalize_title(movie_title)}|{movie_year}"
     try:
-        search_query = quote(movie_title)
-        search_url = f"https://www.rottentomatoes.com/search?search={search_query}"
-        
-        # Use a timeout to prevent the script from hanging indefinitely
-        response = requests.get(search_url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # The search results are within a <search-page-result> custom element
-        search_results_container = soup.find("search-page-result")
-        if not search_results_container:
+        found, known = RT_LOOKUPS.get(lookup_key)
+        if found and known is None:
+            RT_LOOKUPS.count("negative_hits")
             return default_rt_data
+        if found:
+            try:
+                scores = RESPONSE_CACHE.get_or_fetch(known["rotten_tomatoes_url"], "rt", fetch, parse_rt_movie_page, stage="rt_page")
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 410):
+                    raise
+                # The page moved (RT renames slugs): search for the movie again
+                RT_LOOKUPS.delete(lookup_key)
+            else:
+                if scores["tomatometer_score"] is not None or scores["audience_score"] is not None:
+                    RT_LOOKUPS.count("hits")
+                    return {"rotten_tomatoes_url": known["rotten_tomatoes_url"], **scores}
+                # The page layout did not give us any score; fall back to a search
 
-        # Find all individual movie results within the container
-        movie_results = search_results_container.find_all("search-page-media-row")
+        RT_LOOKUPS.count("misses")
+        search_url = RT_SEARCH_URL.format(quote(movie_title))
+        results = RESPONSE_CACHE.get_or_fetch(search_url, "rt", fetch, parse_rt_search, stage="rt_search")
 
-        for movie in movie_results:
-            try:
-                # Match the movie by its release year to find the correct entry
-                release_year = int(movie.get('releaseyear', 0))
-                if release_year == movie_year:
-                    tomatometer = movie.get('tomatometerscore')
-                    audience_score = movie.get('audiencescore')
-                    
-                    # The URL is in an <a> tag within the result
-                    link_tag = movie.find('a', {'data-qa': 'info-name'})
-                    movie_url = link_tag['href'] if link_tag else "N/A"
-                    
-                    return {
-                        "rotten_tomatoes_url": movie_url,
-                        "tomatometer_score": int(tomatometer) if tomatometer else None,
-                        "audience_score": int(audience_score) if audience_score else None
-                    }
-            except (ValueError, TypeError, AttributeError):
-                # If one search result has bad data, skip it and check the next one
-                continue 
-
-        return default_rt_data # Return default if no matching movie was found
+        movie = match_rt_result(results, movie_title, movie_year)
+        if movie is None or movie["rotten_tomatoes_url"] == "N/A":
+            RT_LOOKUPS.put(lookup_key, None)
+            return default_rt_data # Return default if no matching movie was found
+
+        RT_LOOKUPS.put(lookup_key, {"rotten_tomatoes_url": movie["rotten_tomatoes_url"]})
+        return {key: movie[key] for key in default_rt_data}
 
     except Exception as e:
-        # Catch errors from the request (e.g., timeout, connection error)
-        tqdm.write(f"⚠️ Could not fetch RT data for '{movie_title}': {type(e).__name__}")
-        return default_rt_data
+        # Catch errors from the request (e.g., timeout, connection error, open circuit)
+        tqdm.write(f"⚠️ Could not fetch RT data for '{movie_title}', keeping the stored scores: {type(e).__name__}")
+        return {}
 
 # =====================================================================
 # FUNCTION TO SCRAPE AND PROCESS ALL DETAILS (IMDB + RT)
@@ -148,86 +308,163 @@ def convert_runtime_to_minutes(runtime_str):
     total_minutes = (hours * 60) + minutes
     return total_minutes if total_minutes > 0 else None
 
+@METRICS.timed("imdb_parse")
+def parse_imdb_page(content):
+    """Extracts and cleans the IMDb fields of a movie from its title page."""
+    # --- Scrape Raw Data from IMDb (one pass per field, see extract.IMDB_FIELDS) ---
+    raw = extract_fields(parse_html(content), IMDB_FIELDS)
+
+    # --- Clean and Structure Data ---
+    clean_year = int(raw["year"]) if raw["year"].isdigit() else None
+    clean_rating = float(raw["rating"]) if raw["rating"].replace('.', '', 1).isdigit() else None
+    clean_runtime_minutes = convert_runtime_to_minutes(raw["runtime"])
+        
+    return {
+        "title": raw["title"], 
+        "year": clean_year, 
+        "imdb_rating": clean_rating,
+        "director": raw["director"], 
+        "poster_url": raw["poster_url"], 
+        "plot_summary": raw["plot_summary"],
+        "genres": raw["genres"], 
+        "runtime_minutes": clean_runtime_minutes, 
+        "cast": raw["cast"], 
+    }
+
+def scrape_movie(url, save=None):
+    """
+    Scrapes all data for a single movie from IMDb, adds its Rotten Tomatoes
+    scores and queues the record for MongoDB (through `save`, save_to_mongodb
+    by default). Errors are raised to the caller, so the work queue can retry
+    the URL later.
+    """
+    # Unchanged pages are served from the response cache without re-parsing
+    movie_data = RESPONSE_CACHE.get_or_fetch(url, "imdb", fetch, parse_imdb_page, stage="imdb_fetch")
+    movie_data["source_imdb_url"] = url
+    raw_title, clean_year = movie_data["title"], movie_data["year"]
+    
+    # --- Scrape Rotten Tomatoes Data and Add to Dictionary ---
+    if raw_title != "N/A" and clean_year is not None:
+        tqdm.write(f"Fetching RT data for: {raw_title} ({clean_year})...")
+        rt_data = get_rotten_tomatoes_data(raw_title, clean_year)
+        movie_data.update(rt_data)
+    else:
+        movie_data.update({"rotten_tomatoes_url": "N/A", "tomatometer_score": None, "audience_score": None})
+    
+    # --- Save Final Record to Database (only if it changed since the last run) ---
+    if RESPONSE_CACHE.record_changed(url, movie_data):
+        (save or save_to_mongodb)(movie_data)
+    else:
+        PROGRESS.count("cached")
+    return movie_data
+
 def scrape_movie_details(url):
     """
     Scrapes all data for a single movie from IMDb, then calls the Rotten Tomatoes
-    function to get additional scores.
+    function to get additional scores. Returns None if anything fails.
     """
+    if CANCELLED.is_set():
+        return None
     try:
-        # Use a timeout to prevent hanging
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # --- Scrape Raw Data from IMDb ---
-        raw_title = soup.find('h1').get_text(strip=True) if soup.find('h1') else "N/A"
-        raw_year = soup.select_one('h1 ~ ul a').get_text(strip=True) if soup.select_one('h1 ~ ul a') else "N/A"
-        raw_rating = soup.select_one('div[data-testid="hero-rating-bar__aggregate-rating__score"] span').get_text(strip=True) if soup.select_one('div[data-testid="hero-rating-bar__aggregate-rating__score"] span') else "N/A"
-        raw_director = soup.select_one('li[data-testid="title-pc-principal-credit"] a').get_text(strip=True) if soup.select_one('li[data-testid="title-pc-principal-credit"] a') else "N/A"
-        poster_img = soup.select_one('div[data-testid="hero-media__poster"] img')
-        poster_url = poster_img['src'] if poster_img else "N/A"
-        plot_summary = soup.select_one('span[data-testid="plot-l"]').get_text(strip=True) if soup.select_one('span[data-testid="plot-l"]') else "N/A"
-        genres = [link.get_text(strip=True) for link in soup.select('div[data-testid="genres"] a')]
-        
-        runtime_text = next((item.get_text(strip=True) for item in soup.select('h1 ~ ul li') if 'h' in item.get_text() or 'm' in item.get_text()), "N/A")
-        
-        cast = []
-        for item in soup.select('div[data-testid="title-cast-item"]')[:5]:
-            actor = item.select_one('a[data-testid="title-cast-item__actor"]')
-            character = item.select_one('a[data-testid="cast-item-character-name"]')
-            cast.append({
-                "actor": actor.get_text(strip=True) if actor else "N/A",
-                "character": character.get_text(strip=True) if character else "N/A"
-            })
-
-        # --- Clean and Structure Data ---
-        clean_year = int(raw_year) if raw_year.isdigit() else None
-        clean_rating = float(raw_rating) if raw_rating.replace('.', '', 1).isdigit() else None
-        clean_runtime_minutes = convert_runtime_to_minutes(runtime_text)
-            
-        movie_data = {
-            "title": raw_title, 
-            "year": clean_year, 
-            "imdb_rating": clean_rating,
-            "director": raw_director, 
-            "poster_url": poster_url, 
-            "plot_summary": plot_summary,
-            "genres": genres, 
-            "runtime_minutes": clean_runtime_minutes, 
-            "cast": cast, 
-            "source_imdb_url": url
-        }
-        
-        # --- Scrape Rotten Tomatoes Data and Add to Dictionary ---
-        if raw_title != "N/A" and clean_year is not None:
-            tqdm.write(f"Fetching RT data for: {raw_title} ({clean_year})...")
-            rt_data = get_rotten_tomatoes_data(raw_title, clean_year)
-            movie_data.update(rt_data)
-        else:
-            movie_data.update({"rotten_tomatoes_url": "N/A", "tomatometer_score": None, "audience_score": None})
-        
-        # --- Save Final Record to Database ---
-        save_to_mongodb(movie_data)
-        return movie_data
-
+        return scrape_movie(url)
     except Exception as e:
         tqdm.write(f"❌ An error occurred scraping {url}: {type(e).__name__}")
         return None
 
+# =====================================================================
+# RUN PROGRESS AND CANCELLATION
+# =====================================================================
+PROGRESS_PREFIX = "@@progress "
+
+class ScrapeProgress:
+    """
+    Thread-safe counters for a run: URLs done, failed and cached (unchanged
+    since the last run, so not saved again). With `emit_json` every update is
+    also printed as a PROGRESS_PREFIX line, which the API's job manager reads
+    from the scraper's stdout.
+    """
+    def __init__(self, emit_json=False):
+        self.emit_json = emit_json
+        self.stage = "starting"
+        self.counts = {"total": 0, "done": 0, "failed": 0, "cached": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage, total=None):
+        with self._lock:
+            self.stage = stage
+            if total is not None:
+                self.counts["total"] = total
+            self._emit()
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+            self._emit()
+
+    def _emit(self):
+        if self.emit_json:
+            print(PROGRESS_PREFIX + json.dumps({"stage": self.stage, **self.counts}), flush=True)
+
+PROGRESS = ScrapeProgress()
+
+# Set on SIGTERM: queued movies are skipped and the run shuts down cleanly
+CANCELLED = threading.Event()
+
+# =====================================================================
+# CONCURRENT SCRAPING ENGINE
+# =====================================================================
+def scrape_all(movie_urls, workers=None):
+    """
+    Scrapes every URL on a bounded worker pool. Politeness is enforced per host by
+    `LIMITERS`, so the pool size only decides how many movies are in progress at
+    once. Results are returned in the same order as `movie_urls`.
+    """
+    workers = workers or SCRAPER_WORKERS
+    PROGRESS.set_stage("scraping", total=len(movie_urls))
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for movie_data in tqdm(executor.map(scrape_movie_details, movie_urls), total=len(movie_urls), desc="Scraping Movies"):
+            if CANCELLED.is_set() and movie_data is None:
+                PROGRESS.count("skipped")
+            else:
+                PROGRESS.count("done" if movie_data is not None else "failed")
+            results.append(movie_data)
+    return results
+
 # =====================================================================
 # MAIN EXECUTION BLOCK
 # =====================================================================
 if __name__ == "__main__":
     IMDB_TOP_250_URL = "https://www.imdb.com/chart/top/"
-    
-    movie_urls = get_movie_urls(IMDB_TOP_250_URL)
+
+    parser = argparse.ArgumentParser(description="Scrape an IMDb list and enrich it with Rotten Tomatoes scores.")
+    parser.add_argument("--list-url", default=IMDB_TOP_250_URL, help="IMDb chart or list to scrape")
+    parser.add_argument("--progress-json", action="store_true", help="Print machine-readable progress lines")
+    args = parser.parse_args()
+
+    PROGRESS.emit_json = args.progress_json
+    signal.signal(signal.SIGTERM, lambda signum, frame: CANCELLED.set())
+    start_metrics_server()
+
+    PROGRESS.set_stage("discovering")
+    movie_urls = get_movie_urls(args.list_url)
     
     if movie_urls:
         print(f"\n--- Starting to scrape {len(movie_urls)} individual movie pages ---\n")
         
-        for url in tqdm(movie_urls, desc="Scraping Movies"):
-            scrape_movie_details(url)
-            time.sleep(1.5) # A respectful delay to avoid getting blocked
+        try:
+            scrape_all(movie_urls)
+        finally:
+            # Push the last partial batch to MongoDB before exiting
+            PROGRESS.set_stage("saving")
+            close_writer()
+            print(RESPONSE_CACHE.report())
+            print(RT_LOOKUPS.report())
+            publish_run_metrics()
+
+        if CANCELLED.is_set():
+            print("\n--- Scraping cancelled; movies scraped so far have been saved. ---")
+            sys.exit(3)
             
-        print("\n--- All movies have been scraped and saved! ---")
\ No newline at end of file
+        print("\n--- All movies have been scraped and saved! ---")
+    PROGRESS.set_stage("finished")
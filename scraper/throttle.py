@@ -0,0 +1,236 @@
+# scraper/throttle.py
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from pymongo import ReturnDocument
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Every request takes one token and tokens refill
+    at `rate` per second up to `capacity`, so a host never sees more than `rate`
+    requests per second on average. A rate of 0 (or less) disables the limit.
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimit:
+    """
+    A request rate shared by every process that uses the same MongoDB document,
+    so N scraper workers together stay under `rate` requests per second for a
+    host. Each request atomically reserves the next free time slot (spaced
+    1/rate apart) and sleeps until it. Relies on the workers' clocks being in
+    sync (NTP). Same interface as TokenBucket.
+    """
+    def __init__(self, collection, key, rate):
+        self.collection = collection
+        self.key = key
+        self.rate = rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        interval = 1 / self.rate
+        now = time.time()
+        doc = self.collection.find_one_and_update(
+            {'_id': self.key},
+            [{'$set': {'next_slot': {'$add': [{'$max': [{'$ifNull': ['$next_slot', now]}, now]}, interval]}}}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        wait = doc['next_slot'] - interval - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    A concurrency limit that adapts with AIMD: every success adds 1/limit (about
+    +1 per round of requests) up to `max_limit`, and a throttled response halves
+    it, at most once per `cooldown` seconds so one burst of 429s counts once.
+    """
+    def __init__(self, max_limit, min_limit=1, cooldown=2.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+        with self._condition:
+            if self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self._condition.notify_all()
+
+    def on_throttle(self):
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._last_decrease = now
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a degraded host. After `failure_threshold`
+    consecutive failures the circuit opens and every request fails fast with
+    CircuitOpenError for `reset_timeout` seconds; then a single trial request is
+    let through, which closes the circuit on success or opens it again.
+    """
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"Circuit for {self.name} is open; skipping the request")
+
+    def on_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def on_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened += 1
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """
+        Gives up a half-open trial that ended without an answer from the host
+        (e.g. a local error before the request was sent), so the next request
+        can try instead. Counts neither as a success nor as a failure.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class RetryPolicy:
+    """
+    How often and how long to wait before retrying a failed request: full
+    jitter exponential backoff, unless the server sent a Retry-After, which is
+    honored (up to `max_retry_after` seconds). `sleep` does the waiting, so
+    tests can record the delays instead of sleeping through them.
+    """
+    def __init__(self, retries=3, base=0.5, cap=30.0, max_retry_after=120.0, sleep=time.sleep):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self.sleep = sleep
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+    def wait(self, attempt, retry_after=None):
+        self.sleep(self.delay(attempt, retry_after))
+
+
+def parse_retry_after(response):
+    """The Retry-After header of `response` in seconds (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Bounds both the number of in-flight requests and the request rate for one
+    source (IMDb, Rotten Tomatoes, ...). The rate is local to the process
+    unless a shared `bucket` (see SharedRateLimit) is given. The concurrency
+    adapts to throttling (see AdaptiveConcurrency) and `breaker` trips when
+    the host keeps failing.
+    """
+    def __init__(self, max_concurrency, rate, burst=1, bucket=None, name="host", failure_threshold=5, reset_timeout=30.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self.concurrency = AdaptiveConcurrency(self.max_concurrency)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.bucket = bucket or TokenBucket(rate, burst)
+
+    @contextmanager
+    def slot(self):
+        self.concurrency.acquire()
+        try:
+            self.bucket.acquire()
+            yield
+        finally:
+            self.concurrency.release()
+
+    def on_success(self):
+        self.concurrency.on_success()
+        self.breaker.on_success()
+
+    def on_failure(self, throttled=False):
+        if throttled:
+            self.concurrency.on_throttle()
+        self.breaker.on_failure()
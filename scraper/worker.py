@@ -0,0 +1,192 @@
+# scraper/worker.py
+#
+# Runs one scrape across several processes or hosts through a MongoDB work
+# queue (see workqueue.py). Discovery and detail scraping are separate steps:
+#
+#   python scraper/worker.py discover --run top250      # queue the chart's movie URLs
+#   python scraper/worker.py work --run top250          # start as many of these as you like
+#   python scraper/worker.py status --run top250
+#   python scraper/worker.py retry-dead --run top250    # re-queue dead-lettered URLs
+#
+# Re-running `work` after a crash resumes the run; re-running `discover` only
+# adds URLs that are not queued yet.
+
+import argparse
+import os
+import signal
+import threading
+
+from pymongo import MongoClient
+from tqdm import tqdm
+
+import scraper
+from metrics import publish_run_metrics, start_metrics_server
+from pipeline import MONGO_URI, add_write_listener, close_writer, get_writer, remove_write_listener
+from throttle import SharedRateLimit
+from workqueue import DEAD, WorkQueue, worker_name
+
+IMDB_TOP_250_URL = "https://www.imdb.com/chart/top/"
+# Longest a worker waits between polls of an empty (but unfinished) queue
+QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", 5))
+
+
+def share_rate_limits(rate_limits):
+    """
+    Replaces each source's process-local rate with one shared by every worker
+    through the `rate_limits` collection. Concurrency limits stay per process.
+    """
+    for source, limiter in scraper.LIMITERS.items():
+        limiter.bucket = SharedRateLimit(rate_limits, source, limiter.rate)
+
+
+def discover(queue, list_url):
+    movie_urls = scraper.get_movie_urls(list_url)
+    added = queue.enqueue(movie_urls)
+    print(f"✅ Queued {added} new of {len(movie_urls)} movie URLs for run '{queue.run_id}'.")
+
+
+def work(queue, threads, follow=False, stop=None):
+    """
+    Leases and scrapes URLs on `threads` threads until the run is drained (or,
+    with `follow`, until `stop` is set). Returns (done, failed) counts.
+
+    An item whose record was queued for MongoDB is only completed once the
+    writer reports the upsert as acknowledged (and failed if the write
+    failed), so a crash never leaves `done` items missing from `movies`.
+    Until then a heartbeat renews its lease every third of `lease_seconds`.
+    """
+    stop = stop or threading.Event()
+    name = worker_name()
+    counts = {"done": 0, "failed": 0}
+    lock = threading.Lock()
+    progress = tqdm(desc=f"Worker {name}", unit="movie")
+    # Scraped items waiting for their upsert, by source_imdb_url
+    awaiting_write = {}
+    # Every item leased and not finished yet, by _id
+    held = {}
+    finished = threading.Event()
+
+    def renew_leases():
+        while not finished.wait(queue.lease_seconds / 3):
+            with lock:
+                item_ids = list(held)
+            try:
+                queue.renew(name, item_ids)
+            except Exception as e:
+                # The lease lasts a while longer: try again on the next beat
+                tqdm.write(f"⚠️ Could not renew the queue leases: {type(e).__name__}: {e}")
+
+    def finish(item, error=None):
+        with lock:
+            held.pop(item["_id"], None)
+        if error is None:
+            queue.complete(item)
+            key = "done"
+        else:
+            status = queue.fail(item, error)
+            if status == DEAD:
+                tqdm.write(f"☠️ Giving up on {item['url']} after {item['attempts']} attempts: {error}")
+            else:
+                tqdm.write(f"❌ An error occurred scraping {item['url']} (attempt {item['attempts']}): {error}")
+            key = "failed"
+        with lock:
+            counts[key] += 1
+            progress.update(1)
+
+    def on_write(written, failed):
+        with lock:
+            settled = [(awaiting_write.pop(movie["source_imdb_url"], None), None) for movie in written]
+            settled += [(awaiting_write.pop(movie["source_imdb_url"], None), "MongoDB write failed") for movie in failed]
+        for item, error in settled:
+            if item is not None:
+                finish(item, error)
+
+    add_write_listener(on_write)
+
+    def loop():
+        while not stop.is_set():
+            item = queue.lease(name)
+            if item is None:
+                with lock:
+                    waiting = bool(awaiting_write)
+                if waiting:
+                    # Nothing left to scrape right now: settle the buffered items
+                    get_writer().flush()
+                    continue
+                if not follow and queue.is_drained():
+                    return
+                wait = queue.next_due_in()
+                stop.wait(QUEUE_POLL_SECONDS if wait is None else min(max(wait, 0.1), QUEUE_POLL_SECONDS))
+                continue
+
+            with lock:
+                held[item["_id"]] = item
+            saved = []
+
+            def save(movie_data):
+                # Registered before the writer can possibly flush it
+                with lock:
+                    awaiting_write[movie_data["source_imdb_url"]] = item
+                saved.append(movie_data)
+                get_writer().add(movie_data)
+
+            try:
+                scraper.scrape_movie(item["url"], save=save)
+            except Exception as e:
+                with lock:
+                    awaiting_write.pop(item["url"], None)
+                finish(item, f"{type(e).__name__}: {e}")
+            else:
+                if not saved:
+                    # Unchanged since the last saved record: nothing to wait for
+                    finish(item)
+
+    pool = [threading.Thread(target=loop, daemon=True) for _ in range(threads)]
+    heartbeat = threading.Thread(target=renew_leases, daemon=True)
+    heartbeat.start()
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            thread.join()
+    finally:
+        # Push the last partial batch to MongoDB (settling its items) before exiting
+        close_writer()
+        finished.set()
+        remove_write_listener(on_write)
+        progress.close()
+    return counts["done"], counts["failed"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Share one scraping run between several worker processes.")
+    parser.add_argument("command", choices=["discover", "work", "status", "retry-dead"])
+    parser.add_argument("--run", required=True, help="Run id; workers with the same id share the run")
+    parser.add_argument("--list-url", default=IMDB_TOP_250_URL, help="IMDb chart or list to discover (discover)")
+    parser.add_argument("--threads", type=int, default=scraper.SCRAPER_WORKERS, help="Movies in progress at once (work)")
+    parser.add_argument("--follow", action="store_true", help="Keep waiting for new URLs instead of exiting when drained (work)")
+    args = parser.parse_args()
+
+    client = MongoClient(MONGO_URI)
+    database = client.get_default_database()
+    queue = WorkQueue(database["scrape_queue"], args.run)
+    queue.ensure_indexes()
+    try:
+        if args.command == "discover":
+            discover(queue, args.list_url)
+        elif args.command == "work":
+            share_rate_limits(database["rate_limits"])
+            stop = threading.Event()
+            # Finish the movies in progress, then exit; their leases are not lost
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+            signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+            start_metrics_server()
+            done, failed = work(queue, args.threads, follow=args.follow, stop=stop)
+            print(f"\n--- Worker finished: {done} movies scraped, {failed} failed attempts. ---")
+            print(scraper.RESPONSE_CACHE.report())
+            publish_run_metrics()
+        elif args.command == "retry-dead":
+            print(f"✅ Re-queued {queue.retry_dead()} dead-lettered URLs.")
+        print(f"Run '{args.run}': {queue.counts()}")
+    finally:
+        client.close()
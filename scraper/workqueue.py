@@ -0,0 +1,169 @@
+# scraper/workqueue.py
+
+import os
+import random
+import socket
+import time
+import uuid
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUEUE_LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", 300))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 5))
+QUEUE_BACKOFF_SECONDS = float(os.getenv("QUEUE_BACKOFF_SECONDS", 30))
+
+PENDING, LEASED, DONE, DEAD = "pending", "leased", "done", "dead"
+
+
+def worker_name():
+    """A name that is unique per process, also across hosts."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# =====================================================================
+# MONGODB-BACKED WORK QUEUE
+# =====================================================================
+class WorkQueue:
+    """
+    A durable queue of movie URLs for one scraping run, stored in MongoDB so
+    any number of worker processes (on any host) can share it.
+
+    A worker leases an item for `lease_seconds` and renews the lease while it
+    works on it; if it crashes, the lease expires and another worker picks the
+    URL up again. A failed item is retried
+    after an exponential, jittered backoff and moved to the dead-letter state
+    once it has been attempted `max_attempts` times. Items are never removed,
+    so a run resumes where it stopped instead of starting over at the first URL.
+    """
+    def __init__(self, collection, run_id, lease_seconds=QUEUE_LEASE_SECONDS,
+                 max_attempts=QUEUE_MAX_ATTEMPTS, backoff_seconds=QUEUE_BACKOFF_SECONDS):
+        self.collection = collection
+        self.run_id = run_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+
+    def ensure_indexes(self):
+        self.collection.create_index([("run_id", ASCENDING), ("url", ASCENDING)], name="run_url", unique=True)
+        self.collection.create_index(
+            [("run_id", ASCENDING), ("status", ASCENDING), ("available_at", ASCENDING)], name="run_next_item",
+        )
+
+    def enqueue(self, urls):
+        """
+        Adds URLs to the run. URLs already queued keep their state, so
+        discovery can safely be re-run on a partly finished run.
+        """
+        now = time.time()
+        operations = [
+            UpdateOne(
+                {"run_id": self.run_id, "url": url},
+                {"$setOnInsert": {
+                    "status": PENDING, "attempts": 0, "available_at": now, "position": position, "created_at": now,
+                }},
+                upsert=True,
+            )
+            for position, url in enumerate(urls)
+        ]
+        if not operations:
+            return 0
+        return self.collection.bulk_write(operations, ordered=False).upserted_count
+
+    def lease(self, worker):
+        """
+        Claims the next item that is due (or whose lease has expired) for
+        `worker`, or returns None if nothing is available right now.
+        """
+        now = time.time()
+        self._bury_abandoned(now)
+        return self.collection.find_one_and_update(
+            {
+                "run_id": self.run_id,
+                "$or": [
+                    {"status": PENDING, "available_at": {"$lte": now}},
+                    {"status": LEASED, "lease_expires": {"$lte": now}},
+                ],
+            },
+            {
+                "$set": {"status": LEASED, "lease_owner": worker, "lease_expires": now + self.lease_seconds},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING), ("position", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def renew(self, worker, item_ids):
+        """
+        Extends the leases `worker` still holds on `item_ids` by `lease_seconds`
+        from now, so an item that takes long (e.g. slow retries) is not handed to
+        another worker. Returns how many leases were renewed.
+        """
+        if not item_ids:
+            return 0
+        return self.collection.update_many(
+            {"_id": {"$in": list(item_ids)}, "status": LEASED, "lease_owner": worker},
+            {"$set": {"lease_expires": time.time() + self.lease_seconds}},
+        ).modified_count
+
+    def _bury_abandoned(self, now):
+        # A URL whose lease expired on its last attempt crashed its worker every
+        # time: dead-letter it instead of handing it out forever
+        self.collection.update_many(
+            {"run_id": self.run_id, "status": LEASED, "lease_expires": {"$lte": now},
+             "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": DEAD, "last_error": "Lease expired on the last attempt."}},
+        )
+
+    def complete(self, item):
+        """Marks a leased item as done; False if the lease was lost meanwhile."""
+        result = self.collection.update_one(
+            {"_id": item["_id"], "status": LEASED, "lease_owner": item["lease_owner"]},
+            {"$set": {"status": DONE, "finished_at": time.time()}, "$unset": {"lease_owner": "", "lease_expires": ""}},
+        )
+        return result.modified_count == 1
+
+    def fail(self, item, error):
+        """Schedules a retry with backoff, or dead-letters the item after its last attempt."""
+        if item["attempts"] >= self.max_attempts:
+            update = {"status": DEAD, "last_error": error, "finished_at": time.time()}
+        else:
+            delay = self.backoff_seconds * 2 ** (item["attempts"] - 1)
+            update = {"status": PENDING, "last_error": error, "available_at": time.time() + random.uniform(0.5, 1.0) * delay}
+        result = self.collection.update_one(
+            {"_id": item["_id"], "status": LEASED, "lease_owner": item["lease_owner"]},
+            {"$set": update, "$unset": {"lease_owner": "", "lease_expires": ""}},
+        )
+        return update["status"] if result.modified_count == 1 else None
+
+    def retry_dead(self):
+        """Puts every dead-lettered item of the run back in the queue with fresh attempts."""
+        return self.collection.update_many(
+            {"run_id": self.run_id, "status": DEAD},
+            {"$set": {"status": PENDING, "attempts": 0, "available_at": time.time()}},
+        ).modified_count
+
+    def counts(self):
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, DEAD: 0}
+        for row in self.collection.aggregate([
+            {"$match": {"run_id": self.run_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    def is_drained(self):
+        """True once every item is either done or dead-lettered."""
+        return self.collection.count_documents({"run_id": self.run_id, "status": {"$in": [PENDING, LEASED]}}) == 0
+
+    def next_due_in(self):
+        """Seconds until a pending item or an expired lease can be leased (None if there are none)."""
+        dues = []
+        for status, field in ((PENDING, "available_at"), (LEASED, "lease_expires")):
+            item = self.collection.find_one(
+                {"run_id": self.run_id, "status": status}, {field: 1}, sort=[(field, ASCENDING)],
+            )
+            if item is not None:
+                dues.append(item[field])
+        return max(0.0, min(dues) - time.time()) if dues else None
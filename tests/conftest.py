@@ -0,0 +1,47 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# backend.database builds its Motor client at import time; tests never reach it
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:1/test")
+# Nor should importing the scraper touch the real on-disk response cache
+os.environ.setdefault("SCRAPER_CACHE_PATH", ":memory:")
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The scraper modules import each other as top-level modules
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "scraper"))
+sys.path.insert(0, PROJECT_ROOT)
+
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    A TestClient for the API with every collection swapped for an in-memory
+    mongomock one. Yields (client, database); `database` is synchronous, for
+    seeding and checking documents.
+    """
+    import mongomock
+    from fastapi.testclient import TestClient
+    from mongomock_motor import AsyncMongoMockClient
+
+    from backend import app as app_module
+    from backend import database as database_module
+    from backend.cache import ResponseCache
+
+    sync_client = mongomock.MongoClient()
+    # Both clients share one in-memory store
+    motor_db = AsyncMongoMockClient(mock_mongo_client=sync_client)["test"]
+    sync_db = sync_client["test"]
+    for module in (app_module, database_module):
+        monkeypatch.setattr(module, "collection", motor_db.movies)
+        monkeypatch.setattr(module, "meta", motor_db.meta)
+        monkeypatch.setattr(module, "scraper_jobs", motor_db.scraper_jobs)
+        monkeypatch.setattr(module, "tombstones", motor_db.movies_tombstones)
+    monkeypatch.setattr(app_module, "response_cache", ResponseCache(motor_db.meta))
+    monkeypatch.setattr(app_module.job_manager, "jobs", motor_db.scraper_jobs)
+    with TestClient(app_module.app) as client:
+        yield client, sync_db
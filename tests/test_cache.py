@@ -0,0 +1,122 @@
+# tests/test_cache.py
+
+import sqlite3
+
+import mongomock
+import pytest
+
+import pipeline
+import scraper
+from cache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSite:
+    """Serves the same body every time and records the headers of each request."""
+    def __init__(self, content=b"<h1>Heat</h1>"):
+        self.content = content
+        self.requests = []
+
+    def fetch(self, url, source, headers=None, stage=None):
+        self.requests.append(headers or {})
+        if headers and headers.get("If-None-Match") == "v1":
+            return FakeResponse(b"", status_code=304)
+        return FakeResponse(self.content, headers={"ETag": "v1"})
+
+
+def parser(label):
+    calls = []
+
+    def parse(content):
+        calls.append(content)
+        return {"title": content.decode(), "parsed_by": label}
+    return parse, calls
+
+
+def test_unchanged_pages_are_not_parsed_again(tmp_path):
+    site = FakeSite()
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), parser_version="1")
+    parse, calls = parser("1")
+
+    cache.get_or_fetch("https://example.com/a", "imdb", site.fetch, parse)
+    result = cache.get_or_fetch("https://example.com/a", "imdb", site.fetch, parse)
+
+    assert len(calls) == 1
+    assert result["parsed_by"] == "1"
+    assert site.requests[-1] == {"If-None-Match": "v1"}
+
+
+def test_a_new_parser_version_reparses_unchanged_pages(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    site = FakeSite()
+    old_parse, _ = parser("1")
+    ResponseCache(path, parser_version="1").get_or_fetch("https://example.com/a", "imdb", site.fetch, old_parse)
+
+    new_parse, calls = parser("2")
+    cache = ResponseCache(path, parser_version="2")
+    result = cache.get_or_fetch("https://example.com/a", "imdb", site.fetch, new_parse)
+
+    # Fetched without validators: a 304 would leave nothing to parse
+    assert site.requests[-1] == {}
+    assert len(calls) == 1
+    assert result["parsed_by"] == "2"
+    assert cache.get_or_fetch("https://example.com/a", "imdb", site.fetch, new_parse)["parsed_by"] == "2"
+    assert len(calls) == 1
+
+
+def test_caches_from_before_parser_versions_are_upgraded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE responses (
+            url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_hash TEXT,
+            body_size INTEGER, parsed TEXT, fetched_at REAL
+        )""")
+    conn.execute(
+        "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ("https://example.com/a", "v1", None, "stale", 10, '{"parsed_by": "old"}', 0.0),
+    )
+    conn.commit()
+    conn.close()
+
+    parse, calls = parser("1")
+    result = ResponseCache(path, parser_version="1").get_or_fetch("https://example.com/a", "imdb", FakeSite().fetch, parse)
+
+    assert len(calls) == 1
+    assert result["parsed_by"] == "1"
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    monkeypatch.setattr(scraper, "RESPONSE_CACHE", ResponseCache(":memory:"))
+    writer = pipeline.use_collection(mongomock.MongoClient().db["movies"], batch_size=1000, flush_interval=3600)
+    yield writer
+    pipeline.close_writer()
+
+
+RECORD = {"source_imdb_url": "https://www.imdb.com/title/tt0113277/", "title": "Heat", "year": 1995}
+
+
+def test_record_hashes_are_only_kept_once_the_write_succeeds(monkeypatch, writer):
+    cache = scraper.RESPONSE_CACHE
+    pipeline.save_to_mongodb(dict(RECORD))
+    # Still only buffered
+    assert cache.record_changed(RECORD["source_imdb_url"], RECORD)
+
+    def bulk_write(*args, **kwargs):
+        raise ConnectionError("MongoDB went away")
+    with monkeypatch.context() as patch:
+        patch.setattr(writer.collection, "bulk_write", bulk_write)
+        writer.flush()
+    assert cache.record_changed(RECORD["source_imdb_url"], RECORD)
+
+    pipeline.save_to_mongodb(dict(RECORD))
+    writer.flush()
+    assert writer.collection.count_documents({}) == 1
+    assert not cache.record_changed(RECORD["source_imdb_url"], RECORD)
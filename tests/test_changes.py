@@ -0,0 +1,102 @@
+# tests/test_changes.py
+
+from pymongo.errors import AutoReconnect
+
+from pipeline import MongoWriter, backfill_updated_seq, delete_movies, release_seqs, reserve_seqs, upsert_operation
+
+
+def record(n, **fields):
+    return {
+        "source_imdb_url": f"https://www.imdb.com/title/tt{n:07d}/",
+        "title": f"Movie {n}", "year": 2000 + n, "imdb_rating": 7.0, "director": "Someone", "cast": [],
+        "rotten_tomatoes_url": "N/A", "tomatometer_score": None, "audience_score": None,
+        **fields,
+    }
+
+
+def changes(client, token=None):
+    response = client.get("/movies/changes", params={"since": token} if token else {})
+    assert response.status_code == 200
+    return response.json()
+
+
+def write(database, movies):
+    with MongoWriter(collection=database.movies, flush_interval=3600) as writer:
+        for movie in movies:
+            writer.add(movie)
+
+
+def test_a_reserved_batch_is_never_skipped(api):
+    client, database = api
+    # A slow writer reserves seq 1, then a fast one writes seq 2 and finishes first
+    slow_seq, slow_reservation = reserve_seqs(database.movies, 1)
+    fast_seq, fast_reservation = reserve_seqs(database.movies, 1)
+    database.movies.bulk_write([upsert_operation(record(2), fast_seq)])
+    release_seqs(database.movies, fast_reservation)
+
+    first = changes(client)
+    assert first["upserts"] == []
+
+    database.movies.bulk_write([upsert_operation(record(1), slow_seq)])
+    release_seqs(database.movies, slow_reservation)
+
+    second = changes(client, first["next_token"])
+    assert [movie["title"] for movie in second["upserts"]] == ["Movie 1", "Movie 2"]
+
+
+def test_deleted_movies_are_reported_as_tombstones(api):
+    client, database = api
+    write(database, [record(1), record(2)])
+    token = changes(client)["next_token"]
+    deleted_id = str(database.movies.find_one({"title": "Movie 1"})["_id"])
+
+    assert delete_movies(database.movies, [record(1)["source_imdb_url"]]) == 1
+
+    after = changes(client, token)
+    assert after["deleted"] == [deleted_id]
+    assert after["upserts"] == []
+
+
+def test_an_unchanged_record_keeps_its_seq(api):
+    client, database = api
+    write(database, [record(1), record(2)])
+    token = changes(client)["next_token"]
+    seqs = {doc["title"]: doc["updated_seq"] for doc in database.movies.find()}
+
+    write(database, [record(1), record(2, imdb_rating=8.0)])
+
+    assert database.movies.find_one({"title": "Movie 1"})["updated_seq"] == seqs["Movie 1"]
+    assert [movie["title"] for movie in changes(client, token)["upserts"]] == ["Movie 2"]
+
+
+def test_an_invalid_token_is_rejected(api):
+    client, _ = api
+    response = client.get("/movies/changes", params={"since": "not-a-token"})
+    assert response.status_code == 400
+
+
+def test_a_failed_write_still_bumps_the_version(api, monkeypatch):
+    _, database = api
+    writer = MongoWriter(collection=database.movies, flush_interval=3600)
+
+    def lost_connection(*args, **kwargs):
+        raise AutoReconnect("connection closed mid-write")
+
+    monkeypatch.setattr(database.movies, "bulk_write", lost_connection)
+    writer.add(record(1))
+    writer.close()
+
+    meta_doc = database.meta.find_one({"_id": "movies"})
+    assert meta_doc["pending_seqs"] == []
+    assert meta_doc["version"] == 1
+
+
+def test_backfill_reads_the_movies_in_batches(api):
+    _, database = api
+    database.movies.insert_many([record(n) for n in range(5)])
+
+    assert backfill_updated_seq(database.movies, batch_size=2) == 5
+    seqs = sorted(doc["updated_seq"] for doc in database.movies.find())
+    assert seqs == [1, 2, 3, 4, 5]
+    # One reservation per batch of two
+    assert database.meta.find_one({"_id": "movies"})["version"] == 3
@@ -0,0 +1,53 @@
+# tests/test_discovery.py
+
+import os
+
+from discovery import extract_title_urls
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_json_ld_item_list_in_chart_order():
+    urls = extract_title_urls(fixture("imdb_chart_top.html"), "https://www.imdb.com/chart/top/")
+    # The ItemList wins over the partial, reordered anchors and the Next.js state
+    assert urls == [
+        "https://www.imdb.com/title/tt0111161/",
+        "https://www.imdb.com/title/tt0068646/",
+        "https://www.imdb.com/title/tt0468569/",
+        "https://www.imdb.com/title/tt0071562/",
+        "https://www.imdb.com/title/tt0050083/",
+    ]
+
+
+def test_next_data_when_there_is_no_json_ld():
+    urls = extract_title_urls(fixture("imdb_list_next_data.html"), "https://www.imdb.com/list/ls000000001/")
+    assert urls == [
+        "https://www.imdb.com/title/tt0113277/",
+        "https://www.imdb.com/title/tt0105236/",
+        "https://www.imdb.com/title/tt0240772/",
+        "https://www.imdb.com/title/tt1375666/",
+    ]
+
+
+def test_anchors_as_the_last_resort():
+    urls = extract_title_urls(fixture("imdb_list_anchors.html"), "https://www.imdb.com/list/ls000000002/")
+    # Relative, absolute, tracked and sub-page links all reduce to one canonical URL per title
+    assert urls == [
+        "https://www.imdb.com/title/tt0060196/",
+        "https://www.imdb.com/title/tt0064116/",
+        "https://www.imdb.com/title/tt0105695/",
+    ]
+
+
+def test_urls_follow_the_list_host():
+    urls = extract_title_urls(fixture("imdb_list_anchors.html"), "https://m.imdb.com/list/ls000000002/")
+    assert urls[0] == "https://m.imdb.com/title/tt0060196/"
+
+
+def test_page_without_titles():
+    assert extract_title_urls("<html><body><a href='/chart/top/'>Top 250</a></body></html>", "https://www.imdb.com/chart/top/") == []
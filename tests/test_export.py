@@ -0,0 +1,101 @@
+# tests/test_export.py
+
+import asyncio
+import tracemalloc
+
+import pytest
+from bson import ObjectId
+
+from backend.export import stream_csv, stream_ndjson, stream_parquet
+
+BATCH_SIZE = 500
+
+
+class SyntheticCursor:
+    """
+    An async Mongo-like cursor that builds each movie on demand, so the test
+    itself holds no more than one document, and counts how many it handed out.
+    """
+    def __init__(self, count):
+        self.count = count
+        self.produced = 0
+        self.requested_batch_size = None
+
+    def batch_size(self, size):
+        self.requested_batch_size = size
+        return self
+
+    async def __aiter__(self):
+        for n in range(self.count):
+            self.produced += 1
+            yield {
+                "_id": ObjectId(),
+                "title": f"Movie {n}",
+                "year": 1950 + n % 75,
+                "imdb_rating": (n % 100) / 10,
+                "tomatometer_score": n % 101,
+                "audience_score": (n * 7) % 101,
+                "director": f"Director {n % 500}",
+                "plot_summary": "A long enough plot summary to make every row a few hundred bytes. " * 3,
+                "genres": ["Drama", "Crime"],
+                "runtime_minutes": 80 + n % 90,
+                "cast": [{"actor": f"Actor {n}-{i}", "character": f"Role {i}"} for i in range(5)],
+                "source_imdb_url": f"https://www.imdb.com/title/tt{n:07d}/",
+                "rotten_tomatoes_url": f"https://www.rottentomatoes.com/m/movie_{n}",
+            }
+
+
+def consume(exporter, count):
+    """
+    Streams `count` movies through `exporter`, dropping every chunk like a
+    client would. Returns (chunk sizes, movies read when each chunk arrived,
+    tracemalloc peak in bytes).
+    """
+    cursor = SyntheticCursor(count)
+    sizes, read_at = [], []
+
+    async def run():
+        async for chunk in exporter(cursor, batch_size=BATCH_SIZE):
+            sizes.append(len(chunk))
+            read_at.append(cursor.produced)
+
+    tracemalloc.start()
+    try:
+        asyncio.run(run())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert cursor.requested_batch_size == BATCH_SIZE
+    assert cursor.produced == count
+    return sizes, read_at, peak
+
+
+EXPORTERS = [stream_csv, stream_ndjson]
+try:
+    import pyarrow  # noqa: F401
+    EXPORTERS.append(stream_parquet)
+except ImportError:
+    pass
+
+
+@pytest.mark.parametrize("exporter", EXPORTERS, ids=lambda exporter: exporter.__name__)
+def test_one_chunk_per_batch(exporter):
+    count = 10 * BATCH_SIZE + 123
+    sizes, read_at, _ = consume(exporter, count)
+    batches = -(-count // BATCH_SIZE)
+
+    data_chunks = [(size, read) for size, read in zip(sizes, read_at) if size]
+    # A full batch is encoded and yielded before the next document is read
+    for index, (_, read) in enumerate(data_chunks[:batches]):
+        assert read == min((index + 1) * BATCH_SIZE, count)
+    # Only the Parquet footer may follow the last batch
+    assert len(data_chunks) in (batches, batches + 1)
+
+
+@pytest.mark.parametrize("exporter", EXPORTERS, ids=lambda exporter: exporter.__name__)
+def test_memory_stays_flat_as_the_export_grows(exporter):
+    _, _, small_peak = consume(exporter, 2 * BATCH_SIZE)
+    _, _, large_peak = consume(exporter, 20 * BATCH_SIZE)
+
+    # Ten times the rows for about the same peak: only one batch is ever held
+    assert large_peak < 1.5 * small_peak
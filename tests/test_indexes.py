@@ -0,0 +1,165 @@
+# tests/test_indexes.py
+
+import asyncio
+import itertools
+import os
+
+import mongomock
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from backend import database
+from backend.app import MovieFilters
+from backend.database import FILTER_FIELDS, SORT_FIELDS, sort_index
+
+# Query plans need a real server: set TEST_MONGO_URI (a scratch database) to check them
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI")
+
+FILTER_COMBINATIONS = [
+    {"min_rating": None, "min_year": None},
+    {"min_rating": 7.5, "min_year": None},
+    {"min_rating": None, "min_year": 2000},
+    {"min_rating": 7.5, "min_year": 2000},
+]
+CASES = list(itertools.product(SORT_FIELDS, ("asc", "desc"), FILTER_COMBINATIONS))
+
+
+def case_id(case):
+    sort_by, order, filters = case
+    active = "+".join(name for name, value in filters.items() if value is not None) or "no_filter"
+    return f"{sort_by}-{order}-{active}"
+
+
+def movie_filters(sort_by, order, filters):
+    return MovieFilters(sort_by=sort_by, order=order, title=None, **filters)
+
+
+def plan_indexes(plan):
+    """The names of the indexes an explain() plan tree scans."""
+    names = [plan["indexName"]] if "indexName" in plan else []
+    children = [plan[key] for key in ("inputStage", "queryPlan") if key in plan] + plan.get("inputStages", [])
+    for child in children:
+        names += plan_indexes(child)
+    return names
+
+
+def plan_stages(plan):
+    """Every stage name of an explain() plan tree."""
+    stages = [plan["stage"]] if "stage" in plan else []
+    children = [plan[key] for key in ("inputStage", "queryPlan") if key in plan] + plan.get("inputStages", [])
+    for child in children:
+        stages += plan_stages(child)
+    return stages
+
+
+def test_every_sort_has_an_index_covering_the_filters():
+    for field in SORT_FIELDS:
+        keys, _ = sort_index(field)
+        assert keys[:2] == [(field, -1), ("_id", -1)]
+        assert set(FILTER_FIELDS) <= {name for name, _ in keys}
+
+
+def test_ensure_indexes_replaces_the_old_sort_indexes(monkeypatch):
+    sync_client = mongomock.MongoClient()
+    sync_client.test.movies.create_index([("year", -1), ("_id", -1)], name="year_sort")
+    motor_db = AsyncMongoMockClient(mock_mongo_client=sync_client)["test"]
+    monkeypatch.setattr(database, "collection", motor_db.movies)
+    monkeypatch.setattr(database, "tombstones", motor_db.movies_tombstones)
+
+    asyncio.run(database.ensure_indexes())
+
+    indexes = sync_client.test.movies.index_information()
+    assert "year_sort" not in indexes
+    for field in SORT_FIELDS:
+        keys, name = sort_index(field)
+        assert indexes[name]["key"] == keys
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.hints = []
+
+    def sort(self, spec):
+        return self
+
+    def hint(self, index):
+        self.hints.append(index)
+        return self
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.cursor = RecordingCursor()
+
+    def find(self, query, projection=None):
+        return self.cursor
+
+
+def test_only_unsearched_filters_hint_the_sort_index():
+    for title, hints in ((None, ["year_sort_filter"]), ("dark knight", [])):
+        collection = RecordingCollection()
+        filters = MovieFilters(sort_by="year", order="desc", title=title, min_rating=None, min_year=None)
+        filters.find(collection, filters.query)
+        assert collection.cursor.hints == hints
+
+
+def test_filtered_sorts_page_through_the_sort_index(api):
+    client, db = api
+    db.movies.insert_many([
+        {"title": f"Movie {n}", "year": 1990 + n % 30, "imdb_rating": 5 + (n % 50) / 10, "discrepancy": n % 17}
+        for n in range(200)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        params = {"min_year": 2000, "sort_by": "discrepancy", "order": "desc", "limit": 25}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/movies/filter", params=params).json()
+        seen += page["movies"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    expected = db.movies.count_documents({"year": {"$gte": 2000}})
+    assert len(seen) == expected == len({movie["id"] for movie in seen})
+    assert all(movie["year"] >= 2000 for movie in seen)
+
+
+@pytest.fixture(scope="module")
+def real_movies():
+    if not TEST_MONGO_URI:
+        pytest.skip("TEST_MONGO_URI is not set")
+    from pymongo import MongoClient
+
+    client = MongoClient(TEST_MONGO_URI)
+    movies = client.get_default_database()["movies_index_test"]
+    movies.drop()
+    movies.insert_many([
+        {"year": 1950 + n % 75, "imdb_rating": (n % 100) / 10, "tomatometer_score": n % 101,
+         "runtime_minutes": 80 + n % 90, "discrepancy": (n * 7) % 60, "search_terms": ["movie", f"word{n % 500}"]}
+        for n in range(5000)
+    ])
+    for field in SORT_FIELDS:
+        keys, name = sort_index(field)
+        movies.create_index(keys, name=name)
+    movies.create_index("search_terms", name="search_terms")
+    yield movies
+    movies.drop()
+    client.close()
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case_id(case) for case in CASES])
+def test_query_plan_is_an_index_scan_without_sort(real_movies, case):
+    filters = movie_filters(*case)
+    plan = filters.find(real_movies, filters.query).limit(26).explain()["queryPlanner"]["winningPlan"]
+    stages = plan_stages(plan)
+    assert "IXSCAN" in stages
+    assert "SORT" not in stages
+
+
+@pytest.mark.parametrize("sort_by", SORT_FIELDS)
+def test_a_title_search_reads_the_search_terms_index(real_movies, sort_by):
+    filters = MovieFilters(sort_by=sort_by, order="desc", title="word7", min_rating=7.5, min_year=None)
+    plan = filters.find(real_movies, filters.query).limit(26).explain()["queryPlanner"]["winningPlan"]
+    assert "search_terms" in plan_indexes(plan)
@@ -0,0 +1,114 @@
+# tests/test_jobs.py
+
+import asyncio
+import textwrap
+
+from mongomock_motor import AsyncMongoMockClient
+
+from backend.jobs import JobManager
+
+# Prints progress the way scraper.py does, while tqdm draws its bar on the same pipe
+FAKE_SCRAPER = textwrap.dedent("""
+    import json, sys, time
+    from tqdm import tqdm
+    for done in tqdm(range(1, 6), desc="Scraping Movies", mininterval=0):
+        time.sleep(0.01)
+        print("@@progress " + json.dumps({"stage": "scraping", "total": 5, "done": done}), flush=True)
+""")
+
+
+class FailingProgressWrites:
+    """A jobs collection whose progress updates fail, like a lost Mongo connection."""
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def update_one(self, query, update, **kwargs):
+        if "progress" in update.get("$set", {}):
+            raise ConnectionError("Mongo went away")
+        return await self._collection.update_one(query, update, **kwargs)
+
+
+def run_job(manager):
+    async def scenario():
+        await manager.ensure_indexes()
+        job = await manager.start()
+        await asyncio.gather(*manager._watchers)
+        return await manager.get(job["id"])
+    return asyncio.run(scenario())
+
+
+def make_manager(tmp_path, wrap=None):
+    script = tmp_path / "fake_scraper.py"
+    script.write_text(FAKE_SCRAPER)
+    jobs = AsyncMongoMockClient()["test"]["scraper_jobs"]
+    return JobManager(wrap(jobs) if wrap else jobs, script=str(script)), jobs
+
+
+def test_progress_is_parsed_behind_the_tqdm_bar(tmp_path):
+    manager, _ = make_manager(tmp_path)
+    job = run_job(manager)
+    assert job["status"] == "succeeded"
+    assert job["stage"] == "scraping"
+    assert job["progress"] == {"total": 5, "done": 5}
+
+
+def test_a_failing_watcher_still_finishes_the_job(tmp_path):
+    manager, jobs = make_manager(tmp_path, wrap=FailingProgressWrites)
+    job = run_job(manager)
+    assert job["status"] == "failed"
+    assert "Mongo went away" in job["error"]
+
+    async def lock_holders():
+        return await jobs.count_documents({"lock": {"$exists": True}})
+    assert asyncio.run(lock_holders()) == 0
+
+
+def test_the_running_process_is_recognised_by_pid_and_start_time():
+    import os
+    from backend import jobs
+
+    alive, started = jobs._process_info(os.getpid())
+    assert alive
+    assert jobs._pid_alive(os.getpid(), started)
+    if started is not None:
+        # Same pid, different start time: the pid was reused by another process
+        assert not jobs._pid_alive(os.getpid(), started - 3600)
+
+
+def test_liveness_never_signals_a_process_on_windows(monkeypatch):
+    from backend import jobs
+
+    def kill(pid, signal):
+        raise AssertionError("os.kill would terminate the process on Windows")
+    monkeypatch.setattr(jobs.os, "kill", kill)
+    monkeypatch.setattr(jobs, "psutil", None)
+    monkeypatch.setattr(jobs.sys, "platform", "win32")
+    monkeypatch.setattr(jobs, "_windows_process", lambda pid: (True, 1000.0))
+
+    assert jobs._pid_alive(1234, 1000.0)
+    assert not jobs._pid_alive(1234, 5000.0)
+
+
+def test_recover_interrupts_jobs_whose_pid_was_reused():
+    import os
+    from backend import jobs
+
+    collection = AsyncMongoMockClient()["test"]["scraper_jobs"]
+    manager = JobManager(collection)
+    _, started = jobs._process_info(os.getpid())
+
+    async def scenario():
+        await collection.insert_many([
+            {"_id": "reused", "status": "running", "lock": "scraper-a", "pid": os.getpid(), "pid_started": (started or 0) - 3600},
+            {"_id": "alive", "status": "running", "lock": "scraper-b", "pid": os.getpid(), "pid_started": started},
+        ])
+        await manager.recover()
+        return {job["_id"]: job["status"] async for job in collection.find()}
+
+    statuses = asyncio.run(scenario())
+    assert statuses["alive"] == "running"
+    if started is not None:
+        assert statuses["reused"] == "interrupted"
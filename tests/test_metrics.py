@@ -0,0 +1,104 @@
+# tests/test_metrics.py
+
+import json
+import re
+
+import pytest
+import requests
+
+import metrics
+from metrics import RunMetrics, publish_run_metrics
+
+
+def test_spans_record_their_attributes():
+    run = RunMetrics()
+    with run.span("imdb_fetch") as span:
+        span["status"] = 200
+        span["bytes"] = 1234
+        span["retries"] = 2
+    with pytest.raises(ValueError):
+        with run.span("imdb_fetch"):
+            raise ValueError("parse failed")
+
+    @run.timed("rt_parse")
+    def parse():
+        return "parsed"
+
+    assert parse() == "parsed"
+    run.count_cache("imdb_fetch", "hit")
+
+    stages = run.summary()["stages"]
+    assert stages["imdb_fetch"]["count"] == 2
+    assert stages["imdb_fetch"]["errors"] == 1
+    assert stages["imdb_fetch"]["bytes"] == 1234
+    assert stages["imdb_fetch"]["retries"] == 2
+    assert stages["imdb_fetch"]["status_codes"] == {"200": 1}
+    assert stages["imdb_fetch"]["cache"] == {"hit": 1}
+    assert stages["rt_parse"]["count"] == 1
+
+
+def test_prometheus_histograms_are_cumulative():
+    run = RunMetrics()
+    for seconds in (0.002, 0.02, 0.02, 3.0, 60.0):
+        run.record("db_upsert", seconds, records=10)
+    run.record("db_upsert", 0.5, error=True)
+    text = run.prometheus()
+
+    samples = dict(re.findall(r'^(scraper_\S+) (\S+)$', text, re.MULTILINE))
+    assert samples['scraper_stage_duration_seconds_bucket{stage="db_upsert",le="0.001"}'] == "0"
+    assert samples['scraper_stage_duration_seconds_bucket{stage="db_upsert",le="0.005"}'] == "1"
+    assert samples['scraper_stage_duration_seconds_bucket{stage="db_upsert",le="0.025"}'] == "3"
+    assert samples['scraper_stage_duration_seconds_bucket{stage="db_upsert",le="5"}'] == "5"
+    assert samples['scraper_stage_duration_seconds_bucket{stage="db_upsert",le="+Inf"}'] == "6"
+    assert samples['scraper_stage_duration_seconds_count{stage="db_upsert"}'] == "6"
+    assert samples['scraper_stage_records_total{stage="db_upsert"}'] == "50"
+    assert samples['scraper_stage_errors_total{stage="db_upsert"}'] == "1"
+    # Every metric family is declared once, before its samples
+    families = re.findall(r'^# TYPE (\S+) (\S+)$', text, re.MULTILINE)
+    assert len(families) == len(set(families))
+    assert ("scraper_stage_duration_seconds", "histogram") in families
+    assert text.endswith("\n")
+
+
+def test_the_run_serves_its_metrics():
+    run = RunMetrics()
+    run.record("list_fetch", 0.1)
+    server = run.serve(0)
+    try:
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        response = requests.get(base_url + "/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'scraper_stage_duration_seconds_count{stage="list_fetch"} 1' in response.text
+        assert requests.get(base_url + "/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_no_summary_file_is_written_by_default(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(metrics, "SCRAPER_METRICS_SUMMARY", None)
+    publish_run_metrics()
+    assert list(tmp_path.iterdir()) == []
+
+    summary_path = tmp_path / "run.json"
+    monkeypatch.setattr(metrics, "SCRAPER_METRICS_SUMMARY", str(summary_path))
+    publish_run_metrics()
+    assert "stages" in json.loads(summary_path.read_text())
+
+
+def test_api_metrics_endpoints(api):
+    client, _ = api
+    client.get("/movies")
+    client.get("/movies/changes", params={"since": "not-a-token"})
+
+    text = client.get("/metrics").text
+    assert 'api_request_duration_seconds_count{method="GET",route="/movies"}' in text
+    assert 'api_responses_total{method="GET",route="/movies/changes",status="400"}' in text
+    assert 'api_response_cache_requests_total{result="miss"}' in text
+
+    summary = client.get("/metrics/summary").json()
+    assert summary["routes"]["GET /movies/changes"]["status_codes"]["400"] >= 1
+    assert summary["routes"]["GET /movies"]["p50_ms"] is not None
+    assert set(summary["response_cache"]) >= {"hits", "misses", "hit_ratio"}
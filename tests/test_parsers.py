@@ -0,0 +1,162 @@
+# tests/test_parsers.py
+
+import os
+
+import pytest
+
+import scraper
+from cache import ResponseCache
+from extract import PARSER_VERSION, Field, extract_fields, parse_html
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# The version the expected results below were written for. A change to a spec
+# or a parse_* function that changes them must bump extract.PARSER_VERSION (so
+# cached pages are parsed again) along with this constant.
+EXPECTED_PARSER_VERSION = "1"
+
+SHAWSHANK = {
+    "title": "The Shawshank Redemption",
+    "year": 1994,
+    "imdb_rating": 9.3,
+    "director": "Frank Darabont",
+    "poster_url": "https://m.media-amazon.com/images/M/MV5BMDAyY2FhYjctNDc5OS00MDNlLThiMGUtY2UxYWVkNGY2ZjljXkEyXkFqcGc@._V1_QL75_UX190_CR0,2,190,281_.jpg",
+    "plot_summary": (
+        "A banker convicted of uxoricide forms a friendship over a quarter century with a hardened convict, "
+        "while maintaining his innocence and trying to remain hopeful through simple compassion."
+    ),
+    "genres": ["Epic", "Period Drama", "Drama"],
+    "runtime_minutes": 142,
+    "cast": [
+        {"actor": "Tim Robbins", "character": "Andy Dufresne"},
+        {"actor": "Morgan Freeman", "character": "Ellis Boyd 'Red' Redding"},
+        {"actor": "Bob Gunton", "character": "Warden Norton"},
+        {"actor": "William Sadler", "character": "Heywood"},
+        {"actor": "Clancy Brown", "character": "Captain Hadley"},
+    ],
+}
+
+
+def page(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def test_expected_results_match_the_parser_version():
+    assert PARSER_VERSION == EXPECTED_PARSER_VERSION, "update the expected results below for the new parser version"
+
+
+# =====================================================================
+# FIELD SPECS
+# =====================================================================
+HTML = """<html><body>
+<h1> The <i>Title</i> </h1>
+<ul><li>PG</li><li>1h 30m</li><li>Drama</li></ul>
+<img class="poster" src="poster.jpg">
+<div class="person"><a class="name">Ann</a><a class="role">Lead</a></div>
+<div class="person"><a class="name">Bob</a></div>
+<div class="person"><a class="name">Cid</a><a class="role">Extra</a></div>
+</body></html>"""
+
+
+def test_a_single_field_reads_the_stripped_text_of_the_first_match():
+    assert Field("title", "h1").extract(parse_html(HTML)) == "TheTitle"
+    assert Field("item", "li").extract(parse_html(HTML)) == "PG"
+
+
+def test_attributes_where_and_defaults():
+    root = parse_html(HTML)
+    assert Field("poster", "img.poster", attr="src").extract(root) == "poster.jpg"
+    assert Field("poster", "img.poster", attr="alt").extract(root) == "N/A"
+    assert Field("runtime", "li", where=lambda text: "h" in text).extract(root) == "1h 30m"
+    assert Field("missing", "h2").extract(root) == "N/A"
+    assert Field("missing", "h2", default=None).extract(root) is None
+    assert Field("missing", "h2", many=True).extract(root) == []
+
+
+def test_nested_fields_give_one_dict_per_match():
+    spec = [Field("people", "div.person", many=True, limit=2, fields=[Field("name", "a.name"), Field("role", "a.role")])]
+    assert extract_fields(parse_html(HTML), spec) == {
+        "people": [{"name": "Ann", "role": "Lead"}, {"name": "Bob", "role": "N/A"}],
+    }
+
+
+# =====================================================================
+# SAVED SAMPLE PAGES
+# =====================================================================
+def test_imdb_title_page():
+    assert scraper.parse_imdb_page(page("imdb_title_tt0111161.html")) == SHAWSHANK
+
+
+def test_imdb_page_without_the_expected_layout():
+    assert scraper.parse_imdb_page(b"<html><body><p>Unavailable</p></body></html>") == {
+        "title": "N/A", "year": None, "imdb_rating": None, "director": "N/A", "poster_url": "N/A",
+        "plot_summary": "N/A", "genres": [], "runtime_minutes": None, "cast": [],
+    }
+
+
+def test_rt_search_page():
+    results = scraper.parse_rt_search(page("rt_search_shawshank.html"))
+    assert results == [
+        {"release_year": 1994, "rotten_tomatoes_url": "https://www.rottentomatoes.com/m/shawshank_redemption",
+         "tomatometer_score": 89, "audience_score": 98, "title": "The Shawshank Redemption"},
+        {"release_year": 2004,
+         "rotten_tomatoes_url": "https://www.rottentomatoes.com/m/hope_springs_eternal_a_look_back_at_the_shawshank_redemption",
+         "tomatometer_score": None, "audience_score": None, "title": "Hope Springs Eternal: A Look Back at The Shawshank Redemption"},
+        {"release_year": 0, "rotten_tomatoes_url": "https://www.rottentomatoes.com/m/shawshank_untitled",
+         "tomatometer_score": None, "audience_score": None, "title": "Shawshank (Untitled)"},
+    ]
+    assert scraper.match_rt_result(results, "The Shawshank Redemption", 1994) is results[0]
+
+
+@pytest.mark.parametrize("name, scores", [
+    ("rt_movie_scorecard.html", {"tomatometer_score": 89, "audience_score": 98}),
+    ("rt_movie_score_board.html", {"tomatometer_score": 91, "audience_score": 98}),
+])
+def test_rt_movie_page_layouts(name, scores):
+    assert scraper.parse_rt_movie_page(page(name)) == scores
+
+
+# =====================================================================
+# PARSER VERSION AND THE RESPONSE CACHE
+# =====================================================================
+class FakeResponse:
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class SavedPage:
+    """Serves a saved page with an ETag, answering 304 when it is revalidated."""
+    def __init__(self, content):
+        self.content = content
+        self.requests = []
+
+    def fetch(self, url, source, headers=None, stage=None):
+        self.requests.append(headers or {})
+        if (headers or {}).get("If-None-Match") == '"shawshank"':
+            return FakeResponse(b"", status_code=304)
+        return FakeResponse(self.content, headers={"ETag": '"shawshank"'})
+
+
+def test_a_parser_version_bump_reparses_cached_pages(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    url = "https://www.imdb.com/title/tt0111161/"
+    site = SavedPage(page("imdb_title_tt0111161.html"))
+
+    # A previous parser that missed the cast
+    def old_parse(content):
+        return {**scraper.parse_imdb_page(content), "cast": []}
+
+    ResponseCache(path, parser_version="0").get_or_fetch(url, "imdb", site.fetch, old_parse)
+    stale = ResponseCache(path, parser_version="0").get_or_fetch(url, "imdb", site.fetch, old_parse)
+    assert stale["cast"] == []
+    assert site.requests[-1] == {"If-None-Match": '"shawshank"'}
+
+    current = ResponseCache(path, parser_version=PARSER_VERSION)
+    assert current.get_or_fetch(url, "imdb", site.fetch, scraper.parse_imdb_page) == SHAWSHANK
+    # Downloaded in full: a 304 would have left nothing to parse
+    assert site.requests[-1] == {}
+    assert current.get_or_fetch(url, "imdb", site.fetch, scraper.parse_imdb_page) == SHAWSHANK
+    assert site.requests[-1] == {"If-None-Match": '"shawshank"'}
@@ -0,0 +1,61 @@
+# tests/test_replay.py
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import benchmark
+import scraper
+from throttle import HostLimiter
+
+MOVIES = 5
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), benchmark.make_handler(0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(scraper, "RT_SEARCH_URL", base_url + "/search?search={}")
+    # record_fixtures and replay_fixtures rewire these module globals
+    for name in ("fetch", "save_to_mongodb", "get_session", "RESPONSE_CACHE", "RT_LOOKUPS",
+                 "parse_imdb_page", "parse_rt_search", "parse_rt_movie_page"):
+        monkeypatch.setattr(scraper, name, getattr(scraper, name))
+    monkeypatch.setattr(scraper, "LIMITERS", {
+        "imdb": HostLimiter(max_concurrency=4, rate=0, name="imdb"),
+        "rt": HostLimiter(max_concurrency=4, rate=0, name="rt"),
+    })
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+
+def test_record_then_replay_round_trip(stub_server, tmp_path):
+    archive_path = str(tmp_path / "stub.zip")
+    benchmark.record_fixtures(archive_path, stub_server + "/chart/top/", MOVIES)
+    # The list page, and one title page and one RT search per movie
+    archive = benchmark.FixtureArchive.load(archive_path)
+    assert archive.movies == MOVIES
+    assert len(archive.index) == 1 + 2 * MOVIES
+
+    result = benchmark.replay_fixtures(archive_path, latency=0, jitter=0, error_rate=0,
+                                       workers=2, imdb_rate=0, rt_rate=0)
+    assert result["movies"] == MOVIES
+    assert result["scraped"] == MOVIES
+    assert result["requests"] == {"served": 1 + 2 * MOVIES, "injected_errors": 0, "missing": 0}
+    assert result["process_cpu_s"] >= 0
+    assert result["peak_rss_mb"] > 0
+
+
+def test_replay_measures_memory_without_resource(stub_server, tmp_path, monkeypatch):
+    archive_path = str(tmp_path / "stub.zip")
+    benchmark.record_fixtures(archive_path, stub_server + "/chart/top/", MOVIES)
+    # As on Windows without psutil: neither source of the peak RSS is there
+    monkeypatch.setattr(benchmark, "_peak_rss_mb", lambda: None)
+
+    result = benchmark.replay_fixtures(archive_path, latency=0, jitter=0, error_rate=0,
+                                       workers=2, imdb_rate=0, rt_rate=0)
+    assert result["scraped"] == MOVIES
+    assert result["memory_source"] == "tracemalloc"
+    assert result["peak_rss_mb"] is not None
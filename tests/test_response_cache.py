@@ -0,0 +1,81 @@
+# tests/test_response_cache.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend import cache
+from backend.cache import MemoryBackend, RedisBackend, make_backend
+from pipeline import bump_version
+
+
+@pytest.fixture
+def movies_api(api, monkeypatch):
+    # Re-read the collection version on every request
+    monkeypatch.setattr(cache, "VERSION_POLL_SECONDS", -1)
+    client, database = api
+    database.movies.insert_one({"title": "Heat", "director": "Michael Mann", "year": 1995, "imdb_rating": 8.3, "cast": []})
+    return client, database
+
+
+def test_a_matching_etag_gets_a_304(movies_api):
+    client, _ = movies_api
+    first = client.get("/movies")
+    assert first.status_code == 200
+
+    again = client.get("/movies", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_a_version_bump_serves_a_fresh_body(movies_api):
+    client, database = movies_api
+    first = client.get("/movies")
+    database.movies.insert_one({"title": "Alien", "director": "Ridley Scott", "year": 1979, "imdb_rating": 8.5, "cast": []})
+
+    # Still the cached body until the pipeline bumps the version
+    assert client.get("/movies").json() == first.json()
+    bump_version(database.movies)
+
+    fresh = client.get("/movies", headers={"If-None-Match": first.headers["ETag"]})
+    assert fresh.status_code == 200
+    assert [movie["title"] for movie in fresh.json()["movies"]] == ["Heat", "Alien"]
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+
+
+def test_memory_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    backend = MemoryBackend(maxsize=4, ttl=10)
+
+    async def scenario():
+        await backend.set("key", {"body": "{}"})
+        now[0] += 9
+        fresh = await backend.get("key")
+        now[0] += 2
+        return fresh, await backend.get("key")
+
+    assert asyncio.run(scenario()) == ({"body": "{}"}, None)
+
+
+def test_memory_backend_evicts_the_least_recently_used_entry():
+    backend = MemoryBackend(maxsize=2, ttl=60)
+
+    async def scenario():
+        await backend.set("a", 1)
+        await backend.set("b", 2)
+        await backend.get("a")
+        await backend.set("c", 3)
+        return [await backend.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+
+
+def test_redis_url_selects_the_shared_backend(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    assert isinstance(make_backend(), RedisBackend)
+    monkeypatch.delenv("REDIS_URL")
+    assert isinstance(make_backend(), MemoryBackend)
@@ -0,0 +1,149 @@
+# tests/test_rt.py
+
+import mongomock
+import pytest
+import requests
+
+import cache
+import pipeline
+import scraper
+from cache import LookupCache, ResponseCache
+from scraper import get_rotten_tomatoes_data, match_rt_result, normalize_title
+
+
+def result(title, year, url=None):
+    return {
+        "title": title,
+        "release_year": year,
+        "rotten_tomatoes_url": url or f"https://www.rottentomatoes.com/m/{normalize_title(title).replace(' ', '_')}_{year}",
+        "tomatometer_score": 90,
+        "audience_score": 85,
+    }
+
+
+@pytest.mark.parametrize("imdb_title, rt_title", [
+    ("The Godfather", "Godfather"),
+    ("Amélie", "Amelie"),
+    ("Fast & Furious", "Fast and Furious"),
+    ("Se7en", "SE7EN"),
+    ("Spider-Man: No Way Home", "Spider Man No Way Home"),
+    ("A Beautiful Mind", "Beautiful Mind"),
+])
+def test_titles_are_normalized_before_matching(imdb_title, rt_title):
+    assert normalize_title(imdb_title) == normalize_title(rt_title)
+    assert match_rt_result([result(rt_title, 2001)], imdb_title, 2001)["title"] == rt_title
+
+
+def test_a_title_match_one_year_off_is_accepted():
+    assert match_rt_result([result("Heat", 1996)], "Heat", 1995)["release_year"] == 1996
+    assert match_rt_result([result("Heat", 1994)], "Heat", 1995)["release_year"] == 1994
+    assert match_rt_result([result("Heat", 1997)], "Heat", 1995) is None
+
+
+def test_the_exact_year_wins_over_a_neighbouring_one():
+    results = [result("Dune", 2020), result("Dune", 2021), result("Dune", 2022)]
+    assert match_rt_result(results, "Dune", 2021)["release_year"] == 2021
+
+
+def test_a_title_match_wins_over_a_same_year_result():
+    results = [result("Something Else", 1995), result("Heat", 1996)]
+    assert match_rt_result(results, "Heat", 1995)["title"] == "Heat"
+
+
+def test_without_a_title_match_the_same_year_result_is_used():
+    assert match_rt_result([result("Heat (Director's Cut)", 1995)], "Heat", 1995)["release_year"] == 1995
+    assert match_rt_result([result("Something Else", 1996)], "Heat", 1995) is None
+
+
+def test_negative_lookups_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    lookups = LookupCache(":memory:", negative_ttl=60)
+    lookups.put("heat|1995", None)
+    lookups.put("alien|1979", {"rotten_tomatoes_url": "https://www.rottentomatoes.com/m/alien"})
+
+    now[0] += 59
+    assert lookups.get("heat|1995") == (True, None)
+    now[0] += 2
+    assert lookups.get("heat|1995") == (False, None)
+    # Positive results never expire
+    now[0] += 10 ** 6
+    assert lookups.get("alien|1979") == (True, {"rotten_tomatoes_url": "https://www.rottentomatoes.com/m/alien"})
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+
+OLD_URL = "https://www.rottentomatoes.com/m/heat_old_slug"
+NEW_URL = "https://www.rottentomatoes.com/m/heat"
+SEARCH_PAGE = f"""
+<search-page-result type="movie">
+  <search-page-media-row releaseyear="1995" tomatometerscore="83" audiencescore="95">
+    <a data-qa="info-name" href="{NEW_URL}">Heat</a>
+  </search-page-media-row>
+</search-page-result>
+""".encode()
+
+
+@pytest.fixture
+def rt(monkeypatch):
+    """Fresh caches and a fake RT; `rt["pages"]` maps URL prefixes to a status or an exception."""
+    monkeypatch.setattr(scraper, "RESPONSE_CACHE", ResponseCache(":memory:"))
+    monkeypatch.setattr(scraper, "RT_LOOKUPS", LookupCache(":memory:", negative_ttl=3600))
+    monkeypatch.setattr(scraper, "RT_SEARCH_URL", "https://www.rottentomatoes.com/search?search={}")
+    state = {"pages": {}, "requested": []}
+
+    def fetch(url, source, headers=None, stage=None):
+        state["requested"].append(url)
+        for prefix, answer in state["pages"].items():
+            if url.startswith(prefix):
+                if isinstance(answer, Exception):
+                    raise answer
+                raise requests.HTTPError(str(answer), response=FakeResponse(answer))
+        return FakeResponse(200, SEARCH_PAGE)
+
+    monkeypatch.setattr(scraper, "fetch", fetch)
+    return state
+
+
+def test_a_gone_rt_page_is_forgotten_and_searched_again(rt):
+    scraper.RT_LOOKUPS.put("heat|1995", {"rotten_tomatoes_url": OLD_URL})
+    rt["pages"][OLD_URL] = 404
+
+    data = get_rotten_tomatoes_data("Heat", 1995)
+
+    assert data == {"rotten_tomatoes_url": NEW_URL, "tomatometer_score": 83, "audience_score": 95}
+    assert scraper.RT_LOOKUPS.get("heat|1995") == (True, {"rotten_tomatoes_url": NEW_URL})
+
+
+def test_transient_rt_errors_leave_the_rt_fields_out(rt):
+    scraper.RT_LOOKUPS.put("heat|1995", {"rotten_tomatoes_url": NEW_URL})
+    rt["pages"][NEW_URL] = requests.ConnectionError("RT is down")
+    assert get_rotten_tomatoes_data("Heat", 1995) == {}
+
+    rt["pages"][NEW_URL] = 503
+    assert get_rotten_tomatoes_data("Heat", 1995) == {}
+    # Still known: the page may well come back
+    assert scraper.RT_LOOKUPS.get("heat|1995") == (True, {"rotten_tomatoes_url": NEW_URL})
+
+
+def test_records_without_rt_fields_keep_the_stored_scores():
+    collection = mongomock.MongoClient().db["movies"]
+    url = "https://www.imdb.com/title/tt0113277/"
+    with pipeline.MongoWriter(collection=collection, flush_interval=3600) as writer:
+        writer.add({"source_imdb_url": url, "title": "Heat", "imdb_rating": 8.3,
+                    "rotten_tomatoes_url": NEW_URL, "tomatometer_score": 83, "audience_score": 95})
+        writer.flush()
+        # A later run could not reach RT
+        writer.add({"source_imdb_url": url, "title": "Heat", "imdb_rating": 8.4})
+        writer.add({"source_imdb_url": "https://www.imdb.com/title/tt0078748/", "title": "Alien", "imdb_rating": 8.5})
+
+    heat = collection.find_one({"source_imdb_url": url})
+    assert (heat["imdb_rating"], heat["tomatometer_score"], heat["audience_score"]) == (8.4, 83, 95)
+    assert heat["discrepancy"] == pytest.approx(1.0)
+    alien = collection.find_one({"title": "Alien"})
+    assert (alien["rotten_tomatoes_url"], alien["tomatometer_score"]) == ("N/A", None)
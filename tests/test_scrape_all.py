@@ -0,0 +1,110 @@
+# tests/test_scrape_all.py
+
+import threading
+import time
+from collections import defaultdict
+from http.server import ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+import scraper
+from benchmark import make_handler
+from cache import LookupCache, ResponseCache
+from throttle import HostLimiter
+
+MOVIES = 12
+LATENCY = 0.05
+
+
+class InFlight:
+    """The most requests each stub "host" had in progress at once, and when each started."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.current = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.started = defaultdict(list)
+
+    def handler(self):
+        in_flight = self
+
+        class CountingHandler(make_handler(LATENCY)):
+            def do_GET(self):
+                host = "rt" if urlparse(self.path).path == "/search" else "imdb"
+                with in_flight._lock:
+                    in_flight.current[host] += 1
+                    in_flight.peak[host] = max(in_flight.peak[host], in_flight.current[host])
+                    in_flight.started[host].append(time.monotonic())
+                try:
+                    super().do_GET()
+                finally:
+                    with in_flight._lock:
+                        in_flight.current[host] -= 1
+
+        return CountingHandler
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    in_flight = InFlight()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), in_flight.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(scraper, "RT_SEARCH_URL", base_url + "/search?search={}")
+    monkeypatch.setattr(scraper, "LIMITERS", dict(scraper.LIMITERS))
+    # run() replaces these for every scrape
+    for name in ("RESPONSE_CACHE", "RT_LOOKUPS", "save_to_mongodb"):
+        monkeypatch.setattr(scraper, name, getattr(scraper, name))
+    yield base_url, in_flight
+    server.shutdown()
+    server.server_close()
+
+
+def run(base_url, in_flight, workers, imdb=(2, 0), rt=(1, 0)):
+    """Scrapes every stub movie from a cold cache; returns (results, saved records)."""
+    saved = []
+    scraper.RESPONSE_CACHE = ResponseCache(":memory:")
+    scraper.RT_LOOKUPS = LookupCache(":memory:")
+    scraper.save_to_mongodb = saved.append
+    scraper.LIMITERS["imdb"] = HostLimiter(imdb[0], imdb[1], name="imdb")
+    scraper.LIMITERS["rt"] = HostLimiter(rt[0], rt[1], name="rt")
+    in_flight.reset()
+    urls = [f"{base_url}/title/tt{n:07d}/" for n in range(MOVIES)]
+    return scraper.scrape_all(urls, workers=workers), saved
+
+
+def test_concurrent_scrape_matches_the_sequential_one(stub):
+    base_url, in_flight = stub
+    sequential, sequential_saved = run(base_url, in_flight, workers=1)
+    concurrent, concurrent_saved = run(base_url, in_flight, workers=8)
+
+    assert all(movie is not None for movie in sequential)
+    assert [movie["title"] for movie in sequential] == [f"Stub Movie tt{n:07d}" for n in range(MOVIES)]
+    # Same records, in the order of the URLs
+    assert concurrent == sequential
+    by_url = lambda movie: movie["source_imdb_url"]
+    assert sorted(concurrent_saved, key=by_url) == sorted(sequential_saved, key=by_url)
+
+
+def test_per_host_concurrency_limits_hold(stub):
+    base_url, in_flight = stub
+    results, _ = run(base_url, in_flight, workers=8, imdb=(2, 0), rt=(1, 0))
+
+    assert all(movie is not None for movie in results)
+    # Eight movies in progress, but never more requests per host than its limit
+    assert in_flight.peak["imdb"] == 2
+    assert in_flight.peak["rt"] == 1
+
+
+def test_per_host_rate_limits_hold(stub):
+    base_url, in_flight = stub
+    rate = 40
+    run(base_url, in_flight, workers=8, imdb=(8, rate), rt=(8, 0))
+
+    started = sorted(in_flight.started["imdb"])
+    assert len(started) == MOVIES
+    # One token per request at `rate` per second (a little slack for timer jitter)
+    assert started[-1] - started[0] >= (MOVIES - 1) / rate * 0.9
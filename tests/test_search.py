@@ -0,0 +1,59 @@
+# tests/test_search.py
+
+import pytest
+
+from backend.search import exact_query, rank, search_query, tokenize
+from pipeline import compute_search_terms
+from pipeline import tokenize as pipeline_tokenize
+
+
+def movie(n, title, rating):
+    return {"_id": n, "title": title, "director": "Someone", "imdb_rating": rating, "cast": []}
+
+
+def test_exact_matches_rank_ahead_of_prefix_matches():
+    candidates = [
+        movie(1, "The Movie 11", 9.0),
+        movie(2, "The Movie 15", 8.5),
+        movie(3, "The Movie 19", 8.0),
+        movie(4, "The Movie 1", 5.0),
+        movie(5, "Movie 10", 9.5),
+    ]
+    ranked = rank(candidates, "movie 1", exact_ids=[4])
+    assert [m["title"] for m in ranked][:2] == ["The Movie 1", "Movie 10"]
+
+
+def test_search_finds_exact_matches_beyond_the_candidate_cap(api):
+    client, database = api
+    # Over a thousand titles start with "movie 1...", all better rated and
+    # stored before the only exact match
+    movies = [movie(n, f"The Movie {n}", 9.0) for n in range(10, 2000)]
+    movies.append(movie(1, "The Movie 1", 5.0))
+    for doc in movies:
+        doc["search_terms"] = compute_search_terms(doc)
+    database.movies.insert_many(movies)
+
+    response = client.get("/movies/search", params={"title": "movie 1", "limit": 5})
+
+    assert response.status_code == 200
+    titles = [m["title"] for m in response.json()]
+    assert titles[0] == "The Movie 1"
+    assert all(title.startswith("The Movie 1") for title in titles)
+
+
+@pytest.mark.parametrize("text", [
+    "Amélie", "WALL·E", "Se7en", "Léon: The Professional", "Spider-Man: No Way Home",
+    "Crouching Tiger, Hidden Dragon (臥虎藏龍)", "Björk Guðmundsdóttir", "8½", "  ", None,
+])
+def test_the_api_splits_words_like_the_pipeline(text):
+    assert tokenize(text) == pipeline_tokenize(text)
+
+
+def test_stored_terms_match_searches_for_the_title():
+    movie = {"title": "Léon: The Professional", "director": "Luc Besson", "cast": [{"actor": "Jean Réno"}]}
+    terms = set(compute_search_terms(movie))
+    for text in ("Leon the professional", "léon: the prof", "jean reno"):
+        assert set(tokenize(text)[:-1]) <= terms
+        assert any(term.startswith(tokenize(text)[-1]) for term in terms)
+    assert exact_query("LEON") == {"search_terms": {"$all": ["leon"]}}
+    assert search_query("!?") is None
@@ -0,0 +1,56 @@
+# tests/test_serialization.py
+
+from typing import List, Union
+
+import pytest
+from pydantic import TypeAdapter
+
+from backend.serialization import MovieChanges, MovieDetail, MoviePage, MovieSummary
+from pipeline import MongoWriter
+
+MOVIES = [
+    {
+        "source_imdb_url": "https://www.imdb.com/title/tt0113277/", "title": "Heat", "year": 1995,
+        "imdb_rating": 8.3, "director": "Michael Mann", "plot_summary": "A heist.", "genres": ["Crime"],
+        "runtime_minutes": 170, "poster_url": "http://example.com/heat.jpg",
+        "cast": [{"actor": "Al Pacino", "character": "Vincent Hanna"}],
+        "rotten_tomatoes_url": "https://www.rottentomatoes.com/m/heat_1995", "tomatometer_score": 83, "audience_score": 94,
+    },
+    # Stored without most of its fields
+    {"source_imdb_url": "https://www.imdb.com/title/tt0078748/", "title": "Alien", "year": 1979},
+]
+
+
+@pytest.fixture
+def client(api):
+    client, database = api
+    with MongoWriter(collection=database.movies, flush_interval=3600) as writer:
+        for movie in MOVIES:
+            writer.add(movie)
+    return client
+
+
+@pytest.mark.parametrize("path, params, model", [
+    ("/movies", {}, MoviePage),
+    ("/movies", {"fields": "card"}, MoviePage),
+    ("/movies/filter", {"sort_by": "year", "fields": "card"}, MoviePage),
+    ("/movies/search", {"title": "heat"}, List[Union[MovieDetail, MovieSummary]]),
+    ("/movies/changes", {}, MovieChanges),
+])
+def test_responses_match_their_documented_model(client, path, params, model):
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    TypeAdapter(model).validate_python(response.json())
+
+
+def test_a_movie_matches_the_detail_model(client):
+    movie_id = client.get("/movies").json()["movies"][0]["id"]
+    detail = client.get(f"/movies/{movie_id}").json()
+    assert MovieDetail.model_validate(detail).model_dump() == detail
+
+
+def test_the_models_are_documented(client):
+    schema = client.get("/openapi.json").json()
+    documented = schema["paths"]["/movies/filter"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert documented == {"$ref": "#/components/schemas/MoviePage"}
+    assert {"MovieChanges", "MovieDetail", "MovieSummary"} <= set(schema["components"]["schemas"])
@@ -0,0 +1,36 @@
+# tests/test_stats.py
+
+from pipeline import compute_search_terms
+
+
+def seed(database):
+    movies = [
+        {"title": "The Dark Knight", "director": "Christopher Nolan", "year": 2008, "imdb_rating": 9.0, "tomatometer_score": 94},
+        {"title": "The Dark Knight Rises", "director": "Christopher Nolan", "year": 2012, "imdb_rating": 8.4, "tomatometer_score": 87},
+        {"title": "Heat", "director": "Michael Mann", "year": 1995, "imdb_rating": 8.3, "tomatometer_score": 83},
+        {"title": "Alien", "director": "Ridley Scott", "year": 1979, "imdb_rating": 8.5, "tomatometer_score": 98},
+    ]
+    for movie in movies:
+        movie["cast"] = []
+        movie["search_terms"] = compute_search_terms(movie)
+    database.movies.insert_many(movies)
+
+
+def test_stats_follow_the_title_search(api):
+    client, database = api
+    seed(database)
+
+    everything = client.get("/stats").json()
+    searched = client.get("/stats", params={"title": "dark kni"}).json()
+
+    assert everything["total"] == 4
+    assert searched["total"] == 2
+    assert round(searched["avg_imdb"], 2) == 8.7
+
+
+def test_stats_combine_the_search_with_the_filters(api):
+    client, database = api
+    seed(database)
+
+    assert client.get("/stats", params={"title": "dark", "min_year": 2010}).json()["total"] == 1
+    assert client.get("/stats", params={"title": "?!"}).status_code == 400
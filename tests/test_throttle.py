@@ -0,0 +1,135 @@
+# tests/test_throttle.py
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+from pymongo.errors import PyMongoError
+
+import scraper
+from benchmark import FaultInjector, make_fault_handler
+from throttle import CircuitOpenError, HostLimiter, RetryPolicy
+
+
+class FakeResponse:
+    status_code = 200
+    content = b"<html></html>"
+    headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def get(self, url, headers=None, timeout=None):
+        return FakeResponse()
+
+
+class FlakyBucket:
+    """A rate limit whose backing store fails for the first `failures` requests."""
+    def __init__(self, failures):
+        self.failures = failures
+
+    def acquire(self):
+        if self.failures:
+            self.failures -= 1
+            raise PyMongoError("rate limit store unavailable")
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = HostLimiter(max_concurrency=2, rate=0, name="test", failure_threshold=1, reset_timeout=0)
+    monkeypatch.setitem(scraper.LIMITERS, "imdb", limiter)
+    monkeypatch.setattr(scraper, "get_session", FakeSession)
+    return limiter
+
+
+def test_a_local_error_during_the_half_open_trial_releases_it(limiter):
+    limiter.on_failure()
+    assert limiter.breaker.state == "open"
+    limiter.bucket = FlakyBucket(failures=1)
+
+    with pytest.raises(PyMongoError):
+        scraper.fetch("https://www.imdb.com/title/tt0111161/", "imdb")
+    # Neither a success nor a host failure
+    assert limiter.breaker.state == "half-open"
+    assert limiter.breaker.failures == 1
+
+    response = scraper.fetch("https://www.imdb.com/title/tt0111161/", "imdb")
+    assert response.status_code == 200
+    assert limiter.breaker.state == "closed"
+
+
+def test_only_one_trial_at_a_time(limiter):
+    limiter.on_failure()
+    limiter.breaker.check()
+    with pytest.raises(CircuitOpenError):
+        limiter.breaker.check()
+    limiter.breaker.release_trial()
+    limiter.breaker.check()
+
+
+# Against the benchmark's fault-injecting stub server, with the retry sleeps recorded
+@pytest.fixture
+def faults(monkeypatch):
+    def serve(scenario, **kwargs):
+        injector = FaultInjector(scenario, **kwargs)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_fault_handler(0, injector))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return injector, f"http://127.0.0.1:{server.server_port}"
+
+    servers = []
+    sleeps = []
+    monkeypatch.setattr(scraper, "RETRY_POLICY", RetryPolicy(retries=2, sleep=sleeps.append))
+    for source in ("imdb", "rt"):
+        monkeypatch.setitem(scraper.LIMITERS, source, HostLimiter(4, 0, name=source, failure_threshold=10))
+    yield serve, sleeps
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_a_transient_error_is_retried_once(faults):
+    serve, sleeps = faults
+    injector, base_url = serve("transient")
+
+    # Every third new URL answers 503 the first time
+    for n in range(3):
+        response = scraper.fetch(f"{base_url}/title/tt{n:07d}/", "imdb")
+        assert response.status_code == 200
+    assert injector.injected[503] == 1
+    assert injector.requests["imdb"] == 4
+    assert len(sleeps) == 1
+
+
+def test_retries_stop_after_the_policy_limit_and_honor_retry_after(faults):
+    serve, sleeps = faults
+    # Every RT request is over capacity and answers 429 with Retry-After: 1
+    injector, base_url = serve("throttle", capacity=0, slow=0)
+    concurrency = scraper.LIMITERS["rt"].concurrency
+
+    with pytest.raises(requests.HTTPError) as error:
+        scraper.fetch(f"{base_url}/search?search=Stub", "rt")
+    assert error.value.response.status_code == 429
+    assert injector.requests["rt"] == 3
+    assert sleeps == [1.0, 1.0]
+    # Halved once: the 429s came within the cooldown
+    assert concurrency.limit == 2
+
+
+def test_an_open_circuit_fails_without_a_request(faults, monkeypatch):
+    serve, sleeps = faults
+    injector, base_url = serve("outage", hang=0)
+    limiter = HostLimiter(4, 0, name="rt", failure_threshold=2, reset_timeout=60)
+    monkeypatch.setitem(scraper.LIMITERS, "rt", limiter)
+
+    with pytest.raises(CircuitOpenError):
+        scraper.fetch(f"{base_url}/search?search=Stub", "rt")
+    assert limiter.breaker.state == "open"
+    assert injector.requests["rt"] == 2
+
+    with pytest.raises(CircuitOpenError):
+        scraper.fetch(f"{base_url}/search?search=Other", "rt")
+    assert injector.requests["rt"] == 2
@@ -0,0 +1,140 @@
+# tests/test_worker.py
+
+import time
+
+import mongomock
+import pytest
+
+import pipeline
+import scraper
+import worker
+import workqueue
+from workqueue import DEAD, DONE, LEASED, PENDING, WorkQueue
+
+URLS = [f"https://www.imdb.com/title/tt{i:07d}/" for i in range(1, 7)]
+
+
+@pytest.fixture
+def database():
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def queue(database):
+    queue = WorkQueue(database["scrape_queue"], "test", max_attempts=1)
+    queue.ensure_indexes()
+    queue.enqueue(URLS)
+    return queue
+
+
+@pytest.fixture
+def writer(database):
+    # Nothing is flushed by size or by the timer: only when the worker asks for it
+    writer = pipeline.use_collection(database["movies"], batch_size=1000, flush_interval=3600)
+    yield writer
+    pipeline.close_writer()
+
+
+def fake_scrape(statuses=None, queue=None):
+    def scrape_movie(url, save=None):
+        if statuses is not None:
+            statuses.append({item["url"]: item["status"] for item in queue.collection.find()})
+        record = {"source_imdb_url": url, "title": f"Movie {url[-8:-1]}", "year": 2000, "imdb_rating": 7.0}
+        save(record)
+        return record
+    return scrape_movie
+
+
+def test_items_are_done_only_once_their_movies_are_written(monkeypatch, database, queue, writer):
+    statuses = []
+    monkeypatch.setattr(scraper, "scrape_movie", fake_scrape(statuses, queue))
+
+    done, failed = worker.work(queue, threads=1)
+
+    assert (done, failed) == (len(URLS), 0)
+    assert queue.counts()[DONE] == len(URLS)
+    # Every scraped movie was still buffered while the next one was scraped
+    for i, seen in enumerate(statuses):
+        assert all(seen[url] == LEASED for url in URLS[:i])
+    saved = {movie["source_imdb_url"] for movie in database["movies"].find()}
+    assert saved == set(URLS)
+
+
+def test_items_are_not_done_when_the_write_fails(monkeypatch, database, queue, writer):
+    monkeypatch.setattr(scraper, "scrape_movie", fake_scrape())
+
+    def bulk_write(*args, **kwargs):
+        raise ConnectionError("MongoDB went away")
+    monkeypatch.setattr(writer.collection, "bulk_write", bulk_write)
+
+    done, failed = worker.work(queue, threads=2)
+
+    assert (done, failed) == (0, len(URLS))
+    assert queue.counts()[DONE] == 0
+    assert queue.counts()[DEAD] == len(URLS)
+    assert database["movies"].count_documents({}) == 0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_an_expired_lease_is_reclaimed(monkeypatch, database):
+    clock = Clock()
+    monkeypatch.setattr(workqueue, "time", clock)
+    queue = WorkQueue(database["scrape_queue"], "lease", lease_seconds=60, max_attempts=3)
+    queue.enqueue(URLS[:1])
+
+    crashed = queue.lease("crashed")
+    assert queue.lease("other") is None
+
+    clock.now += 61
+    reclaimed = queue.lease("other")
+    assert reclaimed["_id"] == crashed["_id"]
+    assert reclaimed["attempts"] == 2
+    # The first worker's late result no longer counts
+    assert not queue.complete(crashed)
+    assert queue.complete(reclaimed)
+
+
+def test_a_renewed_lease_is_not_reclaimed(monkeypatch, database):
+    clock = Clock()
+    monkeypatch.setattr(workqueue, "time", clock)
+    queue = WorkQueue(database["scrape_queue"], "lease", lease_seconds=60, max_attempts=3)
+    queue.enqueue(URLS[:1])
+    item = queue.lease("slow")
+
+    clock.now += 50
+    assert queue.renew("slow", [item["_id"]]) == 1
+    # Only the owner can renew
+    assert queue.renew("other", [item["_id"]]) == 0
+    clock.now += 50
+    assert queue.lease("other") is None
+
+    clock.now += 11
+    assert queue.lease("other")["attempts"] == 2
+
+
+def test_the_worker_renews_its_leases_during_a_slow_scrape(monkeypatch, database, writer):
+    queue = WorkQueue(database["scrape_queue"], "slow", lease_seconds=0.3, max_attempts=1)
+    queue.enqueue(URLS[:2])
+    scrape = fake_scrape()
+
+    def slow_scrape(url, save=None):
+        # Several lease lengths, e.g. retrying a struggling host
+        if url == URLS[0]:
+            time.sleep(1.0)
+        return scrape(url, save=save)
+
+    monkeypatch.setattr(scraper, "scrape_movie", slow_scrape)
+
+    done, failed = worker.work(queue, threads=2)
+
+    assert (done, failed) == (2, 0)
+    # Never leased a second time (which, on the last attempt, would dead-letter it)
+    assert [item["attempts"] for item in queue.collection.find()] == [1, 1]
+    assert queue.counts() == {PENDING: 0, LEASED: 0, DONE: 2, DEAD: 0}
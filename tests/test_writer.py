@@ -0,0 +1,74 @@
+# tests/test_writer.py
+
+import mongomock
+import pytest
+from pymongo.errors import BulkWriteError, PyMongoError
+
+import pipeline
+from pipeline import MongoWriter
+
+
+def record(n, title=None):
+    return {"source_imdb_url": f"https://www.imdb.com/title/tt{n:07d}/", "title": title or f"Movie {n}", "year": 2000}
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()["test"]["movies"]
+
+
+@pytest.fixture
+def flushes():
+    return []
+
+
+@pytest.fixture
+def writer(collection, flushes):
+    def listener(written, failed):
+        flushes.append(([movie["title"] for movie in written], [movie["title"] for movie in failed]))
+    return MongoWriter(collection=collection, flush_interval=3600, listeners=[listener])
+
+
+def test_one_bad_record_does_not_fail_the_batch(collection, writer, flushes):
+    # A unique index the second record violates
+    collection.insert_one({"source_imdb_url": "elsewhere", "title": "Taken"})
+    collection.create_index("title", unique=True)
+
+    for movie in (record(1), record(2, "Taken"), record(3)):
+        writer.add(movie)
+    writer.close()
+
+    assert collection.count_documents({"source_imdb_url": {"$in": [record(1)["source_imdb_url"], record(3)["source_imdb_url"]]}}) == 2
+    assert flushes == [(["Movie 1", "Movie 3"], ["Taken"])]
+    assert (writer.written, writer.failed) == (2, 1)
+    assert collection.database.meta.find_one({"_id": "movies"})["pending_seqs"] == []
+
+
+def test_a_failed_release_still_notifies_the_listeners(collection, writer, flushes, monkeypatch):
+    collection.insert_one({"source_imdb_url": "elsewhere", "title": "Taken"})
+    collection.create_index("title", unique=True)
+
+    def release_fails(*args, **kwargs):
+        raise PyMongoError("meta is unreachable")
+
+    monkeypatch.setattr(pipeline, "release_seqs", release_fails)
+    writer.add(record(1))
+    writer.add(record(2, "Taken"))
+    writer.close()
+
+    assert flushes == [(["Movie 1"], ["Taken"])]
+
+
+def test_write_concern_errors_are_logged(collection, writer, flushes, monkeypatch, capsys):
+    def unacknowledged(operations, ordered):
+        raise BulkWriteError({
+            "writeErrors": [],
+            "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}],
+        })
+
+    monkeypatch.setattr(collection, "bulk_write", unacknowledged)
+    writer.add(record(1))
+    writer.close()
+
+    assert "waiting for replication timed out" in capsys.readouterr().out
+    assert flushes == [(["Movie 1"], [])]